@@ -1,11 +1,22 @@
 import pandas as pd
 import os
+import sys
+import argparse
+import hashlib
+from datetime import datetime
 from utils import convert_weight_kg, convert_price_eur
 
+# Lecteurs partagés avec le pipeline CRM (entrées compressées .gz / .bz2 / .zst)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from readers import read_csv_input, resolve_input, DecompressionStats
+from catalog_store import CatalogStore, CATALOG_COLUMNS, UPDATED_AT_COLUMNS
+from kpi_history import KpiHistory, ALL_COLUMNS
+
 # -----------------------------
 # 1. Chemins des fichiers
 # -----------------------------
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# catalog.py est à la racine du dépôt: data/ est à côté de lui
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 catalog_fr_path = os.path.join(BASE_DIR, "data", "raw", "catalog_fr.csv")
 catalog_us_path = os.path.join(BASE_DIR, "data", "raw", "catalog_us.csv")
@@ -14,79 +25,163 @@ mapping_path    = os.path.join(BASE_DIR, "data", "raw", "mapping_categories.csv"
 output_clean_path = os.path.join(BASE_DIR, "data", "clean", "catalog_canonique.csv")
 output_kpi_path   = os.path.join(BASE_DIR, "data", "clean", "kpi_catalog.csv")
 
-# -----------------------------
-# 2. Chargement des données
-# -----------------------------
-print("Chargement des catalogues...")
-fr = pd.read_csv(catalog_fr_path)
-us = pd.read_csv(catalog_us_path)
-mapping = pd.read_csv(mapping_path)
-
-# -----------------------------
-# 3. Harmonisation colonnes US
-# -----------------------------
-us.rename(columns={"currency": "currency_orig"}, inplace=True)
-
-# US → devise USD → conversion en EUR dans price
-us["currency"] = "€"
-
-# -----------------------------
-# 4. Concat FR + US
-# -----------------------------
-catalog = pd.concat([fr, us], ignore_index=True)
-
-# -----------------------------
-# 5. Conversion poids → kg
-# -----------------------------
-catalog["weight_kg"] = catalog.apply(
-    lambda row: convert_weight_kg(row["weight"], row["weight_unit"]),
-    axis=1
-)
+# Catalogue persistant indexé par SKU (mis à jour par upserts)
+store_path = os.path.join(BASE_DIR, "data", "store", "catalog.sqlite")
 
-# -----------------------------
-# 6. Conversion prix → euros
-# -----------------------------
-catalog["price"] = catalog.apply(
-    lambda row: convert_price_eur(row["price"], row["currency"]),
-    axis=1
-)
+# Historique des KPI de chaque run (partitions par dataset et par jour)
+history_dir = os.path.join(BASE_DIR, "data", "history")
 
-catalog["currency"] = "€"  # après conversion, tout est en euros
-
-# -----------------------------
-# 7. Mapping catégories
-# -----------------------------
-catalog = catalog.merge(mapping,
-                        left_on="category",
-                        right_on="source_category",
-                        how="left")
+# Sources et priorité en cas de SKU présent dans plusieurs catalogues (0 = la plus forte)
+SOURCES = [
+    ("fr", catalog_fr_path, 0),
+    ("us", catalog_us_path, 1),
+]
 
-catalog["category_name"] = catalog["target_category"]
-catalog.drop(columns=["source_category", "target_category"], inplace=True)
+# Version des règles de conversion (poids, prix): à incrémenter quand elles changent,
+# pour que toutes les lignes sources soient reconverties au run suivant
+CONVERSION_VERSION = 1
 
 # -----------------------------
-# 8. Suppression doublons SKU
-# -----------------------------
-before = catalog.shape[0]
-catalog.drop_duplicates(subset=["sku"], keep="first", inplace=True)
-after = catalog.shape[0]
-print(f"Doublons SKU supprimés : {before - after}")
-
-# -----------------------------
-# 9. Colonnes & ordre final
+# 2. Chargement des données
 # -----------------------------
-catalog_final = catalog[[
-    "sku",
-    "name",
-    "category_name",
-    "weight_kg",
-    "price",
-    "currency"
-]]
+def load_catalog(path):
+    # catalog_fr.csv ou sa version compressée (.gz / .bz2 / .zst), lue en flux
+    stats = DecompressionStats()
+    df = read_csv_input(resolve_input(path), stats=stats)
+    if stats.compression:
+        print(f"  {os.path.basename(stats.path)} - {stats.summary()}")
+    return df
 
 # -----------------------------
-# 10. Export final
+# 3. Harmonisation colonnes US
 # -----------------------------
-catalog_final.to_csv(output_clean_path, index=False)
-print(f"Catalogue canonique créé → {output_clean_path}")
-
+def harmonize_us(us):
+    us = us.rename(columns={"currency": "currency_orig"})
+
+    # US → devise USD → conversion en EUR dans price
+    us["currency"] = "€"
+    return us
+
+# -----------------------------
+# 4. Préparation d'une source
+# -----------------------------
+def prepare_catalog(catalog, mapping):
+    # 5. Conversion poids → kg
+    catalog["weight_kg"] = catalog.apply(
+        lambda row: convert_weight_kg(row["weight"], row["weight_unit"]),
+        axis=1
+    )
+
+    # 6. Conversion prix → euros
+    catalog["price"] = catalog.apply(
+        lambda row: convert_price_eur(row["price"], row["currency"]),
+        axis=1
+    )
+
+    catalog["currency"] = "€"  # après conversion, tout est en euros
+
+    # 7. Mapping catégories
+    catalog = catalog.merge(mapping,
+                            left_on="category",
+                            right_on="source_category",
+                            how="left")
+
+    catalog["category_name"] = catalog["target_category"]
+    catalog.drop(columns=["source_category", "target_category"], inplace=True)
+
+    # Colonnes & ordre final (+ date de mise à jour si la source la fournit, + empreinte brute)
+    columns = ["sku", "name", "category_name", "weight_kg", "price", "currency"]
+    columns += [c for c in UPDATED_AT_COLUMNS + ["raw_hash"] if c in catalog.columns]
+    return catalog[columns]
+
+def raw_row_hashes(df, mapping):
+    # Empreinte de la ligne source brute, salée par le mapping et la version des conversions:
+    # un changement de l'un ou de l'autre fait reconvertir toutes les lignes
+    mapping_hash = pd.util.hash_pandas_object(mapping, index=False).values.tobytes()
+    salt = hashlib.sha256(str(CONVERSION_VERSION).encode() + mapping_hash).hexdigest()[:16]
+    return pd.util.hash_pandas_object(df, index=False, hash_key=salt).astype(str)
+
+def rows_to_convert(store, source, df, mapping):
+    # Seules les lignes nouvelles ou modifiées depuis le dernier run passent par la conversion
+    df = df.drop_duplicates(subset=["sku"], keep="first")
+    df = df.assign(sku=df["sku"].astype(str))
+    raw_hashes = raw_row_hashes(df, mapping)
+    changed = (raw_hashes != df["sku"].map(store.raw_hashes(source))).to_numpy()
+    return df, df[changed].assign(raw_hash=raw_hashes[changed])
+
+# -----------------------------
+# 8. Upsert dans le catalogue persistant
+# -----------------------------
+def refresh_store(store, sources=SOURCES):
+    print("Chargement des catalogues...")
+    mapping = pd.read_csv(mapping_path)
+    records = []
+
+    for source, path, priority in sources:
+        path = resolve_input(path)
+        df = load_catalog(path)
+        if source == "us":
+            df = harmonize_us(df)
+
+        # Empreintes brutes comparées au catalogue persistant avant toute conversion
+        df, pending = rows_to_convert(store, source, df, mapping)
+        prepared = prepare_catalog(pending, mapping) if len(pending) else pd.DataFrame(columns=CATALOG_COLUMNS)
+        print(f"Source {source}: {len(pending)}/{len(df)} lignes à convertir")
+
+        # Sans date par ligne, la date du fichier source départage les versions
+        file_date = datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%dT%H:%M:%S')
+        stats = store.upsert(source, prepared, priority, updated_at=file_date, all_skus=df["sku"])
+        print(f"Source {source}: {stats['nouveaux']} nouveaux, {stats['modifies']} modifiés, "
+              f"{stats['supprimes']} supprimés, {stats['inchanges']} inchangés")
+        records += [(metric, source, count) for metric, count in stats.items()]
+
+    return records
+
+# -----------------------------
+# 9. Historique des KPI
+# -----------------------------
+def record_history(records, sku_count):
+    records = records + [("total_sku", ALL_COLUMNS, sku_count)]
+    history = pd.DataFrame(records, columns=["metrique", "colonne", "valeur"])
+    history.insert(0, "etat", "après")
+    history["valeur"] = history["valeur"].astype(float)
+    path = KpiHistory(history_dir).append("catalog", history)
+    print(f"KPI ajoutés à l'historique → {path}")
+
+# -----------------------------
+# 10. Point d'entrée
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalogue canonique FR + US")
+    parser.add_argument("--export-only", action="store_true",
+                        help="exporte le catalogue persistant sans relire les sources")
+    parser.add_argument("--no-export", action="store_true",
+                        help="met à jour le catalogue persistant sans exporter le CSV")
+    parser.add_argument("--source", choices=[name for name, _, _ in SOURCES],
+                        help="ne rafraîchit que cette source (les autres restent telles quelles dans le catalogue)")
+    parser.add_argument("--input", metavar="CHEMIN",
+                        help="fichier à lire pour la source choisie (défaut: son fichier dans data/raw)")
+    args = parser.parse_args(argv)
+    if args.input and not args.source:
+        parser.error("--input nécessite --source")
+
+    # Sources à relire: toutes, ou seulement celle demandée (depuis un autre fichier si fourni)
+    sources = [
+        (name, args.input or path, priority)
+        for name, path, priority in SOURCES
+        if args.source in (None, name)
+    ]
+
+    with CatalogStore(store_path) as store:
+        if not args.export_only:
+            records = refresh_store(store, sources)
+            record_history(records, len(store))
+
+        # 11. Export final
+        if not args.no_export:
+            count = store.export_csv(output_clean_path)
+            print(f"Catalogue canonique créé → {output_clean_path} ({count} SKU)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from writers import atomic_write_csv
+
+
+# STOCKAGE INCRÉMENTAL DU CATALOGUE
+# ==================================
+#
+# Base SQLite indexée par SKU:
+# - candidates: la dernière version connue de chaque SKU pour chaque source,
+#   avec une empreinte de la ligne pour détecter les changements;
+# - catalog: la version retenue par SKU (priorité de source la plus forte,
+#   puis mise à jour la plus récente).
+# Chaque rafraîchissement n'écrit que les SKU nouveaux, modifiés ou disparus
+# d'une source, et ne re-résout que ces SKU-là. L'empreinte de la ligne brute
+# (raw_hash) est aussi conservée: l'appelant peut écarter les lignes sources
+# inchangées avant même de les convertir, et ne passer que le reste à upsert.
+
+CATALOG_COLUMNS = ["sku", "name", "category_name", "weight_kg", "price", "currency"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    source TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    name TEXT,
+    category_name TEXT,
+    weight_kg REAL,
+    price REAL,
+    currency TEXT,
+    priority INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    row_hash TEXT NOT NULL,
+    raw_hash TEXT,
+    PRIMARY KEY (source, sku)
+);
+CREATE INDEX IF NOT EXISTS candidates_sku ON candidates (sku);
+CREATE TABLE IF NOT EXISTS catalog (
+    sku TEXT PRIMARY KEY,
+    name TEXT,
+    category_name TEXT,
+    weight_kg REAL,
+    price REAL,
+    currency TEXT,
+    source TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+# Re-résolution des SKU touchés: meilleure priorité (0 = plus forte), puis plus récent
+_RESOLVE = """
+INSERT INTO catalog (sku, name, category_name, weight_kg, price, currency, source, priority, updated_at)
+SELECT sku, name, category_name, weight_kg, price, currency, source, priority, updated_at
+FROM (
+    SELECT c.*, ROW_NUMBER() OVER (
+        PARTITION BY c.sku ORDER BY c.priority ASC, c.updated_at DESC, c.source ASC
+    ) AS rang
+    FROM candidates c JOIN affected a ON a.sku = c.sku
+)
+WHERE rang = 1
+"""
+
+# Colonnes de date de mise à jour reconnues dans les exports sources
+UPDATED_AT_COLUMNS = ["updated_at", "last_modified", "date_maj", "date_modification"]
+
+
+def _row_hashes(df):
+
+    hashes = pd.util.hash_pandas_object(df[CATALOG_COLUMNS], index=False)
+    return hashes.astype(str)
+
+
+def _updated_at(df, default):
+
+    col = next((c for c in UPDATED_AT_COLUMNS if c in df.columns), None)
+    if col is None:
+        return pd.Series(default, index=df.index)
+    dates = pd.to_datetime(df[col], errors='coerce')
+    return dates.dt.strftime('%Y-%m-%dT%H:%M:%S').fillna(default)
+
+
+class CatalogStore:
+    """Catalogue persistant indexé par SKU, alimenté par upserts successifs."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+        # Bases créées avant l'empreinte brute: colonne ajoutée, lignes reconverties une fois
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(candidates)")]
+        if "raw_hash" not in columns:
+            self.conn.execute("ALTER TABLE candidates ADD COLUMN raw_hash TEXT")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def raw_hashes(self, source):
+
+        # Empreintes brutes connues pour une source: sku -> raw_hash
+        known = pd.read_sql_query("SELECT sku, raw_hash FROM candidates WHERE source = ?",
+                                  self.conn, params=(source,))
+        return known.set_index("sku")["raw_hash"]
+
+    def upsert(self, source, df, priority, updated_at=None, all_skus=None):
+
+        # df: toutes les lignes de la source, ou seulement celles à réexaminer si
+        # all_skus (SKU présents dans la source) est fourni
+        df = df.drop_duplicates(subset=["sku"], keep="first").copy()
+        df["sku"] = df["sku"].astype(str)
+        default = updated_at or datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+        df["updated_at"] = _updated_at(df, default)
+        df["row_hash"] = _row_hashes(df)
+        has_raw_hash = "raw_hash" in df.columns
+        if not has_raw_hash:
+            df["raw_hash"] = None
+
+        # Comparaison avec les empreintes déjà connues pour cette source
+        known = pd.read_sql_query("SELECT sku, row_hash AS known_hash FROM candidates WHERE source = ?",
+                                  self.conn, params=(source,))
+        merged = df.merge(known, on="sku", how="left")
+        new = merged["known_hash"].isna()
+        changed = merged[new | (merged["known_hash"] != merged["row_hash"])]
+        present = df["sku"] if all_skus is None else pd.Series(all_skus, dtype=str)
+        removed = known.loc[~known["sku"].isin(present), "sku"]
+        total = len(df) if all_skus is None else len(present.unique())
+
+        payload = changed[CATALOG_COLUMNS + ["updated_at", "row_hash", "raw_hash"]].astype(object)
+        payload = payload.where(payload.notna(), None)
+        rows = [(source, *values[:6], int(priority), *values[6:]) for values in payload.itertuples(index=False)]
+        affected = [(sku,) for sku in pd.concat([changed["sku"], removed]).unique()]
+
+        # Ligne brute modifiée mais résultat converti identique: seule l'empreinte brute change
+        same = merged.loc[~merged["sku"].isin(changed["sku"])] if has_raw_hash else merged.iloc[:0]
+
+        with self.conn:
+            self.conn.executemany("DELETE FROM candidates WHERE source = ? AND sku = ?",
+                                  [(source, sku) for sku in removed])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO candidates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("UPDATE candidates SET raw_hash = ? WHERE source = ? AND sku = ?",
+                                  list(zip(same["raw_hash"], [source] * len(same), same["sku"])))
+
+            # Seuls les SKU touchés sont re-résolus
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS affected (sku TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM affected")
+            self.conn.executemany("INSERT INTO affected VALUES (?)", affected)
+            self.conn.execute("DELETE FROM catalog WHERE sku IN (SELECT sku FROM affected)")
+            self.conn.execute(_RESOLVE)
+
+        return {
+            'nouveaux': int(new.sum()),
+            'modifies': int(len(changed) - new.sum()),
+            'supprimes': int(len(removed)),
+            'inchanges': int(total - len(changed)),
+        }
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM catalog").fetchone()[0]
+
+    def to_frame(self):
+
+        columns = ", ".join(CATALOG_COLUMNS)
+        return pd.read_sql_query(f"SELECT {columns} FROM catalog ORDER BY sku", self.conn)
+
+    def export_csv(self, path):
+
+        catalog = self.to_frame()
+        atomic_write_csv(catalog, path, index=False)
+        return len(catalog)
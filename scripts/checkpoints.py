@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+from writers import atomic_write
+
+
+# POINTS DE REPRISE DU PIPELINE
+# ==============================
+#
+# Après chaque étape, le résultat peut être sauvegardé en binaire (pickle,
+# protocole 5) avec une empreinte SHA-256. Les points de reprise sont rangés
+# par empreinte du fichier d'entrée et de la configuration: une relance sur
+# les mêmes données et les mêmes règles repart de la dernière étape valide.
+# Seule la dernière étape est conservée, et les points de reprise d'une
+# version précédente du même fichier d'entrée sont supprimés à l'ouverture.
+
+CHECKPOINT_DIR = "../data/checkpoints"
+MANIFEST_NAME = "manifest.json"
+
+
+def file_digest(path):
+
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def config_digest(config):
+
+    encoded = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class CheckpointStore:
+    """Points de reprise d'un run, identifiés par l'entrée et la configuration."""
+
+    def __init__(self, input_path, config, directory=CHECKPOINT_DIR):
+        self.key = f"{file_digest(input_path)[:16]}-{config_digest(config)[:16]}"
+        self.source = os.path.abspath(input_path)
+        self.root = directory
+        self.directory = os.path.join(directory, self.key)
+        self.manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        self.prune_stale()
+
+    def _manifest(self, directory=None):
+
+        path = os.path.join(directory, MANIFEST_NAME) if directory else self.manifest_path
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest.get('stages'), dict) else {}
+
+    def prune_stale(self):
+
+        # Points de reprise du même fichier d'entrée sous une autre empreinte
+        # (données ou configuration modifiées): ils ne serviront plus
+        if not os.path.isdir(self.root):
+            return []
+        removed = []
+        for key in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, key)
+            if key == self.key or not os.path.isdir(directory):
+                continue
+            if self._manifest(directory).get('source') == self.source:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed.append(key)
+        if removed:
+            print(f"   {len(removed)} point(s) de reprise obsolète(s) supprimé(s) pour {os.path.basename(self.source)}")
+        return removed
+
+    def save(self, stage, payload):
+
+        data = pickle.dumps(payload, protocol=5)
+        checksum = hashlib.sha256(data).hexdigest()
+        atomic_write(os.path.join(self.directory, f"{stage}.pkl"), lambda f: f.write(data), binary=True)
+
+        # Le manifeste n'est mis à jour qu'une fois le point de reprise sur disque;
+        # il ne référence plus que cette étape, qui contient les précédentes
+        previous = self._manifest().get('stages', {})
+        manifest = {'source': self.source, 'stages': {stage: {'sha256': checksum, 'bytes': len(data)}}}
+        atomic_write(self.manifest_path, lambda f: json.dump(manifest, f, indent=2))
+
+        # Les fichiers des étapes antérieures ne sont supprimés qu'après ce remplacement:
+        # un arrêt entre les deux laisse au pire des fichiers non référencés
+        for name in previous:
+            if name != stage:
+                path = os.path.join(self.directory, f"{name}.pkl")
+                if os.path.exists(path):
+                    os.unlink(path)
+        return len(data)
+
+    def load(self, stage):
+
+        entry = self._manifest().get('stages', {}).get(stage)
+        path = os.path.join(self.directory, f"{stage}.pkl")
+        if entry is None or not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        # Point de reprise corrompu ou incomplet: ignoré
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            print(f"   Point de reprise '{stage}' invalide (empreinte), ignoré")
+            return None
+        return pickle.loads(data)
+
+    def latest(self, stages):
+
+        # Dernière étape (dans l'ordre du pipeline) disposant d'un point de reprise valide
+        for stage in reversed(stages):
+            payload = self.load(stage)
+            if payload is not None:
+                return stage, payload
+        return None, None
+
+    def clear(self):
+
+        shutil.rmtree(self.directory, ignore_errors=True)
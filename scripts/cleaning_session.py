@@ -0,0 +1,283 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from utils import (
+    normalize_email_series,
+    normalize_country_series,
+    normalize_phone_series,
+    normalize_date_series,
+    normalize_email,
+    normalize_country,
+    normalize_phone_fr,
+    normalize_date,
+)
+from email_domains import correct_email_domains, default_index
+
+
+# NETTOYAGE AU FIL DE L'EAU
+# ==========================
+#
+# Les enregistrements (formulaire d'inscription, file de messages...) sont
+# accumulés en micro-lots: un lot part dès qu'il atteint sa taille maximale
+# ou que le plus ancien enregistrement a attendu le délai maximal. Chaque lot
+# passe par les mêmes fonctions vectorisées que crm.py (correction des
+# domaines email comprise), et chaque appelant récupère son résultat via un
+# Future. Plusieurs threads peuvent soumettre en même temps; un seul thread
+# exécute les lots. Si un lot échoue, ses enregistrements sont repris un par
+# un: seuls les enregistrements fautifs reçoivent l'exception.
+
+RAW_DATA_PATH = "../data/raw/clients.csv"
+
+# Le coût fixe d'un lot (~30 ms) est amorti à partir de quelques milliers d'enregistrements
+MAX_BATCH_SIZE = 2048
+MAX_LATENCY_SECONDS = 0.02
+
+# Pays appliqué aux téléphones lorsque l'enregistrement n'en précise pas
+DEFAULT_PHONE_COUNTRY = "France"
+
+# Champs nettoyés: toujours présents dans les résultats, quel que soit le lot
+INPUT_FIELDS = ['email', 'pays', 'telephone', 'naissance']
+
+
+def clean_records(records):
+
+    # Un DataFrame par lot, pas par enregistrement
+    df = pd.DataFrame.from_records(records, columns=INPUT_FIELDS)
+    cleaned = pd.DataFrame(index=df.index)
+
+    cleaned['email'], _ = correct_email_domains(normalize_email_series(df['email']))
+    cleaned['pays'] = normalize_country_series(df['pays'])
+    phones = df['telephone'].astype('string').astype(object).where(df['telephone'].notna(), None)
+    cleaned['telephone_normalise'] = normalize_phone_series(phones, cleaned['pays'].fillna(DEFAULT_PHONE_COUNTRY))
+    cleaned['naissance'] = normalize_date_series(df['naissance']).dt.strftime('%Y-%m-%d')
+
+    # Valeurs manquantes -> None, fusion avec les champs d'origine
+    cleaned = cleaned.astype(object).where(cleaned.notna(), None)
+    columns = {col: cleaned[col].tolist() for col in cleaned.columns}
+    return [
+        {**record, **{col: values[i] for col, values in columns.items()}}
+        for i, record in enumerate(records)
+    ]
+
+
+class CleaningSession:
+    """Micro-lots de nettoyage, alimentés par plusieurs threads, résultats via Future."""
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_latency=MAX_LATENCY_SECONDS):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.batches = 0
+        self.records = 0
+        self.failed_batches = 0
+
+        self._condition = threading.Condition()
+        self._pending = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='cleaning-session', daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+
+        return self.submit_many([record])[0]
+
+    def submit_many(self, records):
+
+        now = time.monotonic()
+        futures = [Future() for _ in records]
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Session de nettoyage fermée")
+            self._pending.extend((now, record, future) for record, future in zip(records, futures))
+            self._condition.notify()
+        return futures
+
+    def clean(self, records, timeout=None):
+
+        # Appel bloquant pratique: soumet une liste et attend tous ses résultats
+        return [future.result(timeout) for future in self.submit_many(records)]
+
+    def _next_batch(self):
+
+        # Attend un lot plein, l'échéance du plus ancien enregistrement ou la fermeture
+        with self._condition:
+            while True:
+                if len(self._pending) >= self.max_batch_size or (self._closed and self._pending):
+                    break
+                if self._closed:
+                    return None
+                if self._pending:
+                    remaining = self._pending[0][0] + self.max_latency - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._process(batch)
+
+    def _process(self, batch):
+
+        # Les Futures annulés avant le départ du lot sont écartés
+        batch = [(record, future) for _, record, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = clean_records([record for record, _ in batch])
+        except Exception:
+            self._process_one_by_one(batch)
+            return
+
+        self.batches += 1
+        self.records += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _process_one_by_one(self, batch):
+
+        # Lot en échec: on isole les enregistrements fautifs au lieu d'échouer tout le lot
+        self.failed_batches += 1
+        for record, future in batch:
+            try:
+                result = clean_records([record])[0]
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                self.records += 1
+                future.set_result(result)
+
+    def close(self):
+
+        # Les enregistrements déjà soumis sont traités avant l'arrêt
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class LocalQueueConsumer:
+    """File de messages en mémoire: remplace un vrai broker pour les essais."""
+
+    STOP = object()
+
+    def __init__(self, session, inbox=None, outbox=None):
+        self.session = session
+        self.inbox = inbox or queue.Queue()
+        self.outbox = outbox or queue.Queue()
+        self._thread = threading.Thread(target=self._consume, name='queue-consumer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def publish(self, message_id, record):
+        self.inbox.put((message_id, record))
+
+    def _consume(self):
+
+        while True:
+            message = self.inbox.get()
+            if message is self.STOP:
+                return
+            message_id, record = message
+            future = self.session.submit(record)
+            # Réponse publiée dès que le lot du message est traité
+            future.add_done_callback(
+                lambda done, message_id=message_id: self.outbox.put(
+                    (message_id, done.exception() or done.result())))
+
+    def stop(self):
+        self.inbox.put(self.STOP)
+        self._thread.join()
+
+
+def scalar_clean(record):
+
+    # Référence: fonctions unitaires appelées enregistrement par enregistrement
+    email = normalize_email(record.get('email'))
+    if email:
+        local, _, domain = email.rpartition('@')
+        email = f"{local}@{default_index().correct(domain)[0]}"
+    return {
+        **record,
+        'email': email,
+        'pays': normalize_country(record.get('pays')),
+        'telephone_normalise': normalize_phone_fr(record.get('telephone')),
+        'naissance': normalize_date(record.get('naissance')),
+    }
+
+
+def benchmark(path=RAW_DATA_PATH, producers=4, count=20_000):
+
+    records = pd.read_csv(path, dtype=str, nrows=count)
+    records = records.astype(object).where(records.notna(), None).to_dict('records')
+    print(f"\n Session de nettoyage: {len(records)} enregistrements, {producers} producteurs")
+
+    started = time.perf_counter()
+    for record in records:
+        scalar_clean(record)
+    scalar_seconds = time.perf_counter() - started
+    print(f"   Appels unitaires: {len(records) / scalar_seconds:,.0f} enregistrements/s")
+
+    # Producteurs concurrents, un enregistrement à la fois
+    shares = [records[i::producers] for i in range(producers)]
+    futures = [[] for _ in range(producers)]
+    started = time.perf_counter()
+    with CleaningSession() as session:
+        threads = [
+            threading.Thread(target=lambda i=i: futures[i].extend(session.submit(r) for r in shares[i]))
+            for i in range(producers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for share in futures:
+            for future in share:
+                future.result()
+    session_seconds = time.perf_counter() - started
+    print(f"   Session (micro-lots): {len(records) / session_seconds:,.0f} enregistrements/s, "
+          f"{session.batches} lots de {session.records / max(session.batches, 1):.0f} en moyenne")
+
+    # Aller-retour par la file en mémoire
+    with CleaningSession() as session:
+        consumer = LocalQueueConsumer(session).start()
+        started = time.perf_counter()
+        for message_id, record in enumerate(records):
+            consumer.publish(message_id, record)
+        replies = [consumer.outbox.get() for _ in records]
+        queue_seconds = time.perf_counter() - started
+        consumer.stop()
+    print(f"   File en mémoire: {len(replies) / queue_seconds:,.0f} messages/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Débit de la session de nettoyage par micro-lots")
+    parser.add_argument('--producers', type=int, default=4)
+    parser.add_argument('--count', type=int, default=20_000)
+    args = parser.parse_args()
+    benchmark(producers=args.producers, count=args.count)
@@ -2,21 +2,34 @@ import pandas as pd
 import numpy as np
 import os
 import sys
+import argparse
+import json
+from functools import partial
 from datetime import datetime
 
 # Ajouter le répertoire scripts au path pour importer utils
 sys.path.append(os.path.dirname(__file__))
 from utils import (
-    normalize_email,
+    normalize_email_series,
     is_valid_email,
-    normalize_country,
-    normalize_phone_fr,
-    normalize_date,
-    is_valid_birthdate,
+    normalize_country_series,
+    normalize_phone_series,
+    PHONE_RULES,
+    normalize_date_series,
     kpi_quality,
+    kpi_quality_segmented,
     print_quality_report,
     merge_duplicates
 )
+from readers import read_csv_input, resolve_input, DecompressionStats
+from validation import RuleSet
+from writers import BackgroundWriter, atomic_write_csv
+from verification import verify_normalizers
+from checkpoints import CheckpointStore
+from email_domains import correct_email_domains, email_domain_counts, STATUS_CORRECTED
+from email_domains import REFERENCE_DOMAINS, ALLOWED_DOMAINS, SUFFIX_TYPOS
+from memory_stats import CopyTracker, copy_on_write, peak_rss_bytes
+from kpi_history import KpiHistory, kpi_records
 
 
 # CONFIGURATION
@@ -27,29 +40,58 @@ RAW_DATA_PATH = "../data/raw/clients.csv"
 CLEAN_DATA_PATH = "../data/clean/clients_clean.csv"
 REPORT_PATH = "../data/reports/kpi_qualite_crm.csv"
 LOG_PATH = "../data/reports/crm_cleaning_log.txt"
+RULES_PATH = "../config/validation_rules.json"
+VERIFICATION_REPORT_PATH = "../data/reports/verification_normaliseurs.csv"
+SEGMENT_REPORT_PATH = "../data/reports/kpi_qualite_clients.csv"
+HISTORY_DIR = "../data/history"
 
+# Types forcés à la lecture: les téléphones restent du texte pour garder le 0 de tête
+CLIENT_DTYPES = {'telephone': str}
+
+# Pays appliqué aux téléphones lorsque le fichier n'a pas de colonne pays
+DEFAULT_PHONE_COUNTRY = "France"
+
+# Nombre de processus pour l'analyse du CSV brut (None = tous les cœurs)
+READ_WORKERS = None
+
+# Nombre de domaines email détaillés dans le rapport KPI
+TOP_EMAIL_DOMAINS = 20
 
 # FONCTIONS PRINCIPALES
 # ======================
 
-def load_data():
+def load_data(input_path=RAW_DATA_PATH, workers=READ_WORKERS):
   
     print(" Chargement des données clients...")
     
+    # Accepte aussi clients.csv.gz / .bz2 / .zst, lus directement en flux
+    path = resolve_input(input_path)
+    stats = DecompressionStats()
+    
     try:
-        df = pd.read_csv(RAW_DATA_PATH)
+        # Lecture par plages d'octets en parallèle (repli mono-cœur sur les petits fichiers)
+        df = read_csv_input(path, n_workers=workers, dtype=CLIENT_DTYPES, stats=stats)
         print(f"{len(df)} lignes chargées avec succès")
+        if stats.compression:
+            print(f" {stats.summary()}")
         print(f" Colonnes trouvées: {list(df.columns)}")
         return df
     except FileNotFoundError:
-        print(f" Erreur: Le fichier {RAW_DATA_PATH} n'existe pas!")
+        print(f" Erreur: Le fichier {input_path} n'existe pas!")
         return None
     except Exception as e:
         print(f" Erreur lors du chargement: {e}")
         return None
 
 
-def clean_emails(df):
+def keep_original(df, col, low_copy=False):
+    
+    # En copy-on-write, la colonne d'origine partage le tampon de la colonne
+    # nettoyée jusqu'à ce que celle-ci soit remplacée: aucune copie n'est faite
+    df[f'{col}_original'] = df[col] if low_copy else df[col].copy()
+
+
+def clean_emails(df, low_copy=False):
   
     print("\n Nettoyage des emails...")
     
@@ -69,8 +111,12 @@ def clean_emails(df):
     valid_before = df[email_col].apply(is_valid_email).sum()
     
     # Nettoyage
-    df[f'{email_col}_original'] = df[email_col].copy()
-    df[email_col] = df[email_col].apply(normalize_email)
+    keep_original(df, email_col, low_copy)
+    df[email_col] = normalize_email_series(df[email_col])
+    
+    # Correction des fautes de frappe dans les domaines (gmial.com -> gmail.com)
+    df[email_col], domain_report = correct_email_domains(df[email_col])
+    corrected = domain_report[domain_report['statut'] == STATUS_CORRECTED]
     
     # Statistiques après nettoyage
     valid_after = df[email_col].notna().sum()
@@ -79,11 +125,15 @@ def clean_emails(df):
     print(f"   Emails valides avant: {valid_before}/{total} ({valid_before/total*100:.1f}%)")
     print(f"   Emails valides après: {valid_after}/{total} ({valid_after/total*100:.1f}%)")
     print(f"   Emails invalides supprimés: {invalid_count}")
+    print(f"   Domaines distincts: {len(domain_report)}")
+    print(f"   Domaines corrigés: {len(corrected)} ({corrected['nombre'].sum()} emails)")
+    for row in corrected.itertuples(index=False):
+        print(f"     {row.domaine} -> {row.domaine_corrige} ({row.nombre})")
     
     return df
 
 
-def clean_countries(df):
+def clean_countries(df, low_copy=False):
     
     print("\n Standardisation des pays...")
     
@@ -102,8 +152,8 @@ def clean_countries(df):
     unique_before = df[country_col].nunique()
     
     # Nettoyage
-    df[f'{country_col}_original'] = df[country_col].copy()
-    df[country_col] = df[country_col].apply(normalize_country)
+    keep_original(df, country_col, low_copy)
+    df[country_col] = normalize_country_series(df[country_col])
     
     # Statistiques après
     unique_after = df[country_col].nunique()
@@ -115,7 +165,7 @@ def clean_countries(df):
     return df
 
 
-def clean_phones(df):
+def clean_phones(df, low_copy=False):
     
     print("\n Nettoyage des téléphones...")
     
@@ -130,12 +180,25 @@ def clean_phones(df):
         print(" Aucune colonne téléphone trouvée")
         return df
     
+    # Règles de numérotation selon le pays (déjà normalisé par clean_countries)
+    country_col = None
+    for col in df.columns:
+        if ('pays' in col.lower() or 'country' in col.lower()) and 'original' not in col.lower():
+            country_col = col
+            break
+    
+    if country_col is None:
+        print(f"   Aucune colonne pays: règles {DEFAULT_PHONE_COUNTRY} appliquées")
+        countries = pd.Series(DEFAULT_PHONE_COUNTRY, index=df.index)
+    else:
+        countries = df[country_col]
+    
     # Statistiques avant
     valid_before = df[phone_col].notna().sum()
     
     # Nettoyage
-    df[f'{phone_col}_original'] = df[phone_col].copy()
-    df[f'{phone_col}_normalise'] = df[phone_col].apply(normalize_phone_fr)
+    keep_original(df, phone_col, low_copy)
+    df[f'{phone_col}_normalise'] = normalize_phone_series(df[phone_col], countries)
     
     # Statistiques après
     valid_after = df[f'{phone_col}_normalise'].notna().sum()
@@ -144,10 +207,21 @@ def clean_phones(df):
     print(f"   Téléphones valides après: {valid_after}/{len(df)}")
     print(f"   Téléphones invalides: {len(df) - valid_after}")
     
+    # Détail par pays
+    by_country = df[f'{phone_col}_normalise'].notna().groupby(countries.fillna('(vide)')).agg(['sum', 'size'])
+    for country, row in by_country.iterrows():
+        print(f"     {country}: {row['sum']}/{row['size']}")
+    
+    # Pays sans règle: seuls les numéros internationaux (+XX...) sont conservés
+    unknown = ~countries.isin(PHONE_RULES.keys())
+    if unknown.any():
+        print(f"   Pays sans règle téléphonique (format international uniquement): {unknown.sum()} lignes "
+              f"{sorted(countries[unknown].fillna('(vide)').unique())}")
+    
     return df
 
 
-def clean_birthdates(df):
+def clean_birthdates(df, low_copy=False):
    
     print("\n Validation des dates de naissance...")
     
@@ -162,30 +236,34 @@ def clean_birthdates(df):
         print(" Aucune colonne date de naissance trouvée")
         return df
     
-    # Conversion et validation
-    df[f'{birth_col}_original'] = df[birth_col].copy()
-    df[birth_col] = df[birth_col].apply(normalize_date)
+    # Conversion (la validation est faite par les règles, voir validate_records)
+    keep_original(df, birth_col, low_copy)
+    df[birth_col] = normalize_date_series(df[birth_col])
     
-    # Marquer les dates invalides
-    df['date_naissance_valide'] = df[birth_col].apply(is_valid_birthdate)
+    parsed_count = df[birth_col].notna().sum()
+    print(f"   Dates reconnues: {parsed_count}/{len(df)}")
     
-    valid_count = df['date_naissance_valide'].sum()
-    invalid_count = len(df) - valid_count
+    return df
+
+
+def validate_records(df, rules):
+   
+    print("\n Validation des règles...")
+    
+    # Un masque de bits par ligne: bit levé = règle échouée
+    df['regles_echouees'], failures = rules.evaluate(df)
     
-    print(f"   Dates valides: {valid_count}/{len(df)}")
-    print(f"   Dates invalides (futures ou âge > 120 ans): {invalid_count}")
+    for rule, count in failures.items():
+        print(f"   {rule}: {count} échec(s)")
+    print(f"   Lignes sans anomalie: {(df['regles_echouees'] == 0).sum()}/{len(df)}")
     
-    # Mettre à None les dates invalides
-    df.loc[~df['date_naissance_valide'], birth_col] = None
+    # Actions déclarées (ex: vider les dates de naissance invalides)
+    df = rules.apply_actions(df, df['regles_echouees'])
     
     return df
 
 
-def remove_duplicates(df):
-   
-    print("\n Suppression des doublons...")
-    
-    rows_before = len(df)
+def dedup_key_columns(df):
     
     # Identifier les colonnes clés pour la déduplication
     key_columns = []
@@ -199,6 +277,16 @@ def remove_duplicates(df):
             if 'original' not in col.lower():
                 key_columns.append(col)
     
+    return key_columns
+
+
+def remove_duplicates(df):
+   
+    print("\n Suppression des doublons...")
+    
+    rows_before = len(df)
+    key_columns = dedup_key_columns(df)
+    
     if not key_columns:
         print(" Impossible de détecter les colonnes clés pour déduplication")
         return df
@@ -218,17 +306,48 @@ def remove_duplicates(df):
     return df
 
 
-def save_results(df_clean, kpi_before, kpi_after):
+def email_domain_comparison(kpi_before, kpi_after):
+    
+    before = kpi_before.get('email_domains', pd.Series(dtype=int))
+    after = kpi_after.get('email_domains', pd.Series(dtype=int))
+    
+    # Domaines les plus fréquents après nettoyage, le reste est regroupé
+    top = after.head(TOP_EMAIL_DOMAINS).index.union(before.head(TOP_EMAIL_DOMAINS).index, sort=False)
+    counts = pd.DataFrame({'Avant': before, 'Après': after}).fillna(0)
+    rows = counts.loc[counts.index.isin(top)].sort_values('Après', ascending=False)
+    others = counts.loc[~counts.index.isin(top)].sum()
+    
+    comparison = pd.DataFrame({
+        'Métrique': [f'Emails @{domain}' for domain in rows.index],
+        'Avant': rows['Avant'].values,
+        'Après': rows['Après'].values
+    })
+    if len(counts) > len(rows):
+        comparison.loc[len(comparison)] = ['Emails @autres domaines', others['Avant'], others['Après']]
+    
+    return comparison
+
+
+def segment_kpis(df, rules, raw=False, input_path=RAW_DATA_PATH):
+    
+    # Segments: pays (normalisé, même sur les données brutes) et fichier source
+    segments = {}
+    if 'pays' in df.columns:
+        segments['pays'] = normalize_country_series(df['pays']) if raw else df['pays']
+    source = os.path.basename(resolve_input(input_path))
+    return kpi_quality_segmented(df, segments, rules, labels={'source': source})
+
+
+def save_results(kpi_before, kpi_after, writer=None, report_path=REPORT_PATH, dataset='crm',
+                 segment_path=SEGMENT_REPORT_PATH, history_dir=HISTORY_DIR):
    
     print("\n Sauvegarde des résultats...")
     
-    # Créer les dossiers si nécessaire
-    os.makedirs(os.path.dirname(CLEAN_DATA_PATH), exist_ok=True)
-    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
-    
-    # Sauvegarder les données nettoyées
-    df_clean.to_csv(CLEAN_DATA_PATH, index=False)
-    print(f"   Données nettoyées sauvegardées: {CLEAN_DATA_PATH}")
+    # Le writer fourni peut déjà porter d'autres sorties du run (données nettoyées):
+    # elles sont toutes attendues avant d'inscrire le run dans l'historique
+    own_writer = writer is None
+    if own_writer:
+        writer = BackgroundWriter()
     
     # Créer un rapport comparatif
     kpi_comparison = pd.DataFrame({
@@ -252,16 +371,68 @@ def save_results(df_clean, kpi_before, kpi_after):
         ]
     })
     
+    # Échecs par règle de validation
+    rule_names = list(dict.fromkeys([*kpi_before.get('rule_failures', {}), *kpi_after.get('rule_failures', {})]))
+    rule_rows = pd.DataFrame({
+        'Métrique': [f'Règle {rule} (échecs)' for rule in rule_names],
+        'Avant': [kpi_before.get('rule_failures', {}).get(rule) for rule in rule_names],
+        'Après': [kpi_after.get('rule_failures', {}).get(rule) for rule in rule_names]
+    })
+    kpi_comparison = pd.concat([kpi_comparison, rule_rows], ignore_index=True)
+    
+    # Répartition des emails par domaine
+    kpi_comparison = pd.concat([kpi_comparison, email_domain_comparison(kpi_before, kpi_after)], ignore_index=True)
+    
     # Calculer l'amélioration
     kpi_comparison['Amélioration'] = kpi_comparison['Après'] - kpi_comparison['Avant']
     
     # Sauvegarder le rapport
-    kpi_comparison.to_csv(REPORT_PATH, index=False)
-    print(f"   Rapport KPI sauvegardé: {REPORT_PATH}")
-    
-    # Afficher le tableau comparatif
+    writer.submit_csv(kpi_comparison, report_path, index=False)
+    print(f"   Écriture du rapport KPI lancée: {report_path}")
+    
+    # KPI par pays et par source (mode segmenté), format long avant/après
+    if 'segments' in kpi_before and 'segments' in kpi_after:
+        segments = pd.concat([
+            kpi_before['segments'].assign(etat='avant'),
+            kpi_after['segments'].assign(etat='après')
+        ], ignore_index=True)
+        writer.submit_csv(segments[['etat', *kpi_before['segments'].columns]], segment_path, index=False)
+        print(f"   Écriture des KPI segmentés lancée: {segment_path}")
+    
+    # Afficher le tableau comparatif (pendant les écritures)
     print("\n COMPARAISON AVANT/APRÈS:")
     print(kpi_comparison.to_string(index=False))
+    
+    # Un run dont une sortie a échoué n'entre pas dans l'historique: l'erreur remonte ici
+    if own_writer:
+        writer.close()
+    else:
+        writer.wait()
+    
+    # Historique des KPI (une partition par dataset et par jour de run)
+    records = pd.concat([kpi_records(kpi_before, 'avant'), kpi_records(kpi_after, 'après')], ignore_index=True)
+    history_path = KpiHistory(history_dir).append(dataset, records)
+    print(f"   KPI ajoutés à l'historique: {history_path}")
+
+
+
+def verify_fast_paths(df, sample_size, seed=None, report_path=VERIFICATION_REPORT_PATH):
+    
+    print(f"\n Vérification des normaliseurs rapides sur {sample_size} lignes...")
+    
+    mismatches, summary = verify_normalizers(df, sample_size, seed)
+    for name, (checked, divergent, expected) in summary.items():
+        status = "good" if divergent == 0 else "bad"
+        detail = f" ({expected} écart(s) voulu(s))" if expected else ""
+        print(f"   {status} {name}: {divergent} écart(s) sur {checked} valeurs{detail}")
+    
+    if mismatches.empty:
+        return True
+    
+    atomic_write_csv(mismatches, report_path, index=False)
+    print(f"\n   Entrées divergentes ({len(mismatches)}), détail: {report_path}")
+    print(mismatches.head(20).to_string(index=False))
+    return False
 
 
 
@@ -269,53 +440,198 @@ def save_results(df_clean, kpi_before, kpi_after):
 # ===================
 
 
-def main():
+def parse_args(argv=None):
+    
+    parser = argparse.ArgumentParser(description="Nettoyage des données clients")
+    parser.add_argument('--input', default=RAW_DATA_PATH, metavar='CHEMIN',
+                        help=f"fichier clients brut à nettoyer (défaut: {RAW_DATA_PATH})")
+    parser.add_argument('--output', default=CLEAN_DATA_PATH, metavar='CHEMIN',
+                        help=f"fichier nettoyé produit (défaut: {CLEAN_DATA_PATH})")
+    parser.add_argument('--report', default=REPORT_PATH, metavar='CHEMIN',
+                        help=f"rapport KPI avant/après (défaut: {REPORT_PATH})")
+    parser.add_argument('--history-dataset', default='crm', metavar='NOM',
+                        help="nom du dataset dans l'historique des KPI (défaut: crm)")
+    parser.add_argument('--history-dir', default=HISTORY_DIR, metavar='DOSSIER',
+                        help=f"dossier de l'historique des KPI (défaut: {HISTORY_DIR})")
+    parser.add_argument('--segment-report', default=SEGMENT_REPORT_PATH, metavar='CHEMIN',
+                        help=f"rapport des KPI segmentés (défaut: {SEGMENT_REPORT_PATH})")
+    parser.add_argument('--verification-report', default=VERIFICATION_REPORT_PATH, metavar='CHEMIN',
+                        help=f"détail des écarts de --verify-sample (défaut: {VERIFICATION_REPORT_PATH})")
+    parser.add_argument('--verify-sample', type=int, metavar='N', default=0,
+                        help="compare les normaliseurs rapides aux fonctions de référence sur N lignes "
+                             "tirées au hasard; code de sortie 1 en cas d'écart")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="graine du tirage aléatoire (reproductibilité)")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="sauvegarde chaque étape et reprend à la dernière étape valide "
+                             "pour la même entrée et la même configuration")
+    parser.add_argument('--segmented-kpi', action='store_true',
+                        help="calcule les KPI par pays et par fichier source (voir --segment-report)")
+    parser.add_argument('--low-copy', action='store_true',
+                        help="exécute la chaîne en copy-on-write, sans copies complètes des données")
+    parser.add_argument('--memory-stats', action='store_true',
+                        help="affiche les octets copiés par étape et le pic mémoire du run")
+    return parser.parse_args(argv)
+
+
+def cleaning_stages(rules, low_copy=False):
+    
+    # Étapes de nettoyage, dans l'ordre (le nom sert de clé aux points de reprise)
+    return [
+        ('emails', partial(clean_emails, low_copy=low_copy)),
+        ('pays', partial(clean_countries, low_copy=low_copy)),
+        ('telephones', partial(clean_phones, low_copy=low_copy)),
+        ('naissances', partial(clean_birthdates, low_copy=low_copy)),
+        ('validation', partial(validate_records, rules=rules)),
+        ('doublons', remove_duplicates),
+    ]
+
+
+def pipeline_config(rules_path=RULES_PATH, low_copy=False, segmented_kpi=False):
+    
+    # Tout ce qui change le résultat invalide les points de reprise
+    # (le KPI segmenté "avant" fait partie de la charge sauvegardée)
+    with open(rules_path, encoding='utf-8') as f:
+        rules = json.load(f)
+    return {
+        'rules': rules,
+        'dtypes': CLIENT_DTYPES,
+        'phone_rules': PHONE_RULES,
+        'default_phone_country': DEFAULT_PHONE_COUNTRY,
+        'reference_domains': REFERENCE_DOMAINS,
+        'allowed_domains': ALLOWED_DOMAINS,
+        'suffix_typos': SUFFIX_TYPOS,
+        'low_copy': low_copy,
+        'segmented_kpi': segmented_kpi,
+    }
+
+
+def main(argv=None):
    
+    args = parse_args(argv)
+    baseline_rss = peak_rss_bytes()
+    
     print("\n" + "="*70)
     print(" PROJET 1: CRM DE QUALITÉ OPTIMALE")
     print("="*70)
     
-    # 1. Charger les données
-    df = load_data()
-    if df is None:
-        return
-    
-    # 2. KPI avant nettoyage
-    print("\n" + "="*70)
-    print(" ÉTAT INITIAL DES DONNÉES")
-    print("="*70)
-    kpi_before = kpi_quality(df, "Clients (AVANT)")
-    print_quality_report(kpi_before)
+    # Copy-on-write limité à ce run: l'option pandas est rétablie en sortie
+    # (processus du watcher, tests)
+    if args.low_copy:
+        print(" Mode économe en copies (copy-on-write) actif")
+    with copy_on_write(args.low_copy):
+        return run(args, baseline_rss)
+
+
+def run(args, baseline_rss):
+    
+    rules = RuleSet.from_file(RULES_PATH)
+    stages = cleaning_stages(rules, args.low_copy)
+    stage_names = [name for name, _ in stages]
+    
+    # Reprise éventuelle sur la dernière étape sauvegardée
+    checkpoints = None
+    resumed_stage = None
+    input_path = resolve_input(args.input)
+    if args.checkpoint and os.path.exists(input_path):
+        config = pipeline_config(low_copy=args.low_copy, segmented_kpi=args.segmented_kpi)
+        checkpoints = CheckpointStore(input_path, config)
+        resumed_stage, payload = checkpoints.latest(stage_names)
+        if resumed_stage is not None:
+            df_clean, kpi_before = payload
+            print(f"\n Reprise après l'étape '{resumed_stage}' ({len(df_clean)} lignes)")
+            # Les données brutes ne sont pas rechargées: la vérification ne peut pas tourner
+            if args.verify_sample > 0:
+                print(" Vérification différentielle ignorée à la reprise (données brutes non rechargées)")
+    
+    if resumed_stage is None:
+        # 1. Charger les données
+        df = load_data(input_path)
+        if df is None:
+            return 1
+        
+        # Vérification différentielle: aucun fichier n'est écrit si les chemins rapides divergent
+        if args.verify_sample > 0 and not verify_fast_paths(df, args.verify_sample, args.seed, args.verification_report):
+            print("\n Arrêt: les normaliseurs rapides divergent des fonctions de référence")
+            return 1
+        
+        # 2. KPI avant nettoyage
+        print("\n" + "="*70)
+        print(" ÉTAT INITIAL DES DONNÉES")
+        print("="*70)
+        kpi_before = kpi_quality(df, "Clients (AVANT)", rules)
+        if 'email' in df.columns:
+            kpi_before['email_domains'] = email_domain_counts(df['email'])
+        if args.segmented_kpi:
+            kpi_before['segments'] = segment_kpis(df, rules, raw=True, input_path=input_path)
+        print_quality_report(kpi_before)
+        df_clean = df.copy(deep=not args.low_copy)
+        input_bytes = int(df.memory_usage(index=True, deep=True).sum())
     
     # 3. Nettoyage étape par étape
     print("\n" + "="*70)
     print(" NETTOYAGE DES DONNÉES")
     print("="*70)
     
-    df_clean = df.copy()
-    df_clean = clean_emails(df_clean)
-    df_clean = clean_countries(df_clean)
-    df_clean = clean_phones(df_clean)
-    df_clean = clean_birthdates(df_clean)
-    df_clean = remove_duplicates(df_clean)
-    
-    # 4. KPI après nettoyage
-    print("\n" + "="*70)
-    print(" ÉTAT FINAL DES DONNÉES")
-    print("="*70)
-    kpi_after = kpi_quality(df_clean, "Clients (APRÈS)")
-    print_quality_report(kpi_after)
-    
-    # 5. Sauvegarder les résultats
-    save_results(df_clean, kpi_before, kpi_after)
+    start = stage_names.index(resumed_stage) + 1 if resumed_stage else 0
+    tracker = CopyTracker() if args.memory_stats else None
+    for name, stage in stages[start:]:
+        if tracker:
+            tracker.start(df_clean)
+        df_clean = stage(df_clean)
+        if tracker:
+            tracker.stop(name, df_clean)
+        if checkpoints:
+            size = checkpoints.save(name, (df_clean, kpi_before))
+            print(f"   Point de reprise '{name}' sauvegardé ({size / 1e6:.1f} Mo)")
+    
+    with BackgroundWriter() as writer:
+        # 4. La sortie nettoyée s'écrit en tâche de fond pendant le calcul des KPI
+        #    (df_clean n'est plus modifié à partir d'ici)
+        writer.submit_csv(df_clean, args.output, index=False)
+        print(f"\n Écriture des données nettoyées lancée: {args.output}")
+        
+        # 5. KPI après nettoyage
+        print("\n" + "="*70)
+        print(" ÉTAT FINAL DES DONNÉES")
+        print("="*70)
+        kpi_after = kpi_quality(df_clean, "Clients (APRÈS)", rules)
+        if 'email' in df_clean.columns:
+            kpi_after['email_domains'] = email_domain_counts(df_clean['email'])
+        if args.segmented_kpi:
+            kpi_after['segments'] = segment_kpis(df_clean, rules, input_path=input_path)
+        print_quality_report(kpi_after)
+        
+        # 6. Rapports, puis historique une fois toutes les écritures confirmées
+        save_results(kpi_before, kpi_after, writer, args.report, args.history_dataset,
+                     args.segment_report, args.history_dir)
+    print("\n   Sorties écrites sur disque")
+    
+    # Octets copiés par étape et pic mémoire rapporté à l'entrée + sortie
+    if tracker:
+        print("\n" + "="*70)
+        print(" MÉMOIRE")
+        print("="*70)
+        tracker.report()
+        if resumed_stage is None:
+            output_bytes = int(df_clean.memory_usage(index=True, deep=True).sum())
+            # Le socle (interpréteur + bibliothèques) est mesuré avant le chargement
+            peak = peak_rss_bytes() - baseline_rss
+            print(f"\n Entrée: {input_bytes / 1e6:.1f} Mo, sortie: {output_bytes / 1e6:.1f} Mo, "
+                  f"pic RSS hors socle: {peak / 1e6:.1f} Mo ({peak / (input_bytes + output_bytes):.2f}x entrée + sortie)")
+    
+    # Run réussi: les points de reprise n'ont plus d'utilité
+    if checkpoints:
+        checkpoints.clear()
     
     print("\n" + "="*70)
     print(" NETTOYAGE TERMINÉ AVEC SUCCÈS!")
     print("="*70)
-    print(f" Fichier nettoyé: {CLEAN_DATA_PATH}")
-    print(f" Rapport KPI: {REPORT_PATH}")
+    print(f" Fichier nettoyé: {args.output}")
+    print(f" Rapport KPI: {args.report}")
     print("="*70 + "\n")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,226 @@
+from functools import lru_cache
+
+import pandas as pd
+
+
+# DOMAINES EMAIL
+# ===============
+#
+# Les adresses sont découpées en partie locale / domaine sur toute la colonne,
+# puis chaque domaine distinct est validé et corrigé une seule fois contre une
+# liste de référence (index de trigrammes + distance d'édition), avant d'être
+# rediffusé sur les lignes.
+#
+# Un domaine n'est jamais corrigé vers un autre suffixe: yahoo.de est une
+# adresse valide, pas une faute de frappe de yahoo.fr. Seul le libellé avant
+# le suffixe est comparé, parmi les domaines de même suffixe; les suffixes
+# inexistants les plus courants (.con, .cmo...) sont redressés à part.
+
+# Domaines de référence (FR, BE, CH et webmails internationaux)
+REFERENCE_DOMAINS = (
+    "gmail.com",
+    "googlemail.com",
+    "hotmail.com",
+    "hotmail.fr",
+    "hotmail.be",
+    "outlook.com",
+    "outlook.fr",
+    "live.fr",
+    "live.be",
+    "msn.com",
+    "yahoo.com",
+    "yahoo.fr",
+    "icloud.com",
+    "me.com",
+    "protonmail.com",
+    "orange.fr",
+    "wanadoo.fr",
+    "free.fr",
+    "sfr.fr",
+    "laposte.net",
+    "bbox.fr",
+    "gmx.fr",
+    "skynet.be",
+    "telenet.be",
+    "proximus.be",
+    "bluewin.ch",
+    "sunrise.ch",
+    "gmx.ch",
+)
+
+# Variantes légitimes des webmails (autres pays): reconnues telles quelles
+ALLOWED_DOMAINS = (
+    "yahoo.de",
+    "yahoo.es",
+    "yahoo.it",
+    "yahoo.co.uk",
+    "hotmail.de",
+    "hotmail.es",
+    "hotmail.it",
+    "hotmail.co.uk",
+    "outlook.de",
+    "outlook.es",
+    "outlook.it",
+    "live.com",
+    "live.de",
+    "live.it",
+    "gmx.de",
+    "gmx.net",
+    "web.de",
+    "t-online.de",
+    "libero.it",
+    "tiscali.it",
+    "telefonica.net",
+)
+
+# Suffixes inexistants -> suffixe voulu (fautes de frappe sur .com / .fr)
+SUFFIX_TYPOS = {
+    "con": "com",
+    "cmo": "com",
+    "ocm": "com",
+    "cpm": "com",
+    "vom": "com",
+    "xom": "com",
+    "comm": "com",
+    "rf": "fr",
+    "frr": "fr",
+}
+
+# Statuts attribués à chaque domaine distinct
+STATUS_REFERENCE = "reference"
+STATUS_CORRECTED = "corrige"
+STATUS_UNKNOWN = "inconnu"
+
+
+def _trigrams(text):
+
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+
+    # Distance de Damerau-Levenshtein restreinte: "gmial" -> "gmail" coûte 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+
+def split_domain(domain):
+
+    # "yahoo.co.uk" -> ("yahoo", "co.uk"): libellé comparé, suffixe conservé
+    label, _, suffix = domain.partition('.')
+    return label, suffix
+
+
+def max_distance_for(label):
+
+    # Tolérance réduite sur les libellés courts pour ne pas "corriger" msn.com en me.com
+    return 1 if len(label) < 6 else 2
+
+
+class DomainIndex:
+    """Index de trigrammes précalculé sur les libellés des domaines de référence."""
+
+    def __init__(self, domains=REFERENCE_DOMAINS, allowed=ALLOWED_DOMAINS):
+        self.domains = tuple(dict.fromkeys(d.lower() for d in (*domains, *allowed)))
+        self.reference = set(self.domains)
+        self.trigram_index = {}
+        for position, domain in enumerate(self.domains):
+            for trigram in _trigrams(split_domain(domain)[0]):
+                self.trigram_index.setdefault(trigram, set()).add(position)
+
+        # Domaines déjà résolus: réutilisés d'un fichier à l'autre par un processus qui dure
+        self.resolved = {}
+
+    def candidates(self, label, suffix):
+
+        # Domaines de même suffixe partageant au moins un trigramme de libellé
+        positions = set()
+        for trigram in _trigrams(label):
+            positions |= self.trigram_index.get(trigram, set())
+        return [self.domains[p] for p in positions if split_domain(self.domains[p])[1] == suffix]
+
+    def correct(self, domain):
+
+        if domain not in self.resolved:
+            self.resolved[domain] = self._correct(domain)
+        return self.resolved[domain]
+
+    def _correct(self, domain):
+
+        if domain in self.reference:
+            return domain, STATUS_REFERENCE
+
+        label, suffix = split_domain(domain)
+        suffix_fixed = suffix in SUFFIX_TYPOS
+        suffix = SUFFIX_TYPOS.get(suffix, suffix)
+        if suffix_fixed and f"{label}.{suffix}" in self.reference:
+            return f"{label}.{suffix}", STATUS_CORRECTED
+
+        limit = max_distance_for(label)
+        scored = sorted(
+            (edit_distance(label, split_domain(candidate)[0]), candidate)
+            for candidate in self.candidates(label, suffix)
+            if abs(len(split_domain(candidate)[0]) - len(label)) <= limit
+        )
+
+        # Correction uniquement si le meilleur candidat est proche et sans ex-aequo
+        if scored and scored[0][0] <= limit and (len(scored) == 1 or scored[1][0] > scored[0][0]):
+            return scored[0][1], STATUS_CORRECTED
+        return domain, STATUS_UNKNOWN
+
+
+@lru_cache(maxsize=1)
+def default_index():
+
+    # Index partagé sur les domaines de référence, construit une seule fois par processus
+    return DomainIndex()
+
+
+def split_emails(emails):
+
+    # Découpage vectorisé sur le dernier '@'
+    parts = emails.str.rpartition('@')
+    has_domain = parts[1] == '@'
+    return pd.DataFrame({
+        'local': parts[0].where(has_domain),
+        'domaine': parts[2].where(has_domain),
+    }, index=emails.index)
+
+
+def correct_email_domains(emails, index=None):
+
+    index = index or default_index()
+    parts = split_emails(emails)
+
+    # Chaque domaine distinct n'est traité qu'une fois
+    counts = parts['domaine'].value_counts()
+    resolved = [index.correct(domain) for domain in counts.index]
+    report = pd.DataFrame({
+        'domaine': counts.index,
+        'domaine_corrige': [r[0] for r in resolved],
+        'statut': [r[1] for r in resolved],
+        'nombre': counts.values,
+    })
+
+    # Rediffusion du domaine corrigé sur toutes les lignes
+    mapping = dict(zip(report['domaine'], report['domaine_corrige']))
+    corrected_domain = parts['domaine'].map(mapping)
+    corrected = (parts['local'] + '@' + corrected_domain).where(parts['domaine'].notna(), None)
+
+    return corrected, report
+
+
+def email_domain_counts(emails):
+
+    domains = split_emails(emails)['domaine'].str.lower()
+    return domains.value_counts()
@@ -0,0 +1,272 @@
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from kpi_history import HISTORY_DIR, KpiHistory, ALL_COLUMNS
+from readers import iter_csv_chunks, resolve_input
+from rollups import detect_sales_columns
+from writers import atomic_write
+
+
+# INTÉGRITÉ RÉFÉRENTIELLE DES VENTES
+# ===================================
+#
+# Chaque ligne de vente doit référencer un SKU du catalogue canonique et un
+# client du fichier clients nettoyé. Les clés valides sont réduites à des
+# empreintes 64 bits (tableau trié, 8 octets par clé) ou à un filtre de Bloom
+# (~15 bits par clé à 0,1 % de faux positifs), puis chaque morceau de ventes
+# est vérifié par recherche vectorisée. Les lignes valides vont dans
+# sales_clean.csv, les orphelines en quarantaine avec leur motif; les comptes
+# d'orphelines sont inscrits dans l'historique des KPI (dataset "ventes").
+
+SALES_PATH = "../data/raw/sales.csv"
+CATALOG_PATH = "../data/clean/catalog_canonique.csv"
+CLIENTS_PATH = "../data/clean/clients_clean.csv"
+VALID_SALES_PATH = "../data/clean/sales_clean.csv"
+QUARANTINE_PATH = "../data/quarantine/ventes_orphelines.csv"
+HISTORY_DATASET = "ventes"
+
+BLOOM_ERROR_RATE = 0.001
+
+# Clé de hachage distincte pour la seconde fonction du filtre de Bloom (16 caractères)
+_SECOND_HASH_KEY = "integrite-ventes"
+
+REASON_SKU = "sku_inconnu"
+REASON_CLIENT = "client_inconnu"
+REASON_BOTH = "sku_et_client_inconnus"
+
+
+def normalize_keys(values):
+
+    # Même forme des deux côtés: texte sans espaces, vide = clé absente
+    keys = pd.Series(values, copy=False).astype('string').str.strip()
+    return keys.mask(keys == '')
+
+
+def _hash_keys(keys, hash_key=None):
+
+    values = keys.to_numpy(dtype=object)
+    if hash_key is None:
+        return pd.util.hash_array(values, categorize=False)
+    return pd.util.hash_array(values, hash_key=hash_key, categorize=False)
+
+
+class SortedKeySet:
+    """Empreintes 64 bits triées des clés valides (recherche dichotomique vectorisée)."""
+
+    def __init__(self, keys):
+        keys = normalize_keys(keys).dropna()
+        self.hashes = np.unique(_hash_keys(keys))
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @property
+    def nbytes(self):
+        return self.hashes.nbytes
+
+    def contains(self, keys):
+
+        keys = normalize_keys(keys)
+        present = np.zeros(len(keys), dtype=bool)
+        known = keys.notna().to_numpy()
+        if not known.any() or not len(self.hashes):
+            return present
+
+        hashes = _hash_keys(keys[known])
+        positions = np.searchsorted(self.hashes, hashes)
+        found = positions < len(self.hashes)
+        found[found] = self.hashes[positions[found]] == hashes[found]
+        present[known] = found
+        return present
+
+
+class BloomFilter:
+    """Filtre de Bloom sur les clés valides: jamais de faux négatif, quelques faux positifs."""
+
+    def __init__(self, keys, error_rate=BLOOM_ERROR_RATE):
+        keys = normalize_keys(keys).dropna().unique()
+        keys = pd.Series(keys, dtype='string')
+        n = max(len(keys), 1)
+
+        self.size = max(8, math.ceil(-n * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / n * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = len(keys)
+
+        for index in self._bit_positions(keys):
+            np.bitwise_or.at(self.bits, index >> 3, np.left_shift(1, index & 7).astype(np.uint8))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def _bit_positions(self, keys):
+
+        # Double hachage: position_i = h1 + i * h2 (mod taille)
+        h1 = _hash_keys(keys)
+        h2 = _hash_keys(keys, _SECOND_HASH_KEY) | np.uint64(1)
+        size = np.uint64(self.size)
+        for i in range(self.hash_count):
+            yield (h1 + np.uint64(i) * h2) % size
+
+    def contains(self, keys):
+
+        keys = normalize_keys(keys)
+        present = np.zeros(len(keys), dtype=bool)
+        known = keys.notna().to_numpy()
+        if not known.any():
+            return present
+
+        found = np.ones(int(known.sum()), dtype=bool)
+        for index in self._bit_positions(keys[known]):
+            found &= (self.bits[index >> 3] & np.left_shift(1, index & 7).astype(np.uint8)) != 0
+        present[known] = found
+        return present
+
+
+def build_key_set(keys, method='sorted', error_rate=BLOOM_ERROR_RATE):
+
+    if method == 'sorted':
+        return SortedKeySet(keys)
+    if method == 'bloom':
+        return BloomFilter(keys, error_rate)
+    raise ValueError(f"Méthode inconnue: {method} (sorted ou bloom)")
+
+
+def load_reference_keys(catalog_path=CATALOG_PATH, clients_path=CLIENTS_PATH, method='sorted'):
+
+    # Seules les colonnes clés sont lues
+    skus = pd.read_csv(resolve_input(catalog_path), usecols=['sku'], dtype=str)['sku']
+    clients = pd.read_csv(resolve_input(clients_path), usecols=['id'], dtype=str)['id']
+    return build_key_set(skus, method), build_key_set(clients, method)
+
+
+class IntegrityChecker:
+    """Sépare les lignes de ventes valides des orphelines et compte les motifs."""
+
+    def __init__(self, sku_keys, client_keys):
+        self.sku_keys = sku_keys
+        self.client_keys = client_keys
+        self.counts = {'lignes': 0, 'orphelines': 0, REASON_SKU: 0, REASON_CLIENT: 0, REASON_BOTH: 0}
+
+    def split(self, chunk):
+
+        cols = detect_sales_columns(chunk.columns)
+        sku_ok = self.sku_keys.contains(chunk[cols['sku']])
+        client_ok = self.client_keys.contains(chunk[cols['client']])
+        valid = sku_ok & client_ok
+
+        reasons = np.select([~sku_ok & ~client_ok, ~sku_ok], [REASON_BOTH, REASON_SKU], REASON_CLIENT)
+        orphans = chunk.loc[~valid].assign(motif=reasons[~valid])
+
+        self.counts['lignes'] += len(chunk)
+        self.counts['orphelines'] += int((~valid).sum())
+        for reason, count in orphans['motif'].value_counts().items():
+            self.counts[reason] += int(count)
+        return chunk.loc[valid], orphans
+
+    def kpis(self):
+
+        # Comptes entiers et part du total dans des colonnes distinctes
+        total = self.counts['lignes']
+        orphans = self.counts['orphelines']
+        kpis = pd.DataFrame({
+            'Métrique': [
+                'Lignes de ventes',
+                'Lignes valides',
+                'Lignes orphelines',
+                'Orphelines: SKU inconnu',
+                'Orphelines: client inconnu',
+                'Orphelines: SKU et client inconnus',
+            ],
+            'Lignes': [
+                total,
+                total - orphans,
+                orphans,
+                self.counts[REASON_SKU],
+                self.counts[REASON_CLIENT],
+                self.counts[REASON_BOTH],
+            ]
+        })
+        kpis['Part (%)'] = (kpis['Lignes'] / total * 100).round(2) if total else 0.0
+        return kpis
+
+    def records(self):
+
+        # Format long de l'historique des KPI (metrique, colonne, valeur)
+        total = self.counts['lignes']
+        orphans = self.counts['orphelines']
+        rows = [
+            ('lignes_ventes', ALL_COLUMNS, total),
+            ('lignes_orphelines', ALL_COLUMNS, orphans),
+            ('taux_orphelines', ALL_COLUMNS, round(orphans / total * 100, 2) if total else 0.0),
+        ]
+        rows += [('lignes_orphelines', reason, self.counts[reason])
+                 for reason in (REASON_SKU, REASON_CLIENT, REASON_BOTH)]
+
+        records = pd.DataFrame(rows, columns=['metrique', 'colonne', 'valeur'])
+        records.insert(0, 'etat', 'après')
+        records['valeur'] = records['valeur'].astype(float)
+        return records
+
+
+def check_sales_file(path=SALES_PATH, method='sorted', valid_path=VALID_SALES_PATH,
+                     quarantine_path=QUARANTINE_PATH, history_dir=HISTORY_DIR,
+                     catalog_path=CATALOG_PATH, clients_path=CLIENTS_PATH):
+
+    print(f"\n Contrôle d'intégrité des ventes: {path}")
+    source = resolve_input(path)
+    try:
+        columns = pd.read_csv(source, nrows=0, dtype=str).columns
+    except pd.errors.EmptyDataError:
+        print("   Fichier de ventes vide (sans en-tête): rien à contrôler")
+        return None
+
+    sku_keys, client_keys = load_reference_keys(catalog_path, clients_path, method)
+    print(f"   Références: {len(sku_keys)} SKU, {len(client_keys)} clients "
+          f"({(sku_keys.nbytes + client_keys.nbytes) / 1e6:.2f} Mo, méthode {method})")
+
+    checker = IntegrityChecker(sku_keys, client_keys)
+
+    def write_outputs(valid_file, quarantine_file):
+        # En-têtes écrits d'emblée: un fichier sans ventes donne des sorties vides mais lisibles
+        pd.DataFrame(columns=columns).to_csv(valid_file, index=False)
+        pd.DataFrame(columns=[*columns, 'motif']).to_csv(quarantine_file, index=False)
+        # Les morceaux sont écrits au fil de l'eau: les ventes ne sont jamais en mémoire entières
+        for chunk in iter_csv_chunks(source, dtype=str):
+            valid, orphans = checker.split(chunk)
+            valid.to_csv(valid_file, index=False, header=False)
+            orphans.to_csv(quarantine_file, index=False, header=False)
+
+    # Les deux sorties sont remplacées atomiquement (la quarantaine d'abord)
+    atomic_write(valid_path, lambda valid_file: atomic_write(
+        quarantine_path, lambda quarantine_file: write_outputs(valid_file, quarantine_file)))
+
+    # Comptes d'orphelines inscrits dans l'historique une fois les sorties écrites
+    history_path = KpiHistory(history_dir).append(HISTORY_DATASET, checker.records())
+
+    print(checker.kpis().to_string(index=False))
+    print(f"\n   Ventes valides: {valid_path}")
+    print(f"   Quarantaine: {quarantine_path}")
+    print(f"   Historique KPI: {history_path}")
+    return checker.counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contrôle d'intégrité référentielle des ventes")
+    parser.add_argument('sales', nargs='?', default=SALES_PATH, help="fichier de ventes à contrôler")
+    parser.add_argument('--bloom', action='store_true',
+                        help=f"filtre de Bloom ({BLOOM_ERROR_RATE:.1%} de faux positifs) au lieu du tableau trié")
+    parser.add_argument('--history-dir', default=HISTORY_DIR, metavar='DOSSIER',
+                        help=f"dossier de l'historique des KPI (défaut: {HISTORY_DIR})")
+    args = parser.parse_args()
+    check_sales_file(args.sales, 'bloom' if args.bloom else 'sorted', history_dir=args.history_dir)
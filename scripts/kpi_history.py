@@ -0,0 +1,195 @@
+import argparse
+import glob
+import importlib.util
+import os
+import sys
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from writers import atomic_write
+
+
+# HISTORIQUE DES KPI
+# ===================
+#
+# Chaque run ajoute ses KPI (format long: metrique, colonne, etat, valeur)
+# dans un fichier par run, rangé en partitions dataset=<nom>/date=<AAAA-MM-JJ>.
+# Le format est Parquet si pyarrow est installé, CSV sinon. Les requêtes de
+# tendance ne lisent que les partitions du dataset et de la période demandés,
+# et en Parquet seulement les colonnes et métriques utiles.
+
+HISTORY_DIR = "../data/history"
+
+# Colonne des métriques globales (non rattachées à une colonne de données)
+ALL_COLUMNS = "(tous)"
+
+# Par métrique: (sens, écart minimal signalé, dans l'unité de la métrique)
+# Sens: +1 = plus haut est meilleur, -1 = plus bas est meilleur,
+# 0 = tout écart important est suspect (volumes de mise à jour du catalogue)
+METRIC_RULES = {
+    # CRM: taux en points de pourcentage
+    'global_completeness_rate': (1, 1.0),
+    'completeness_per_column': (1, 1.0),
+    'missing_rate': (-1, 1.0),
+    'duplicate_rate': (-1, 0.5),
+    # CRM: comptes de lignes
+    'num_duplicates': (-1, 50),
+    'rule_failures': (-1, 50),
+    # Catalogue: SKU par source et par run
+    'total_sku': (1, 1),
+    'supprimes': (-1, 10),
+    'nouveaux': (0, 500),
+    'modifies': (0, 500),
+    # Ventes: lignes orphelines (comptes, puis taux en points de pourcentage)
+    'lignes_orphelines': (-1, 100),
+    'taux_orphelines': (-1, 0.5),
+}
+
+HISTORY_COLUMNS = ['run_id', 'run_at', 'dataset', 'etat', 'metrique', 'colonne', 'valeur']
+
+
+def history_format():
+
+    return 'parquet' if importlib.util.find_spec('pyarrow') is not None else 'csv'
+
+
+def kpi_records(kpi, etat):
+
+    # Dictionnaire produit par kpi_quality -> lignes (metrique, colonne, valeur)
+    rows = []
+    for metric in ('total_rows', 'total_columns', 'global_completeness_rate',
+                   'num_duplicates', 'duplicate_rate', 'missing_rate'):
+        if metric in kpi:
+            rows.append((metric, ALL_COLUMNS, kpi[metric]))
+    for column, rate in kpi.get('completeness_per_column', {}).items():
+        rows.append(('completeness_per_column', column, rate))
+    for rule, failures in kpi.get('rule_failures', {}).items():
+        rows.append(('rule_failures', rule, failures))
+
+    records = pd.DataFrame(rows, columns=['metrique', 'colonne', 'valeur'])
+    records.insert(0, 'etat', etat)
+    records['valeur'] = records['valeur'].astype(float)
+    return records
+
+
+class KpiHistory:
+    """Historique partitionné des KPI par dataset et date de run."""
+
+    def __init__(self, directory=HISTORY_DIR, file_format=None):
+        self.directory = directory
+        self.format = file_format or history_format()
+
+        # Format retenu affiché à l'ouverture (CSV: pyarrow absent, pas de filtre à la lecture)
+        reason = "" if file_format or self.format == 'parquet' else " (pyarrow absent)"
+        print(f"   Historique des KPI: {directory}, format {self.format}{reason}")
+
+    def append(self, dataset, records, run_at=None):
+
+        run_at = run_at or datetime.now()
+        run_id = f"{run_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+        frame = records.assign(run_id=run_id, run_at=run_at.isoformat(timespec='seconds'), dataset=dataset)
+        frame = frame[HISTORY_COLUMNS]
+
+        partition = os.path.join(self.directory, f"dataset={dataset}", f"date={run_at:%Y-%m-%d}")
+        path = os.path.join(partition, f"run-{run_id}.{self.format}")
+        if self.format == 'parquet':
+            atomic_write(path, lambda f: frame.to_parquet(f, index=False), binary=True)
+        else:
+            atomic_write(path, lambda f: frame.to_csv(f, index=False))
+        return path
+
+    def partitions(self, dataset, start=None, end=None):
+
+        # Élagage sur le chemin: seules les dates de la période sont ouvertes
+        pattern = os.path.join(self.directory, f"dataset={dataset}", "date=*")
+        selected = []
+        for partition in sorted(glob.glob(pattern)):
+            day = os.path.basename(partition).split('=', 1)[1]
+            if (start is None or day >= start) and (end is None or day <= end):
+                selected.append(partition)
+        return selected
+
+    def _read(self, path, metrics, columns):
+
+        if path.endswith('.parquet'):
+            filters = [('metrique', 'in', list(metrics))] if metrics else None
+            frame = pd.read_parquet(path, filters=filters)
+        else:
+            frame = pd.read_csv(path, dtype={'colonne': str, 'etat': str}, keep_default_na=False)
+            if metrics:
+                frame = frame[frame['metrique'].isin(metrics)]
+        if columns:
+            frame = frame[frame['colonne'].isin(columns)]
+        return frame
+
+    def load(self, dataset, start=None, end=None, metrics=None, columns=None):
+
+        files = []
+        for partition in self.partitions(dataset, start, end):
+            files += sorted(glob.glob(os.path.join(partition, "run-*.parquet")))
+            files += sorted(glob.glob(os.path.join(partition, "run-*.csv")))
+
+        frames = [self._read(path, metrics, columns) for path in files]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        history = pd.concat(frames, ignore_index=True)
+        history['valeur'] = history['valeur'].astype(float)
+        return history.sort_values(['run_at', 'metrique', 'colonne'], ignore_index=True)
+
+    def trend(self, dataset, metric, column=ALL_COLUMNS, etat='après', start=None, end=None):
+
+        # Une ligne par run: valeur et écart avec le run précédent
+        history = self.load(dataset, start, end, metrics=[metric], columns=[column])
+        history = history[history['etat'] == etat]
+        trend = history[['run_at', 'run_id', 'valeur']].reset_index(drop=True)
+        trend['ecart'] = trend['valeur'].diff()
+        return trend
+
+    def regressions(self, dataset, start=None, end=None, etat='après', threshold=None):
+
+        # Dégradations d'un run à l'autre, par métrique et par colonne
+        # (threshold remplace, s'il est fourni, les seuils de METRIC_RULES)
+        columns = ['run_at', 'run_id', 'metrique', 'colonne', 'precedent', 'valeur', 'ecart', 'seuil']
+        history = self.load(dataset, start, end, metrics=list(METRIC_RULES))
+        history = history[history['etat'] == etat].sort_values('run_at')
+        if history.empty:
+            return pd.DataFrame(columns=columns)
+
+        history['precedent'] = history.groupby(['metrique', 'colonne'])['valeur'].shift()
+        history['ecart'] = history['valeur'] - history['precedent']
+        direction = history['metrique'].map(lambda metric: METRIC_RULES[metric][0])
+        history['seuil'] = threshold if threshold is not None else \
+            history['metrique'].map(lambda metric: METRIC_RULES[metric][1])
+
+        # Sens 0: l'écart compte dans les deux sens
+        signed = (history['ecart'] * direction).where(direction != 0, -history['ecart'].abs())
+        worse = signed <= -history['seuil']
+        return history.loc[worse, columns].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tendances et régressions des KPI historisés")
+    parser.add_argument('action', choices=['trend', 'regressions'])
+    parser.add_argument('dataset', help="crm, catalog ou ventes")
+    parser.add_argument('metric', nargs='?', help="métrique suivie (trend)")
+    parser.add_argument('--colonne', default=ALL_COLUMNS)
+    parser.add_argument('--etat', default='après', choices=['avant', 'après'])
+    parser.add_argument('--depuis', help="date de début AAAA-MM-JJ")
+    parser.add_argument('--jusqu-a', dest='until', help="date de fin AAAA-MM-JJ")
+    parser.add_argument('--seuil', type=float, default=None,
+                        help="écart minimal commun à toutes les métriques (défaut: seuil propre à chaque métrique)")
+    args = parser.parse_args()
+
+    history = KpiHistory()
+    if args.action == 'trend':
+        if not args.metric:
+            parser.error("trend: métrique attendue")
+        result = history.trend(args.dataset, args.metric, args.colonne, args.etat, args.depuis, args.until)
+    else:
+        result = history.regressions(args.dataset, args.depuis, args.until, args.etat, args.seuil)
+    print(result.to_string(index=False) if not result.empty else " Aucun résultat")
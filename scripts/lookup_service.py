@@ -0,0 +1,254 @@
+import argparse
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from utils import normalize_email, PHONE_RULES
+
+
+# SERVICE LOCAL DE RECHERCHE CLIENTS
+# ===================================
+#
+# Le fichier clients nettoyé est chargé au démarrage dans des index mémoire
+# (dictionnaires par id / email / téléphone normalisé, liste triée pour les
+# préfixes de nom). Un thread surveille le fichier et reconstruit l'index
+# en arrière-plan quand une nouvelle version arrive; la bascule est un simple
+# remplacement de référence, les requêtes en cours finissent sur l'ancien index.
+#
+#   GET  /clients?id=42
+#   GET  /clients?email=user@gmail.com
+#   GET  /clients?telephone=0612345678&pays=France
+#   GET  /clients?nom=dup&limit=20
+#   POST /clients/batch   {"queries": [{"email": "..."}, {"id": "7"}]}
+#   GET  /health
+
+CLEAN_DATA_PATH = "../data/clean/clients_clean.csv"
+DEFAULT_PORT = 8765
+RELOAD_INTERVAL_SECONDS = 2.0
+DEFAULT_PREFIX_LIMIT = 20
+DEFAULT_PHONE_COUNTRY = "France"
+
+
+def _fold(text):
+
+    # Minuscules sans accents pour la recherche par préfixe
+    text = unicodedata.normalize('NFKD', str(text).strip().lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def phone_key(phone, country=DEFAULT_PHONE_COUNTRY):
+
+    # Même forme que telephone_normalise (+indicatif + numéro national)
+    raw = str(phone).strip()
+    digits = re.sub(r'\D', '', raw)
+    if digits.startswith('00'):
+        return '+' + digits[2:]
+    if raw.startswith('+'):
+        return '+' + digits
+    rule = PHONE_RULES.get(country)
+    if rule is None:
+        return None
+    if rule['trunk_zero'] and digits.startswith('0'):
+        digits = digits[1:]
+    if len(digits) not in rule['national_lengths']:
+        return None
+    return '+' + rule['prefix'] + digits
+
+
+def parse_limit(value):
+
+    # Nombre de résultats de la recherche par préfixe: entier strictement positif
+    # (texte pour les paramètres d'URL, nombre dans le JSON des lots)
+    if value is None or value == '':
+        return DEFAULT_PREFIX_LIMIT
+    limit = int(value) if isinstance(value, str) and re.fullmatch(r'\s*-?\d+\s*', value) else value
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        raise ValueError(f"limit doit être un entier strictement positif (reçu: {value!r})")
+    return limit
+
+
+class ClientIndex:
+    """Index mémoire en lecture seule sur une version du fichier clients."""
+
+    def __init__(self, path):
+        started = time.perf_counter()
+        self.path = path
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+
+        df = pd.read_csv(path, dtype=str)
+        df = df.astype(object).where(df.notna(), None)
+        self.records = df.to_dict('records')
+
+        self.by_id = {}
+        self.by_email = {}
+        self.by_phone = {}
+        names = []
+        for position, record in enumerate(self.records):
+            if record.get('id') is not None:
+                self.by_id[record['id']] = position
+            if record.get('email') is not None:
+                self.by_email.setdefault(record['email'].lower(), []).append(position)
+            if record.get('telephone_normalise') is not None:
+                self.by_phone.setdefault(record['telephone_normalise'], []).append(position)
+            full_name = ' '.join(part for part in (record.get('nom'), record.get('prenom')) if part)
+            if full_name:
+                names.append((_fold(full_name), position))
+
+        names.sort()
+        self.name_keys = [key for key, _ in names]
+        self.name_positions = [position for _, position in names]
+        self.loaded_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+
+    def _rows(self, positions):
+        return [self.records[p] for p in positions]
+
+    def by_name_prefix(self, prefix, limit=DEFAULT_PREFIX_LIMIT):
+
+        prefix = _fold(prefix)
+        start = bisect.bisect_left(self.name_keys, prefix)
+        end = bisect.bisect_right(self.name_keys, prefix + '\uffff', lo=start)
+        return self._rows(self.name_positions[start:min(end, start + limit)])
+
+    def lookup(self, query):
+
+        if not isinstance(query, dict):
+            raise ValueError("Requête attendue: objet JSON avec id, email, telephone ou nom")
+        if query.get('id') is not None:
+            position = self.by_id.get(str(query['id']))
+            return [] if position is None else [self.records[position]]
+        if query.get('email') is not None:
+            email = normalize_email(query['email'])
+            return self._rows(self.by_email.get(email, [])) if email else []
+        if query.get('telephone') is not None:
+            key = phone_key(query['telephone'], query.get('pays') or DEFAULT_PHONE_COUNTRY)
+            return self._rows(self.by_phone.get(key, [])) if key else []
+        if query.get('nom') is not None:
+            return self.by_name_prefix(query['nom'], parse_limit(query.get('limit')))
+        raise ValueError("Critère attendu: id, email, telephone ou nom")
+
+
+class ReloadingIndex:
+    """Détient l'index courant et le reconstruit quand le fichier change."""
+
+    def __init__(self, path, interval=RELOAD_INTERVAL_SECONDS):
+        self.path = path
+        self.interval = interval
+        self.current = ClientIndex(path)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name='reload', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+
+        while not self._stop.wait(self.interval):
+            try:
+                stat = os.stat(self.path)
+                if (stat.st_mtime_ns, stat.st_size) == self.current.signature:
+                    continue
+                # Construction hors verrou: les requêtes continuent sur l'ancien index
+                fresh = ClientIndex(self.path)
+                self.current = fresh
+                print(f" Index rechargé: {len(fresh.records)} clients en {fresh.build_seconds:.2f} s")
+            except Exception as e:
+                print(f" Rechargement ignoré: {e}")
+
+
+def make_handler(holder):
+
+    class LookupHandler(BaseHTTPRequestHandler):
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            index = holder.current
+            if url.path == '/health':
+                return self._send(200, {'clients': len(index.records), 'source': index.path,
+                                        'charge_le': index.loaded_at})
+            if url.path != '/clients':
+                return self._send(404, {'erreur': 'route inconnue'})
+
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            started = time.perf_counter()
+            try:
+                results = index.lookup(query)
+            except ValueError as e:
+                return self._send(400, {'erreur': str(e)})
+            self._send(200, {'resultats': results, 'duree_us': round((time.perf_counter() - started) * 1e6, 1)})
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/clients/batch':
+                return self._send(404, {'erreur': 'route inconnue'})
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                queries = json.loads(self.rfile.read(length))['queries']
+            except (ValueError, KeyError, TypeError):
+                queries = None
+            if not isinstance(queries, list):
+                return self._send(400, {'erreur': 'corps attendu: {"queries": [...]}'})
+
+            # Toutes les requêtes du lot sont servies par la même version de l'index
+            index = holder.current
+            started = time.perf_counter()
+            results = []
+            for query in queries:
+                # Une requête mal formée n'a que sa propre erreur, le reste du lot est servi
+                try:
+                    results.append(index.lookup(query))
+                except (ValueError, TypeError) as e:
+                    results.append({'erreur': str(e)})
+            self._send(200, {'resultats': results, 'duree_us': round((time.perf_counter() - started) * 1e6, 1)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return LookupHandler
+
+
+def serve(path=CLEAN_DATA_PATH, host='127.0.0.1', port=DEFAULT_PORT):
+
+    holder = ReloadingIndex(path)
+    print(f" Index chargé: {len(holder.current.records)} clients en {holder.current.build_seconds:.2f} s")
+    holder.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(holder))
+    print(f" Service de recherche clients: http://{host}:{port}/clients")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        holder.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service local de recherche clients")
+    parser.add_argument('--path', default=CLEAN_DATA_PATH)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    serve(args.path, args.host, args.port)
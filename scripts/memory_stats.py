@@ -0,0 +1,112 @@
+import contextlib
+import resource
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# MESURE DES COPIES MÉMOIRE
+# ==========================
+#
+# Pour chaque étape, les tampons mémoire des colonnes sont comparés avant et
+# après: un tampon absent avant l'étape a été matérialisé par celle-ci. Les
+# octets comptés sont ceux des tableaux de colonnes (pointeurs pour les
+# chaînes Python, pas le contenu des chaînes elles-mêmes). Les colonnes
+# Arrow (chaînes de pandas 3 avec pyarrow) sont suivies par leurs tampons
+# Arrow: validité, offsets et données. La taille de la frame, elle, est
+# mesurée en profondeur (contenu des chaînes compris), comme l'entrée et la
+# sortie du run: c'est l'empreinte réelle à laquelle comparer les copies.
+
+def pandas_major_version():
+
+    return int(pd.__version__.split('.')[0])
+
+
+def copy_on_write_enabled():
+
+    if pandas_major_version() >= 3:
+        return True
+    return bool(pd.get_option('mode.copy_on_write'))
+
+
+@contextlib.contextmanager
+def copy_on_write(enabled=True):
+
+    # Copy-on-write limité au bloc, sans toucher l'option globale du processus
+    # (toujours actif à partir de pandas 3, où l'option est dépréciée)
+    if not enabled or pandas_major_version() >= 3:
+        yield copy_on_write_enabled()
+        return
+    with pd.option_context('mode.copy_on_write', True):
+        yield True
+
+
+def _array_buffers(array):
+
+    # Tableaux Arrow: tampons de chaque morceau (les tranches partagent ceux de leur parent)
+    chunked = getattr(array, '_pa_array', None)
+    if chunked is not None:
+        for chunk in chunked.chunks:
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    yield buffer.address, buffer.size
+        return
+
+    # Tableaux NumPy: données simples, codes des catégories, valeurs + masque des types nullables
+    found = False
+    for attribute in ('_ndarray', '_data', '_mask'):
+        values = getattr(array, attribute, None)
+        if isinstance(values, np.ndarray):
+            found = True
+            yield values.__array_interface__['data'][0], values.nbytes
+    if not found:
+        # Stockage inconnu: suivi par identité du tableau (toute nouvelle instance compte comme copie)
+        yield ('objet', id(array)), int(array.nbytes)
+
+
+def _column_buffers(df):
+
+    buffers = {}
+    for position in range(df.shape[1]):
+        buffers.update(_array_buffers(df.iloc[:, position].array))
+    return buffers
+
+
+def peak_rss_bytes():
+
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class CopyTracker:
+    """Octets matérialisés par chaque étape d'une chaîne de traitement."""
+
+    def __init__(self):
+        self.stages = []
+        self._before = None
+
+    def start(self, df):
+        self._before = set(_column_buffers(df))
+
+    def stop(self, name, df):
+
+        after = _column_buffers(df)
+        copied = sum(nbytes for address, nbytes in after.items() if address not in self._before)
+        self.stages.append({
+            'etape': name,
+            'octets_copies': copied,
+            'octets_frame': int(df.memory_usage(index=True, deep=True).sum()),
+            'pic_rss': peak_rss_bytes(),
+        })
+        return copied
+
+    def report(self):
+
+        print(f"\n {'Étape':<14}{'Copié (Mo)':>12}{'Frame (Mo)':>12}{'Pic RSS (Mo)':>14}")
+        for stage in self.stages:
+            print(f" {stage['etape']:<14}{stage['octets_copies'] / 1e6:>12.1f}"
+                  f"{stage['octets_frame'] / 1e6:>12.1f}{stage['pic_rss'] / 1e6:>14.1f}")
+        total = sum(stage['octets_copies'] for stage in self.stages)
+        print(f" {'Total':<14}{total / 1e6:>12.1f}")
@@ -0,0 +1,317 @@
+import argparse
+import contextlib
+import io
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from crm import CLIENT_DTYPES, RAW_DATA_PATH, RULES_PATH, cleaning_stages, dedup_key_columns
+from readers import compression_of, read_csv_input, resolve_input, sample_csv_blocks, BlockSample
+from utils import kpi_quality, normalize_country_series
+from validation import RuleSet
+from writers import atomic_write_csv
+
+
+# APERÇU RAPIDE D'UN NOUVEL EXPORT
+# =================================
+#
+# Des blocs tirés au hasard dans clients.csv (sans analyser le reste du
+# fichier) servent de pilote; un échantillon stratifié par pays et par motif
+# de champs manquants y est prélevé, puis passe par toute la chaîne de
+# nettoyage. Les KPI, le taux de dédoublonnage, la durée et la mémoire du run
+# complet sont extrapolés avec des intervalles de confiance à 95 %.
+#
+# Le taux de doublons observé sur un échantillon ne s'extrapole pas
+# directement (une paire n'est vue que si ses deux lignes sont tirées): le
+# nombre de clés distinctes du fichier est estimé à partir des fréquences des
+# clés dans l'échantillon, l'intervalle à partir de demi-échantillons
+# aléatoires. En dessous d'environ 10 % du fichier, les groupes de doublons
+# sont trop rarement vus: l'intervalle s'élargit en conséquence.
+
+PREVIEW_REPORT_PATH = "../data/reports/apercu_clients.csv"
+
+PILOT_BYTES = 4 * 1024 * 1024
+SAMPLE_ROWS = 5_000
+Z_95 = 1.96
+
+# Nombre de demi-échantillons pour l'intervalle des taux de doublons
+HALF_SAMPLES = 30
+
+# Tailles relatives des passes de mesure (durée et mémoire en fonction du nombre de lignes)
+MEASURE_FRACTIONS = (0.125, 0.25, 0.5, 1.0)
+
+# Quantiles de Student à 97,5 % selon le nombre de degrés de liberté
+# (au-delà: développement de Cornish-Fisher, voir t_95)
+T_95 = {1: 12.71, 2: 4.30, 3: 3.18, 4: 2.78, 5: 2.57, 6: 2.45, 7: 2.36, 8: 2.31, 9: 2.26, 10: 2.23}
+
+
+# ÉCHANTILLONNAGE
+# ================
+
+def read_pilot(path, pilot_bytes=PILOT_BYTES, seed=None):
+
+    if not compression_of(path):
+        return sample_csv_blocks(path, pilot_bytes, seed=seed, dtype=CLIENT_DTYPES)
+
+    # Une entrée compressée ne se lit pas par blocs: lecture complète en flux
+    print("   Entrée compressée: lecture complète (pas d'accès direct par blocs)")
+    df = read_csv_input(path, dtype=CLIENT_DTYPES)
+    return BlockSample(df, np.array([len(df)]), np.array([1]), 1, 1)
+
+
+def strata_of(df):
+
+    # Strate = pays normalisé x motif des champs manquants (un bit par colonne)
+    country = normalize_country_series(df['pays']).fillna('(vide)') if 'pays' in df.columns \
+        else pd.Series('(tous)', index=df.index)
+    pattern = df.isna().to_numpy() @ (1 << np.arange(df.shape[1], dtype=np.int64))
+    return country.astype(str) + '|' + pd.Series(pattern, index=df.index).astype(str)
+
+
+def stratified_sample(df, strata, n_rows, rng):
+
+    if n_rows >= len(df):
+        return df
+
+    # Allocation proportionnelle, au moins une ligne par strate présente
+    counts = strata.value_counts()
+    quotas = np.ceil(counts * n_rows / len(df)).astype(int)
+    shuffled = rng.permutation(len(df))
+    ranks = strata.iloc[shuffled].groupby(strata.iloc[shuffled]).cumcount()
+    keep = ranks.to_numpy() < strata.iloc[shuffled].map(quotas).to_numpy()
+    return df.iloc[np.sort(shuffled[keep])]
+
+
+# INTERVALLES DE CONFIANCE
+# =========================
+
+def t_95(dof):
+
+    # Quantile de Student à 97,5 %: table, puis approximation (erreur < 0,01 au-delà de 10)
+    if dof in T_95:
+        return T_95[dof]
+    z = Z_95
+    return z + (z ** 3 + z) / (4 * dof) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+
+
+def estimate_rows(pilot):
+
+    # Estimateur par ratio lignes / octets sur les blocs tirés (un par tranche)
+    lines, sizes, weights = pilot.block_lines, pilot.block_sizes, pilot.block_weights
+    ratio = pilot.lines_per_byte
+    estimate = pilot.data_bytes * ratio
+    k = len(lines)
+    if pilot.complete or k < 2:
+        return estimate, estimate, estimate
+
+    # Un seul bloc par tranche: variance par tranches voisines regroupées deux à deux
+    # (prudente quand la densité des lignes dérive le long du fichier), avec
+    # correction de population finie par tranche et quantile de Student
+    residuals = weights * (lines - ratio * sizes)
+    finite = 1 - 1 / weights
+    pairs = k // 2
+    differences = residuals[0:2 * pairs:2] - residuals[1:2 * pairs:2]
+    corrections = (finite[0:2 * pairs:2] + finite[1:2 * pairs:2]) / 2
+    variance = (corrections * differences ** 2).sum() * k / (2 * pairs)
+    margin = t_95(pairs) * pilot.data_bytes / (weights * sizes).sum() * math.sqrt(variance)
+    return estimate, estimate - margin, estimate + margin
+
+
+def proportion_interval(successes, n):
+
+    # Intervalle de Wilson, en pourcentage
+    if n == 0:
+        return 0.0, 0.0, 100.0
+    p = successes / n
+    denominator = 1 + Z_95 ** 2 / n
+    center = (p + Z_95 ** 2 / (2 * n)) / denominator
+    margin = Z_95 * math.sqrt(p * (1 - p) / n + Z_95 ** 2 / (4 * n ** 2)) / denominator
+    return p * 100, max(center - margin, 0) * 100, min(center + margin, 1) * 100
+
+
+def mean_interval(values):
+
+    values = np.asarray(values, dtype=float)
+    mean = values.mean()
+    margin = Z_95 * values.std(ddof=1) / math.sqrt(len(values)) if len(values) > 1 else 0.0
+    return mean, mean - margin, mean + margin
+
+
+def estimate_distinct_keys(codes, fraction):
+
+    # Nombre de clés distinctes du fichier, vu les fréquences des clés tirées
+    counts = np.bincount(codes)
+    counts = counts[counts > 0]
+    if fraction >= 1:
+        return float(len(counts))
+
+    # Clés vues 3 fois ou plus: groupes de taille ~ j / f, pondérés par
+    # l'inverse de leur probabilité d'être vus au moins 3 fois (loi de Poisson)
+    seen = counts[counts >= 3].astype(float)
+    absent = np.exp(-seen)
+    weights = 1 / (1 - absent * (1 + seen + seen ** 2 / 2))
+    big_once = (weights * seen * absent).sum()
+    big_twice = (weights * seen ** 2 / 2 * absent).sum()
+
+    # Le reste des clés vues 2 fois: des paires; le reste des clés vues 1 fois: des clés uniques
+    pairs = max((counts == 2).sum() - big_twice, 0) / fraction ** 2
+    singles = max((counts == 1).sum() - big_once - 2 * pairs * fraction * (1 - fraction), 0) / fraction
+    return singles + pairs + weights.sum()
+
+
+def duplicate_rate_interval(codes, fraction, rng, half_samples=HALF_SAMPLES):
+
+    # Taux de doublons du fichier = 1 - clés distinctes / lignes, en pourcentage
+    codes = np.asarray(codes)
+    n = len(codes)
+    if n == 0:
+        return 0.0, 0.0, 0.0
+    rate = 1 - estimate_distinct_keys(codes, fraction) * fraction / n
+    if fraction >= 1 or n < 4:
+        return rate * 100, rate * 100, rate * 100
+
+    # Demi-échantillons: variance environ double de celle de l'échantillon complet
+    half_rates = []
+    for _ in range(half_samples):
+        half = codes[rng.permutation(n)[:n // 2]]
+        half_fraction = fraction * len(half) / n
+        half_rates.append(1 - estimate_distinct_keys(half, half_fraction) * half_fraction / len(half))
+    margin = Z_95 * np.std(half_rates, ddof=1) / math.sqrt(2)
+    clip = lambda value: min(max(value, 0.0), 1.0) * 100
+    return clip(rate), clip(rate - margin), clip(rate + margin)
+
+
+def linear_projection(xs, ys, x_new):
+
+    # Régression y = a + b.x et intervalle de prédiction en x_new
+    xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+    slope, intercept = np.polyfit(xs, ys, 1)
+    predicted = intercept + slope * x_new
+    dof = len(xs) - 2
+    if dof < 1:
+        return predicted, predicted, predicted
+
+    residual = ys - (intercept + slope * xs)
+    sigma = math.sqrt((residual ** 2).sum() / dof)
+    spread = ((xs - xs.mean()) ** 2).sum()
+    margin = t_95(dof) * sigma * math.sqrt(1 + 1 / len(xs) + (x_new - xs.mean()) ** 2 / spread)
+    return predicted, max(predicted - margin, 0.0), predicted + margin
+
+
+# CHAÎNE DE NETTOYAGE SUR L'ÉCHANTILLON
+# ======================================
+
+def run_chain(df, rules):
+
+    # Mêmes étapes que crm.main, sans affichage ni écriture
+    with contextlib.redirect_stdout(io.StringIO()):
+        kpi_before = kpi_quality(df, "Aperçu (AVANT)", rules)
+        df_clean = df.copy()
+        before_dedup = df_clean
+        for name, stage in cleaning_stages(rules):
+            if name == 'doublons':
+                before_dedup = df_clean
+            df_clean = stage(df_clean)
+        kpi_after = kpi_quality(df_clean, "Aperçu (APRÈS)", rules)
+    return kpi_before, kpi_after, before_dedup
+
+
+def measure_chain(sample, rules, rng, fractions=MEASURE_FRACTIONS):
+
+    # Durée puis pic mémoire (tracemalloc, passe séparée) pour plusieurs tailles
+    sizes, seconds, peaks = [], [], []
+    for fraction in fractions:
+        subset = sample.iloc[np.sort(rng.permutation(len(sample))[:max(int(len(sample) * fraction), 1)])]
+        started = time.perf_counter()
+        run_chain(subset, rules)
+        seconds.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        run_chain(subset, rules)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        sizes.append(len(subset))
+    return sizes, seconds, peaks
+
+
+# APERÇU
+# =======
+
+def preview(path=RAW_DATA_PATH, sample_rows=SAMPLE_ROWS, pilot_bytes=PILOT_BYTES, seed=None):
+
+    path = resolve_input(path)
+    rng = np.random.default_rng(seed)
+    rules = RuleSet.from_file(RULES_PATH)
+
+    print(f"\n Aperçu de {path} ({os.path.getsize(path) / 1e6:.1f} Mo)")
+    started = time.perf_counter()
+    pilot = read_pilot(path, pilot_bytes, seed)
+    read_seconds = time.perf_counter() - started
+
+    rows, rows_low, rows_high = estimate_rows(pilot)
+    sample = stratified_sample(pilot.df, strata_of(pilot.df), sample_rows, rng)
+    fraction = len(sample) / rows if rows else 1.0
+    print(f"   Pilote: {len(pilot.df)} lignes, échantillon stratifié: {len(sample)} lignes "
+          f"(fraction {fraction:.2%})")
+
+    kpi_before, kpi_after, before_dedup = run_chain(sample, rules)
+    n = len(sample)
+
+    estimates = [('Nombre de lignes', rows, rows_low, rows_high)]
+
+    # Complétude: moyenne par ligne de la part de cellules renseignées
+    completeness = mean_interval(sample.notna().mean(axis=1) * 100)
+    estimates.append(('Taux de complétude global avant (%)', *completeness))
+    estimates.append(('Taux de valeurs manquantes avant (%)',
+                      100 - completeness[0], 100 - completeness[2], 100 - completeness[1]))
+    row_codes = pd.factorize(pd.util.hash_pandas_object(sample, index=False))[0]
+    estimates.append(('Taux de doublons exacts avant (%)', *duplicate_rate_interval(row_codes, fraction, rng)))
+
+    for rule, failures in kpi_before.get('rule_failures', {}).items():
+        estimates.append((f'Règle {rule} avant (% échecs)', *proportion_interval(failures, n)))
+
+    # Clés de dédoublonnage telles que les voit l'étape 'doublons'
+    key_columns = dedup_key_columns(before_dedup)
+    key_codes = before_dedup.groupby(key_columns, dropna=False, sort=False).ngroup().to_numpy() \
+        if key_columns else np.arange(len(before_dedup))
+    dedup = duplicate_rate_interval(key_codes, fraction, rng)
+    estimates.append(('Taux de dédoublonnage (%)', *dedup))
+    estimates.append(('Lignes après nettoyage',
+                      rows * (1 - dedup[0] / 100), rows_low * (1 - dedup[2] / 100), rows_high * (1 - dedup[1] / 100)))
+    estimates.append(('Taux de complétude global après (%)', kpi_after['global_completeness_rate'], None, None))
+
+    # Durée et mémoire du run complet, extrapolées en fonction du nombre de lignes
+    sizes, seconds, peaks = measure_chain(sample, rules, rng)
+    duration = linear_projection(sizes, seconds, rows)
+    read_full = read_seconds * os.path.getsize(path) / max(pilot_bytes, 1) if not pilot.complete else read_seconds
+    estimates.append(('Durée du nettoyage (s)', *duration))
+    estimates.append(('Durée de lecture estimée (s)', read_full, None, None))
+    peak = linear_projection(sizes, np.asarray(peaks) / 1e6, rows)
+    estimates.append(('Mémoire de pointe du nettoyage (Mo)', *peak))
+
+    report = pd.DataFrame(estimates, columns=['Métrique', 'Estimation', 'Borne basse (95%)', 'Borne haute (95%)'])
+    report[['Estimation', 'Borne basse (95%)', 'Borne haute (95%)']] = \
+        report[['Estimation', 'Borne basse (95%)', 'Borne haute (95%)']].astype(float).round(2)
+    atomic_write_csv(report, PREVIEW_REPORT_PATH, index=False)
+
+    print(f"\n PROJECTION SUR LE FICHIER COMPLET:")
+    print(report.to_string(index=False))
+    print(f"\n   Aperçu calculé en {time.perf_counter() - started:.1f} s: {PREVIEW_REPORT_PATH}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aperçu rapide de la qualité d'un export clients")
+    parser.add_argument('path', nargs='?', default=RAW_DATA_PATH)
+    parser.add_argument('--rows', type=int, default=SAMPLE_ROWS, help="taille de l'échantillon stratifié")
+    parser.add_argument('--pilot-mb', type=float, default=PILOT_BYTES / 1024 / 1024,
+                        help="volume lu par blocs aléatoires pour le pilote (Mo)")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    preview(args.path, args.rows, int(args.pilot_mb * 1024 * 1024), args.seed)
@@ -0,0 +1,187 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from writers import atomic_write_csv
+from readers import compression_of, estimate_row_bytes, sample_csv_blocks, DecompressionStats, ThreadedDecompressor
+
+
+# PROFILAGE DES COLONNES BRUTES
+# ==============================
+#
+# Profil de chaque colonne en une passe vectorisée: répartition des types,
+# histogramme des longueurs, valeurs les plus fréquentes et "formes" des
+# valeurs (chiffres -> 9, lettres -> a, ponctuation conservée), par exemple
+# 0999999999 pour un téléphone ou aaaa9@aaaa.aaa pour un email. La seule
+# passe sur les lignes compte les valeurs distinctes; types, longueurs et
+# formes sont calculés sur ces valeurs, pondérées par leur nombre.
+
+RAW_DATA_PATH = "../data/raw/clients.csv"
+PROFILE_REPORT_PATH = "../data/reports/profil_clients.csv"
+
+# Au-delà de cette taille (décompressée), le profil est calculé sur un échantillon aléatoire
+SAMPLE_THRESHOLD_BYTES = 64 * 1024 * 1024
+SAMPLE_ROWS = 200_000
+TOP_N = 10
+
+# Lignes par morceau pour l'échantillon des fichiers compressés
+SAMPLE_CHUNK_ROWS = 500_000
+
+# Motifs testés dans l'ordre: la première correspondance donne le type
+TYPE_PATTERNS = [
+    ('entier', r'[+-]?\d+'),
+    ('decimal', r'[+-]?\d*[.,]\d+'),
+    ('date', r'\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}'),
+    ('email', r'[^@\s]+@[^@\s]+\.[^@\s]+'),
+]
+
+
+def reservoir_sample(path, sample_rows, seed=0, chunksize=SAMPLE_CHUNK_ROWS, threshold_bytes=0, **options):
+
+    # Échantillon uniforme en une passe par morceaux: clé aléatoire par ligne,
+    # on garde les sample_rows plus petites (mémoire: échantillon + un morceau).
+    # Tant que le volume décompressé reste sous threshold_bytes, toutes les
+    # lignes sont gardées: un petit export compressé est profilé en entier.
+    rng = np.random.default_rng(seed)
+    stats = DecompressionStats()
+    kept = []
+    total = 0
+    with ThreadedDecompressor(path, stats) as stream:
+        with pd.read_csv(stream, chunksize=chunksize, **options) as reader:
+            for chunk in reader:
+                total += len(chunk)
+                kept.append(chunk.assign(_cle=rng.random(len(chunk))))
+                if stats.decompressed_bytes > threshold_bytes:
+                    kept = [pd.concat(kept).nsmallest(sample_rows, '_cle')]
+
+    if not kept:
+        return pd.read_csv(path, nrows=0, **options), 0
+    df = pd.concat(kept).sort_index().drop(columns='_cle').reset_index(drop=True)
+    return df, total
+
+
+def read_profile_input(path, sample_rows=SAMPLE_ROWS, threshold_bytes=SAMPLE_THRESHOLD_BYTES, seed=0):
+
+    # Tout est lu en texte brut: on profile les valeurs telles qu'elles arrivent
+    options = dict(dtype=str, keep_default_na=False)
+
+    # Fichier compressé: pas d'accès direct aux octets, ni de taille décompressée
+    # connue d'avance: échantillon par réservoir, seuil appliqué au volume décompressé
+    if compression_of(path):
+        df, total = reservoir_sample(path, sample_rows, seed, threshold_bytes=threshold_bytes, **options)
+        return df, total, len(df) < total
+
+    if os.path.getsize(path) <= threshold_bytes:
+        df = pd.read_csv(path, **options)
+        return df, len(df), False
+
+    # Blocs tirés au hasard dans le fichier projeté: le reste n'est jamais analysé
+    sample = sample_csv_blocks(path, sample_rows * estimate_row_bytes(path), seed=seed, **options)
+    total = int(round(sample.data_bytes * sample.lines_per_byte))
+    return sample.df, total, True
+
+
+def value_shapes(values):
+
+    shapes = values.str.replace(r'\d', '9', regex=True)
+    return shapes.str.replace(r'[^\W\d_]', 'a', regex=True)
+
+
+def value_types(values):
+
+    stripped = values.str.strip()
+    types = pd.Series('texte', index=values.index, dtype=object)
+    undecided = stripped != ''
+    types[~undecided] = 'vide'
+
+    for name, pattern in TYPE_PATTERNS:
+        matched = undecided & stripped.str.fullmatch(pattern)
+        types[matched] = name
+        undecided &= ~matched
+
+    return types
+
+
+def _frequency_rows(column, measure, counts, total):
+
+    return pd.DataFrame({
+        'colonne': column,
+        'mesure': measure,
+        'valeur': counts.index.astype(str),
+        'nombre': counts.values,
+        'part_pct': (counts.values / total * 100).round(2) if total else 0.0,
+    })
+
+
+def profile_column(name, values, top_n=TOP_N):
+
+    # Seule passe sur les lignes: nombre d'occurrences de chaque valeur distincte
+    # (dans l'ordre de première apparition, comme value_counts à égalité)
+    counts = values.value_counts(sort=False)
+    distinct = pd.Series(counts.index.astype(str), index=counts.index, dtype=object)
+    total = int(counts.sum())
+
+    filled = (distinct.str.strip() != '').to_numpy()
+    filled_counts = counts[filled]
+    lengths = distinct[filled].str.len()
+
+    def weighted(keys, weights):
+        return weights.groupby(keys.to_numpy(), sort=False).sum().sort_values(ascending=False, kind='stable')
+
+    summary = pd.Series({
+        'lignes': total,
+        'vides': total - int(filled_counts.sum()),
+        'distinctes': len(filled_counts),
+        'longueur_min': lengths.min() if len(lengths) else 0,
+        'longueur_max': lengths.max() if len(lengths) else 0,
+    })
+
+    # Seul le taux de vides a un sens en part des lignes dans le résumé
+    summary_rows = _frequency_rows(name, 'resume', summary, total)
+    summary_rows.loc[summary_rows['valeur'] != 'vides', 'part_pct'] = np.nan
+
+    return pd.concat([
+        summary_rows,
+        _frequency_rows(name, 'type', weighted(value_types(distinct), counts), total),
+        _frequency_rows(name, 'longueur', weighted(lengths, filled_counts).sort_index(), total),
+        _frequency_rows(name, 'top_valeur', filled_counts.sort_values(ascending=False, kind='stable').head(top_n), total),
+        _frequency_rows(name, 'forme', weighted(value_shapes(distinct[filled]), filled_counts).head(top_n), total),
+    ], ignore_index=True)
+
+
+def profile_dataframe(df, top_n=TOP_N):
+
+    return pd.concat([profile_column(col, df[col].astype(str), top_n) for col in df.columns],
+                     ignore_index=True)
+
+
+def profile_file(path=RAW_DATA_PATH, report_path=PROFILE_REPORT_PATH, sample_rows=SAMPLE_ROWS):
+
+    print(f"\n Profilage de {path}...")
+    df, total_rows, sampled = read_profile_input(path, sample_rows)
+    if sampled:
+        print(f"   Échantillon: {len(df)} lignes sur ~{total_rows} estimées")
+    else:
+        print(f"   {len(df)} lignes profilées")
+
+    profile = profile_dataframe(df)
+    profile.insert(0, 'echantillon', sampled)
+    atomic_write_csv(profile, report_path, index=False)
+    print(f"   Profil sauvegardé: {report_path}")
+
+    # Aperçu console: forme dominante et taux de vides par colonne
+    for col in df.columns:
+        rows = profile[profile['colonne'] == col]
+        empty = rows[(rows['mesure'] == 'resume') & (rows['valeur'] == 'vides')]['part_pct'].iloc[0]
+        shapes = rows[rows['mesure'] == 'forme']
+        top_shape = f"{shapes['valeur'].iloc[0]} ({shapes['part_pct'].iloc[0]}%)" if len(shapes) else "-"
+        print(f"   {col}: {empty}% vides, forme dominante {top_shape}")
+
+    return profile
+
+
+if __name__ == "__main__":
+    profile_file(sys.argv[1] if len(sys.argv) > 1 else RAW_DATA_PATH)
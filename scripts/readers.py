@@ -0,0 +1,509 @@
+import bz2
+import gzip
+import io
+import mmap
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# LECTURE PARALLÈLE DES CSV BRUTS
+# ================================
+#
+# Le fichier est projeté en mémoire (mmap), découpé en plages d'octets
+# alignées sur les fins de ligne, puis chaque plage est analysée par un
+# processus distinct. Un champ entre guillemets contenant un retour à la
+# ligne rendrait ce découpage faux: il est détecté (parité des guillemets
+# à chaque fin de ligne) et le fichier est alors lu par un seul processus.
+#
+# Chaque plage infère ses propres types; en lecture complète, les colonnes
+# dont le type diffère d'une plage à l'autre sont harmonisées comme le
+# ferait un seul read_csv (numériques en float64, sinon relues en texte).
+#
+# En lecture découpée (iter_csv_chunks), les plages sont dimensionnées sur la
+# taille de morceau demandée et seules quelques-unes sont en cours d'analyse
+# à la fois: la mémoire dépend du nombre de cœurs, pas de la taille du fichier.
+# Comme avec read_csv(chunksize=...), les types sont inférés par morceau.
+
+# En dessous de cette taille par partition, le coût des processus dépasse le gain
+MIN_PARTITION_BYTES = 8 * 1024 * 1024
+
+# Octets lus en tête de fichier pour estimer la taille moyenne d'une ligne
+ROW_SIZE_PROBE_BYTES = 1024 * 1024
+
+# Taille des blocs parcourus pour détecter les retours à la ligne entre guillemets
+QUOTE_SCAN_BYTES = 16 * 1024 * 1024
+
+
+class _MmapRange(io.RawIOBase):
+    """Flux binaire en lecture seule sur une plage d'un mmap, sans copie intermédiaire."""
+
+    def __init__(self, mm, start, end):
+        self._view = memoryview(mm)[start:end]
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), len(self._view) - self._pos)
+        buffer[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+def _read_header(mm):
+
+    end = mm.find(b'\n')
+    if end == -1:
+        end = len(mm)
+    header = pd.read_csv(io.BytesIO(mm[:end + 1]), nrows=0)
+    return list(header.columns), end + 1
+
+
+def _line_aligned_ranges(mm, start, n_parts=None, step=None):
+
+    # Découpage en n_parts plages, ou en plages d'environ step octets
+    size = len(mm)
+    step = step or max((size - start) // n_parts, 1)
+    ranges = []
+
+    while start < size:
+        # Avancer la borne jusqu'à la fin de ligne suivante
+        end = start + step
+        if end >= size:
+            end = size
+        else:
+            newline = mm.find(b'\n', end)
+            end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+
+    return ranges
+
+
+def _has_quoted_newlines(mm, start):
+
+    # Une fin de ligne précédée d'un nombre impair de guillemets est dans un champ
+    # (les guillemets doublés "" comptent pour deux et ne changent pas la parité)
+    if mm.find(b'"', start) == -1:
+        return False
+    parity = 0
+    for offset in range(start, len(mm), QUOTE_SCAN_BYTES):
+        block = np.frombuffer(mm, dtype=np.uint8, count=min(QUOTE_SCAN_BYTES, len(mm) - offset), offset=offset)
+        quotes = np.flatnonzero(block == ord('"'))
+        newlines = np.flatnonzero(block == ord('\n'))
+        del block
+        inside = (np.searchsorted(quotes, newlines) + parity) % 2 == 1
+        if inside.any():
+            return True
+        parity = (parity + len(quotes)) % 2
+    return False
+
+
+def _parse_range(path, start, end, columns, dtype):
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with _MmapRange(mm, start, end) as stream:
+                return pd.read_csv(stream, header=None, names=columns, dtype=dtype)
+
+
+def plan_partitions(path, n_workers=None, min_partition_bytes=MIN_PARTITION_BYTES, partition_bytes=None):
+
+    n_workers = n_workers or os.cpu_count() or 1
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            columns, data_start = _read_header(mm)
+            if partition_bytes:
+                step = max(partition_bytes, min_partition_bytes)
+                ranges = _line_aligned_ranges(mm, data_start, step=step) if len(mm) - data_start > step else []
+            else:
+                n_parts = min(n_workers, max((len(mm) - data_start) // min_partition_bytes, 1))
+                ranges = _line_aligned_ranges(mm, data_start, n_parts)
+
+            # Retours à la ligne entre guillemets: pas de découpage, lecture d'un seul tenant
+            if len(ranges) > 1 and _has_quoted_newlines(mm, data_start):
+                ranges = []
+
+    return columns, ranges
+
+
+def estimate_row_bytes(path, probe_bytes=ROW_SIZE_PROBE_BYTES):
+
+    # Taille moyenne d'une ligne de données, mesurée sur le début du fichier
+    with open(path, 'rb') as f:
+        head = f.read(probe_bytes)
+    lines = head.split(b'\n')[1:-1] or head.split(b'\n')[:1]
+    return max(sum(len(line) + 1 for line in lines) // len(lines), 1)
+
+
+def iter_csv_partitions(path, n_workers=None, dtype=None, min_partition_bytes=MIN_PARTITION_BYTES,
+                        partition_bytes=None, max_in_flight=None):
+    """Produit les partitions du CSV dans l'ordre du fichier, au fil de leur analyse."""
+
+    n_workers = n_workers or os.cpu_count() or 1
+    columns, ranges = plan_partitions(path, n_workers, min_partition_bytes, partition_bytes)
+
+    # Petit fichier (ou non découpable): un seul processus, en flux si la taille des plages est imposée
+    if len(ranges) <= 1:
+        if partition_bytes:
+            rows = max(partition_bytes // estimate_row_bytes(path), 1)
+            with pd.read_csv(path, dtype=dtype, chunksize=rows) as reader:
+                yield from reader
+        else:
+            yield pd.read_csv(path, dtype=dtype)
+        return
+
+    # Fenêtre glissante: une plage n'est soumise que lorsqu'une place se libère
+    max_in_flight = max_in_flight or n_workers
+    pending = deque(ranges)
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(ranges))) as executor:
+        in_flight = deque()
+        while pending or in_flight:
+            while pending and len(in_flight) < max_in_flight:
+                start, end = pending.popleft()
+                in_flight.append(executor.submit(_parse_range, path, start, end, columns, dtype))
+            yield in_flight.popleft().result()
+
+
+def _is_text(dtype):
+
+    return pd.api.types.is_string_dtype(dtype) or pd.api.types.is_object_dtype(dtype)
+
+
+def _boolean_or_empty(values):
+
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return True
+    present = values.dropna()
+    return present.empty or (pd.api.types.is_object_dtype(values.dtype)
+                             and present.map(lambda value: isinstance(value, bool)).all())
+
+
+def _dtype_conflicts(partitions, dtype):
+
+    # Colonnes non forcées dont le type inféré diffère d'une plage à l'autre:
+    # conversions applicables telles quelles, et colonnes à relire en texte
+    if dtype is not None and not isinstance(dtype, dict):
+        return {}, []
+    casts, text = {}, []
+    for column in partitions[0].columns:
+        if dtype and column in dtype:
+            continue
+        dtypes = [p[column].dtype for p in partitions]
+        if len(set(dtypes)) == 1:
+            continue
+        if all(pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t) for t in dtypes):
+            casts[column] = 'float64'
+        elif all(_boolean_or_empty(p[column]) for p in partitions):
+            # Booléens et plages vides: objets, comme True/False/NaN dans un seul read_csv
+            casts[column] = object
+        else:
+            text.append(column)
+    return casts, text
+
+
+def read_csv_parallel(path, n_workers=None, dtype=None, min_partition_bytes=MIN_PARTITION_BYTES):
+
+    n_workers = n_workers or os.cpu_count() or 1
+    columns, ranges = plan_partitions(path, n_workers, min_partition_bytes)
+    if len(ranges) <= 1:
+        return pd.read_csv(path, dtype=dtype)
+
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(ranges))) as executor:
+        futures = [executor.submit(_parse_range, path, start, end, columns, dtype) for start, end in ranges]
+        partitions = [future.result() for future in futures]
+
+        # Une colonne vide ou numérique dans une plage mais textuelle dans une autre:
+        # seules les plages concernées sont relues avec cette colonne en texte
+        casts, text = _dtype_conflicts(partitions, dtype)
+        if text:
+            forced = {**(dtype or {}), **{column: str for column in text}}
+            redo = {i: executor.submit(_parse_range, path, *ranges[i], columns, forced)
+                    for i, partition in enumerate(partitions)
+                    if not all(_is_text(partition[column].dtype) for column in text)}
+            for i, future in redo.items():
+                partitions[i] = future.result()
+
+    if casts:
+        partitions = [partition.astype(casts) for partition in partitions]
+    return pd.concat(partitions, ignore_index=True)
+
+
+# ÉCHANTILLON PAR BLOCS
+# ======================
+#
+# Des blocs d'octets tirés au hasard sont lus directement dans le mmap, sans
+# analyser le reste du fichier. Le fichier est découpé en autant de tranches
+# que de blocs à lire et un bloc est tiré dans chaque tranche: l'échantillon
+# couvre le fichier de bout en bout, même si la longueur des lignes dérive
+# (identifiants croissants, exports concaténés). Une ligne appartient au bloc
+# qui contient son premier octet; chaque bloc tiré compte pour les blocs de
+# sa tranche (poids).
+
+SAMPLE_BLOCK_BYTES = 64 * 1024
+
+
+class BlockSample:
+    """Lignes tirées par blocs, avec de quoi extrapoler au fichier entier."""
+
+    def __init__(self, df, block_lines, block_sizes, data_bytes, total_blocks, block_weights=None):
+        self.df = df
+        self.block_lines = block_lines
+        self.block_sizes = block_sizes
+        self.data_bytes = data_bytes
+        self.total_blocks = total_blocks
+        self.block_weights = np.ones(len(block_lines)) if block_weights is None else block_weights
+
+    @property
+    def complete(self):
+        return len(self.block_lines) == self.total_blocks
+
+    @property
+    def lines_per_byte(self):
+
+        # Estimateur par ratio, chaque bloc pondéré par la taille de sa tranche
+        weighted_sizes = (self.block_weights * self.block_sizes).sum()
+        return (self.block_weights * self.block_lines).sum() / weighted_sizes if weighted_sizes else 0.0
+
+
+def _line_start_at_or_after(mm, position, data_start):
+
+    if position <= data_start:
+        return data_start
+    newline = mm.find(b'\n', position - 1)
+    return len(mm) if newline == -1 else newline + 1
+
+
+def sample_csv_blocks(path, sample_bytes, block_bytes=SAMPLE_BLOCK_BYTES, seed=None, dtype=None, **read_options):
+
+    rng = np.random.default_rng(seed)
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            columns, data_start = _read_header(mm)
+            data_bytes = len(mm) - data_start
+            total_blocks = max(-(-data_bytes // block_bytes), 1)
+            n_blocks = min(max(sample_bytes // block_bytes, 1), total_blocks)
+
+            # Un bloc au hasard par tranche de blocs consécutifs, lus dans l'ordre du fichier
+            bounds = np.linspace(0, total_blocks, n_blocks + 1).astype(int)
+            weights = np.diff(bounds)
+            slots = bounds[:-1] + (rng.random(n_blocks) * weights).astype(int)
+            pieces = []
+            block_lines = []
+            block_sizes = []
+            for slot in slots:
+                start = data_start + int(slot) * block_bytes
+                end = _line_start_at_or_after(mm, start + block_bytes, data_start)
+                start = _line_start_at_or_after(mm, start, data_start)
+                piece = mm[start:end] if end > start else b''
+                if piece and not piece.endswith(b'\n'):
+                    piece += b'\n'
+                pieces.append(piece)
+                block_lines.append(piece.count(b'\n'))
+                block_sizes.append(end - start)
+
+    df = pd.read_csv(io.BytesIO(b''.join(pieces)), header=None, names=columns, dtype=dtype, **read_options)
+    return BlockSample(df, np.array(block_lines), np.array(block_sizes), data_bytes, total_blocks, weights)
+
+
+# ENTRÉES COMPRESSÉES
+# ====================
+#
+# Les exports .gz / .bz2 / .zst sont lus directement en flux. La décompression
+# tourne dans un thread dédié (zlib, bz2 et zstd relâchent le GIL) et alimente
+# l'analyseur CSV par blocs: décompression et analyse se recouvrent.
+
+COMPRESSED_SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.zst': 'zstd'}
+
+# Taille des blocs décompressés et nombre de blocs d'avance
+DECOMPRESS_BLOCK_BYTES = 1024 * 1024
+DECOMPRESS_QUEUE_BLOCKS = 8
+
+# Lignes par morceau en mode découpé sur les entrées compressées
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def compression_of(path):
+
+    return COMPRESSED_SUFFIXES.get(os.path.splitext(path)[1].lower())
+
+
+def resolve_input(path):
+
+    # clients.csv absent mais clients.csv.gz présent: on lit la version compressée
+    if os.path.exists(path):
+        return path
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+
+class DecompressionStats:
+    """Volumes et débit de décompression d'une entrée."""
+
+    def __init__(self):
+        self.path = None
+        self.compression = None
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        # Temps passé dans les appels de décompression seuls
+        self.seconds = 0.0
+        # Temps où le producteur attend que l'analyseur libère de la place dans la file
+        self.blocked_seconds = 0.0
+
+    @property
+    def throughput(self):
+
+        # Octets compressés décompressés par seconde de décompression
+        return self.compressed_bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+
+        return (f"Décompression {self.compression}: {self.compressed_bytes / 1e6:.1f} Mo compressés "
+                f"-> {self.decompressed_bytes / 1e6:.1f} Mo en {self.seconds:.2f} s "
+                f"({self.throughput / 1e6:.1f} Mo compressés/s), "
+                f"attente de l'analyseur {self.blocked_seconds:.2f} s")
+
+
+def _open_decompressor(raw, compression):
+
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(raw, mode='rb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("La lecture des fichiers .zst nécessite le paquet 'zstandard'") from None
+        return zstandard.ZstdDecompressor().stream_reader(raw)
+    raise ValueError(f"Compression non supportée: {compression}")
+
+
+class ThreadedDecompressor(io.RawIOBase):
+    """Flux binaire décompressé par un thread producteur, lu par l'analyseur CSV."""
+
+    def __init__(self, path, stats=None):
+        self.stats = stats or DecompressionStats()
+        self.stats.path = path
+        self.stats.compression = compression_of(path)
+        self.stats.compressed_bytes = os.path.getsize(path)
+
+        self._blocks = queue.Queue(maxsize=DECOMPRESS_QUEUE_BLOCKS)
+        self._pending = b''
+        self._done = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name='decompress', daemon=True)
+        self._thread.start()
+
+    def _produce(self):
+
+        # Les appels de décompression et l'attente sur la file pleine sont chronométrés à part
+        try:
+            with open(self.stats.path, 'rb') as raw, _open_decompressor(raw, self.stats.compression) as stream:
+                while not self._stop.is_set():
+                    start = time.perf_counter()
+                    block = stream.read(DECOMPRESS_BLOCK_BYTES)
+                    self.stats.seconds += time.perf_counter() - start
+                    if not block:
+                        break
+                    self.stats.decompressed_bytes += len(block)
+                    start = time.perf_counter()
+                    self._blocks.put(block)
+                    self.stats.blocked_seconds += time.perf_counter() - start
+            self._blocks.put(None)
+        except BaseException as error:
+            self._blocks.put(error)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+
+        while not self._pending and not self._done:
+            block = self._blocks.get()
+            if isinstance(block, BaseException):
+                self._done = True
+                raise block
+            if block is None:
+                self._done = True
+            else:
+                self._pending = memoryview(block)
+
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self):
+
+        # Débloque le producteur s'il attend de la place dans la file
+        self._stop.set()
+        while self._thread.is_alive():
+            try:
+                self._blocks.get_nowait()
+            except queue.Empty:
+                self._thread.join(timeout=0.05)
+        super().close()
+
+
+def read_csv_input(path, n_workers=None, dtype=None, stats=None):
+
+    # Entrée compressée: flux décompressé en parallèle de l'analyse
+    if compression_of(path):
+        with ThreadedDecompressor(path, stats) as stream:
+            return pd.read_csv(stream, dtype=dtype)
+    return read_csv_parallel(path, n_workers=n_workers, dtype=dtype)
+
+
+def _rechunk(frames, chunksize):
+
+    # Redécoupe des partitions en morceaux d'exactement chunksize lignes (le dernier excepté)
+    buffer, rows, offset = [], 0, 0
+    for frame in frames:
+        buffer.append(frame)
+        rows += len(frame)
+        while rows >= chunksize:
+            merged = pd.concat(buffer, ignore_index=True) if len(buffer) > 1 else buffer[0]
+            chunk = merged.iloc[:chunksize]
+            chunk.index = pd.RangeIndex(offset, offset + chunksize)
+            offset += chunksize
+            yield chunk
+            buffer = [merged.iloc[chunksize:]]
+            rows = len(buffer[0])
+    if rows:
+        chunk = pd.concat(buffer, ignore_index=True) if len(buffer) > 1 else buffer[0]
+        chunk.index = pd.RangeIndex(offset, offset + rows)
+        yield chunk
+
+
+def iter_csv_chunks(path, chunksize=DEFAULT_CHUNK_ROWS, n_workers=None, dtype=None, stats=None):
+
+    # Mode découpé: plages d'octets de la taille d'un morceau, analysées quelques-unes à la fois
+    # (au plus n_workers en cours), ou morceaux de lignes lus en flux si compressé
+    if not compression_of(path):
+        n_workers = n_workers or os.cpu_count() or 1
+        partitions = iter_csv_partitions(path, n_workers=n_workers, dtype=dtype,
+                                         partition_bytes=chunksize * estimate_row_bytes(path),
+                                         max_in_flight=n_workers)
+        yield from _rechunk(partitions, chunksize)
+        return
+
+    with ThreadedDecompressor(path, stats) as stream:
+        with pd.read_csv(stream, dtype=dtype, chunksize=chunksize) as reader:
+            yield from reader
@@ -0,0 +1,283 @@
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from readers import iter_csv_chunks, resolve_input
+from writers import atomic_write_csv
+from checkpoints import file_digest
+
+
+# AGRÉGATS DE CHIFFRE D'AFFAIRES MATÉRIALISÉS
+# ============================================
+#
+# Chiffre d'affaires par jour x catégorie (catalogue canonique) x pays client
+# (clients nettoyés), stocké dans une table SQLite. L'arrivée de nouvelles
+# ventes ne met à jour que les partitions des jours concernés, et les
+# requêtes d'analyse sont servies depuis les agrégats, sans relire les ventes.
+#
+# Chaque fichier intégré est enregistré (chemin + empreinte) avec sa
+# contribution: relancer le même fichier ne change rien, et une nouvelle
+# version d'un fichier déjà intégré remplace sa contribution précédente.
+
+SALES_PATH = "../data/raw/sales.csv"
+CATALOG_PATH = "../data/clean/catalog_canonique.csv"
+CLIENTS_PATH = "../data/clean/clients_clean.csv"
+ROLLUP_DB_PATH = "../data/store/rollups.sqlite"
+DAILY_REVENUE_PATH = "../data/reports/daily_revenue.csv"
+
+UNKNOWN = "Inconnu"
+DIMENSIONS = ("day", "category", "country")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS revenue_rollup (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    country TEXT NOT NULL,
+    revenue REAL NOT NULL,
+    quantity REAL NOT NULL,
+    lines INTEGER NOT NULL,
+    PRIMARY KEY (day, category, country)
+);
+CREATE TABLE IF NOT EXISTS applied_files (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS applied_files_digest ON applied_files (digest);
+CREATE TABLE IF NOT EXISTS file_contributions (
+    path TEXT NOT NULL,
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    country TEXT NOT NULL,
+    revenue REAL NOT NULL,
+    quantity REAL NOT NULL,
+    lines INTEGER NOT NULL,
+    PRIMARY KEY (path, day, category, country)
+);
+"""
+
+_ADD_ROWS = """
+INSERT INTO revenue_rollup (day, category, country, revenue, quantity, lines)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, category, country) DO UPDATE SET
+    revenue = revenue + excluded.revenue,
+    quantity = quantity + excluded.quantity,
+    lines = lines + excluded.lines
+"""
+
+# Retrait de la contribution précédente d'un fichier avant d'intégrer sa nouvelle version
+_SUBTRACT_FILE = """
+UPDATE revenue_rollup SET
+    revenue = revenue_rollup.revenue - f.revenue,
+    quantity = revenue_rollup.quantity - f.quantity,
+    lines = revenue_rollup.lines - f.lines
+FROM file_contributions f
+WHERE f.path = ? AND f.day = revenue_rollup.day
+  AND f.category = revenue_rollup.category AND f.country = revenue_rollup.country
+"""
+
+# Mots-clés de détection des colonnes du fichier de ventes
+SALES_COLUMNS = {
+    'date': ['date', 'jour', 'day'],
+    'sku': ['sku'],
+    'client': ['client', 'customer'],
+    'amount': ['montant', 'amount', 'revenue', 'total'],
+    'quantity': ['quantite', 'quantité', 'quantity', 'qty'],
+    'price': ['prix', 'price'],
+}
+
+
+def detect_sales_columns(columns):
+
+    found = {}
+    for role, keywords in SALES_COLUMNS.items():
+        found[role] = next((c for c in columns if any(k in c.lower() for k in keywords)), None)
+    for role in ('date', 'sku', 'client'):
+        if found[role] is None:
+            raise ValueError(f"Colonne '{role}' introuvable dans les ventes: {list(columns)}")
+    if found['amount'] is None and (found['quantity'] is None or found['price'] is None):
+        raise ValueError("Ventes sans montant ni couple quantité/prix")
+    return found
+
+
+def load_dimensions(catalog_path=CATALOG_PATH, clients_path=CLIENTS_PATH):
+
+    # Tables de correspondance sku -> catégorie et client -> pays
+    catalog = pd.read_csv(catalog_path, usecols=['sku', 'category_name'], dtype={'sku': str})
+    clients = pd.read_csv(clients_path, usecols=['id', 'pays'], dtype={'id': str})
+    categories = catalog.drop_duplicates('sku').set_index('sku')['category_name']
+    countries = clients.drop_duplicates('id').set_index('id')['pays']
+    return categories, countries
+
+
+def aggregate_sales(sales, categories, countries):
+
+    cols = detect_sales_columns(sales.columns)
+
+    quantity = pd.to_numeric(sales[cols['quantity']], errors='coerce') if cols['quantity'] else 1
+    if cols['amount']:
+        revenue = pd.to_numeric(sales[cols['amount']], errors='coerce')
+    else:
+        revenue = quantity * pd.to_numeric(sales[cols['price']], errors='coerce')
+
+    lines = pd.DataFrame({
+        'day': pd.to_datetime(sales[cols['date']], errors='coerce').dt.strftime('%Y-%m-%d'),
+        'category': sales[cols['sku']].astype(str).map(categories).fillna(UNKNOWN),
+        'country': sales[cols['client']].astype(str).map(countries).fillna(UNKNOWN),
+        'revenue': revenue.fillna(0.0),
+        'quantity': pd.Series(quantity, index=sales.index).fillna(0.0),
+    })
+
+    # Lignes sans date exploitable: aucun jour où les ranger, elles sont comptées et écartées
+    undated = lines['day'].isna()
+    grouped = lines[~undated].groupby(list(DIMENSIONS), as_index=False)
+    aggregates = grouped.agg(revenue=('revenue', 'sum'), quantity=('quantity', 'sum'), lines=('revenue', 'size'))
+    return aggregates, int(undated.sum())
+
+
+def combine_aggregates(aggregates):
+
+    if not aggregates:
+        return pd.DataFrame(columns=[*DIMENSIONS, 'revenue', 'quantity', 'lines'])
+    combined = pd.concat(aggregates, ignore_index=True)
+    return combined.groupby(list(DIMENSIONS), as_index=False)[['revenue', 'quantity', 'lines']].sum()
+
+
+class RevenueRollups:
+    """Agrégats de chiffre d'affaires jour x catégorie x pays, rafraîchis par jour."""
+
+    def __init__(self, path=ROLLUP_DB_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def applied_as(self, digest):
+
+        # Chemin sous lequel ce contenu exact a déjà été intégré, ou None
+        row = self.conn.execute("SELECT path FROM applied_files WHERE digest = ?", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def apply(self, aggregates, mode='append', source=None, digest=None):
+
+        # append: les ventes s'ajoutent aux agrégats existants
+        # replace: les jours présents sont recalculés entièrement à partir de ces ventes
+        # source/digest: fichier d'origine; sa contribution précédente éventuelle est retirée
+        if mode not in ('append', 'replace'):
+            raise ValueError(f"Mode inconnu: {mode}")
+        rows = [
+            (r.day, r.category, r.country, float(r.revenue), float(r.quantity), int(r.lines))
+            for r in aggregates.itertuples(index=False)
+        ]
+        days = [(day,) for day in aggregates['day'].unique()]
+        touched = set(aggregates['day'])
+
+        with self.conn:
+            if source is not None:
+                # Jours de l'ancienne version du fichier: mis à jour même s'ils n'ont plus de ventes
+                touched.update(day for day, in self.conn.execute(
+                    "SELECT DISTINCT day FROM file_contributions WHERE path = ?", (source,)))
+                self.conn.execute(_SUBTRACT_FILE, (source,))
+                self.conn.execute("DELETE FROM revenue_rollup WHERE lines <= 0")
+                self.conn.execute("DELETE FROM file_contributions WHERE path = ?", (source,))
+            if mode == 'replace':
+                # Les jours recalculés n'appartiennent plus qu'à ce fichier
+                self.conn.executemany("DELETE FROM revenue_rollup WHERE day = ?", days)
+                self.conn.executemany("DELETE FROM file_contributions WHERE day = ?", days)
+            self.conn.executemany(_ADD_ROWS, rows)
+
+            if source is not None:
+                self.conn.executemany("INSERT INTO file_contributions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                      [(source, *row) for row in rows])
+                self.conn.execute("INSERT OR REPLACE INTO applied_files VALUES (?, ?, ?)",
+                                  (source, digest, datetime.now().isoformat(timespec='seconds')))
+
+        return len(touched)
+
+    def query(self, by=('day',), start=None, end=None, category=None, country=None):
+
+        by = list(by)
+        unknown = [dim for dim in by if dim not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Dimensions inconnues: {unknown} (disponibles: {DIMENSIONS})")
+
+        # Filtres d'exploration appliqués directement sur les agrégats
+        conditions, params = [], []
+        for clause, value in (("day >= ?", start), ("day <= ?", end),
+                              ("category = ?", category), ("country = ?", country)):
+            if value is not None:
+                conditions.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        select = ", ".join(by)
+        group = f"GROUP BY {select} ORDER BY {select}" if by else ""
+        prefix = f"{select}, " if by else ""
+
+        sql = (f"SELECT {prefix}SUM(revenue) AS revenue, SUM(quantity) AS quantity, SUM(lines) AS lines "
+               f"FROM revenue_rollup {where} {group}")
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def export_daily_revenue(self, path=DAILY_REVENUE_PATH):
+
+        daily = self.query(by=('day',))[['day', 'revenue']]
+        atomic_write_csv(daily, path, index=False)
+        return len(daily)
+
+
+def refresh_from_file(path, mode='append', db_path=ROLLUP_DB_PATH, export_path=DAILY_REVENUE_PATH):
+
+    print(f"\n Agrégation des ventes: {path}")
+    path = resolve_input(path)
+    source = os.path.realpath(path)
+    digest = file_digest(path)
+
+    # Un contenu déjà intégré n'est jamais recompté (relance, dépôt en double)
+    with RevenueRollups(db_path) as rollups:
+        applied = rollups.applied_as(digest)
+    if applied is not None and mode == 'append':
+        print(f"   Déjà intégré (même contenu: {applied}), agrégats inchangés")
+        return 0
+
+    categories, countries = load_dimensions()
+
+    # Agrégation morceau par morceau: les ventes brutes ne sont jamais gardées en mémoire
+    partials, undated = [], 0
+    for chunk in iter_csv_chunks(path, dtype=str):
+        aggregates, skipped = aggregate_sales(chunk, categories, countries)
+        partials.append(aggregates)
+        undated += skipped
+    aggregates = combine_aggregates(partials)
+
+    with RevenueRollups(db_path) as rollups:
+        days = rollups.apply(aggregates, mode, source, digest)
+        exported = rollups.export_daily_revenue(export_path)
+
+    print(f"   Jours mis à jour: {days} ({mode})")
+    print(f"   Chiffre d'affaires ajouté: {aggregates['revenue'].sum():.2f}")
+    if undated:
+        print(f"   Lignes ignorées (date illisible): {undated}")
+    print(f"   Chiffre d'affaires quotidien exporté: {export_path} ({exported} jours)")
+    return days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mise à jour des agrégats de chiffre d'affaires")
+    parser.add_argument('sales', nargs='?', default=SALES_PATH, help="fichier de ventes à intégrer")
+    parser.add_argument('--replace', action='store_true',
+                        help="recalcule entièrement les jours présents dans le fichier au lieu de les cumuler")
+    args = parser.parse_args()
+    refresh_from_file(args.sales, 'replace' if args.replace else 'append')
@@ -7,6 +7,10 @@ from datetime import datetime
 # NETTOYAGE DES EMAILS
 # =====================
 
+# Format basique: caractères@domaine.extension
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+
 def normalize_email(email):
    
     if not isinstance(email, str) or pd.isna(email):
@@ -19,7 +23,7 @@ def normalize_email(email):
     email = re.sub(r'\s+', '', email)
     
     # Vérification format basique: caractères@domaine.extension
-    if not re.match(r'^[^@\s]+@[^@\s]+\.[^@\s]+$', email):
+    if not re.match(EMAIL_PATTERN, email):
         return None
     
     return email
@@ -29,7 +33,25 @@ def is_valid_email(email):
    
     if not isinstance(email, str) or pd.isna(email):
         return False
-    return bool(re.match(r'^[^@\s]+@[^@\s]+\.[^@\s]+$', email.strip()))
+    return bool(re.match(EMAIL_PATTERN, email.strip()))
+
+
+def _only_strings(values):
+
+    # Les valeurs non textuelles sont traitées comme manquantes (comme les versions scalaires)
+    if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        return values
+    values = values.astype(object)
+    return values.where(values.map(lambda v: isinstance(v, str)))
+
+
+def normalize_email_series(emails):
+
+    # Équivalent vectorisé de normalize_email sur toute une colonne
+    emails = _only_strings(emails)
+    cleaned = emails.str.strip().str.lower().str.replace(r'\s+', '', regex=True)
+    valid = cleaned.str.match(EMAIL_PATTERN).fillna(False).astype(bool)
+    return cleaned.where(valid, None)
 
 
 
@@ -81,11 +103,30 @@ def normalize_country(country_name):
         "italy": "Italie",
         "it": "Italie",
         "ita": "Italie",
+        
+        # Belgique
+        "belgique": "Belgique",
+        "belgium": "Belgique",
+        "be": "Belgique",
+        "bel": "Belgique",
+        
+        # Suisse
+        "suisse": "Suisse",
+        "switzerland": "Suisse",
+        "ch": "Suisse",
+        "che": "Suisse",
     }
     
     return country_map.get(country_name, country_name.capitalize())
 
 
+def normalize_country_series(countries):
+    
+    # Une seule normalisation par valeur distincte, rediffusée sur la colonne
+    mapping = {value: normalize_country(value) for value in countries.dropna().unique()}
+    return countries.map(mapping)
+
+
 
 # NETTOYAGE DES TÉLÉPHONES
 # =========================
@@ -140,21 +181,187 @@ def normalize_phone_fr(phone_number):
     return f"+{clean_number}"
 
 
+# Règles de numérotation par pays normalisé:
+# - prefix: indicatif international
+# - national_lengths: longueurs admises du numéro national (sans le 0 de tête)
+# - trunk_zero: le numéro national s'écrit précédé d'un 0 en usage domestique
+PHONE_RULES = {
+    "France": {"prefix": "33", "national_lengths": (9,), "trunk_zero": True},
+    "Belgique": {"prefix": "32", "national_lengths": (8, 9), "trunk_zero": True},
+    "Suisse": {"prefix": "41", "national_lengths": (9,), "trunk_zero": True},
+    "Allemagne": {"prefix": "49", "national_lengths": (6, 7, 8, 9, 10, 11), "trunk_zero": True},
+    "Royaume-Uni": {"prefix": "44", "national_lengths": (9, 10), "trunk_zero": True},
+    "Espagne": {"prefix": "34", "national_lengths": (9,), "trunk_zero": False},
+    "Italie": {"prefix": "39", "national_lengths": (6, 7, 8, 9, 10, 11), "trunk_zero": False},
+    "États-Unis": {"prefix": "1", "national_lengths": (10,), "trunk_zero": False},
+}
+
+# Longueurs admises par la norme E.164 (indicatif compris)
+E164_LENGTHS = range(8, 16)
+
+
+def _phone_digits(phones):
+
+    # Les numéros lus comme nombres ont perdu leur 0 de tête mais restent exploitables
+    if pd.api.types.is_numeric_dtype(phones):
+        phones = phones.astype('Int64').astype('string')
+    raw = _only_strings(phones.astype(object)).str.strip()
+    
+    # Un '+' ou un '00' de tête signale un format international explicite
+    digits = raw.str.replace(r'\D', '', regex=True)
+    explicit = raw.str.startswith('+').fillna(False) | digits.str.startswith('00').fillna(False)
+    digits = digits.str.replace(r'^00', '', regex=True)
+    return digits.where(digits.str.len() > 0), explicit.astype(bool)
+
+
+def _normalize_phone_batch(digits, explicit, rule):
+
+    result = pd.Series(None, index=digits.index, dtype=object)
+    length = digits.str.len()
+    e164 = explicit & length.isin(E164_LENGTHS)
+    
+    # Pays sans règle: seuls les numéros au format international sont conservés
+    if rule is None:
+        result.loc[e164] = '+' + digits[e164]
+        return result
+    
+    prefix, lengths = rule['prefix'], list(rule['national_lengths'])
+    leading_zero = digits.str.startswith('0').fillna(False)
+    
+    # Formes domestiques: 0 + national, ou national seul
+    if rule['trunk_zero']:
+        with_trunk = leading_zero & (length - 1).isin(lengths)
+        bare = ~leading_zero & length.isin(lengths)
+    else:
+        with_trunk = pd.Series(False, index=digits.index)
+        bare = length.isin(lengths)
+    domestic = with_trunk | bare
+    
+    # Forme internationale avec l'indicatif du pays (explicite ou non ambiguë)
+    has_prefix = digits.str.startswith(prefix).fillna(False)
+    international = has_prefix & (explicit | ~domestic)
+    rest = digits.str[len(prefix):]
+    if rule['trunk_zero']:
+        # Tolère le "(0)" des écritures du type +33 (0)6 12 34 56 78
+        drop_zero = rest.str.startswith('0').fillna(False) & (rest.str.len() - 1).isin(lengths)
+        rest = rest.where(~drop_zero, rest.str[1:])
+    international &= rest.str.len().isin(lengths)
+    
+    national = pd.Series(None, index=digits.index, dtype=object)
+    national.loc[international] = rest[international]
+    national.loc[~international & with_trunk] = digits[~international & with_trunk].str[1:]
+    national.loc[~international & bare] = digits[~international & bare]
+    result.loc[national.notna()] = '+' + prefix + national[national.notna()]
+    
+    # Numéro international d'un autre pays: conservé tel quel
+    foreign = result.isna() & e164 & ~has_prefix
+    result.loc[foreign] = '+' + digits[foreign]
+    return result
+
+
+def normalize_phone_series(phones, countries, rules=PHONE_RULES):
+    
+    # Normalisation par lots: une règle vectorisée par pays, sans branchement par ligne
+    digits, explicit = _phone_digits(phones)
+    result = pd.Series(None, index=phones.index, dtype=object)
+    
+    groups = pd.Series(countries.to_numpy(), index=phones.index).fillna('')
+    for country, positions in groups.groupby(groups).indices.items():
+        batch = _normalize_phone_batch(digits.iloc[positions], explicit.iloc[positions], rules.get(country))
+        result.iloc[positions] = batch.to_numpy()
+    
+    return result
+
+
+def normalize_phone(phone_number, country, rules=PHONE_RULES):
+
+    # Référence scalaire de normalize_phone_series: mêmes règles, un numéro à la fois
+    if not isinstance(phone_number, str):
+        return None
+    raw = phone_number.strip()
+    digits = re.sub(r'\D', '', raw)
+    explicit = raw.startswith('+') or digits.startswith('00')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if not digits:
+        return None
+    e164 = explicit and len(digits) in E164_LENGTHS
+
+    # Pays sans règle: seuls les numéros au format international sont conservés
+    rule = rules.get(country) if isinstance(country, str) else None
+    if rule is None:
+        return '+' + digits if e164 else None
+
+    prefix, lengths = rule['prefix'], rule['national_lengths']
+    trunk = rule['trunk_zero'] and digits.startswith('0')
+
+    # Forme domestique: 0 + national, ou national seul
+    domestic = None
+    if trunk and len(digits) - 1 in lengths:
+        domestic = digits[1:]
+    elif not trunk and len(digits) in lengths:
+        domestic = digits
+
+    # Forme internationale avec l'indicatif du pays (explicite ou non ambiguë)
+    if digits.startswith(prefix) and (explicit or domestic is None):
+        rest = digits[len(prefix):]
+        if rule['trunk_zero'] and rest.startswith('0') and len(rest) - 1 in lengths:
+            rest = rest[1:]
+        if len(rest) in lengths:
+            return '+' + prefix + rest
+    if domestic is not None:
+        return '+' + prefix + domestic
+
+    # Numéro international d'un autre pays: conservé tel quel
+    if e164 and not digits.startswith(prefix):
+        return '+' + digits
+    return None
+
+
 
 # NETTOYAGE DES DATES
 # ====================
 
+# Les dates ISO (AAAA-MM-JJ) ne sont pas ambiguës: dayfirst ne s'y applique pas
+ISO_DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}'
+
+
 def normalize_date(date_value, dayfirst=True):
   
     if pd.isna(date_value):
         return None
     
     try:
+        if isinstance(date_value, str) and re.match(ISO_DATE_PATTERN, date_value.strip()):
+            return pd.to_datetime(date_value.strip(), errors='coerce', format='ISO8601')
         return pd.to_datetime(date_value, errors='coerce', dayfirst=dayfirst)
     except:
         return None
 
 
+def normalize_date_series(dates, dayfirst=True):
+    
+    # Équivalent vectorisé de normalize_date sur toute une colonne
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    
+    result = pd.Series(pd.NaT, index=dates.index, dtype='datetime64[ns]')
+    
+    # Dates ISO: une seule conversion vectorisée
+    strings = _only_strings(dates).str.strip()
+    iso = strings.str.match(ISO_DATE_PATTERN).fillna(False).astype(bool)
+    if iso.any():
+        result.loc[iso] = pd.to_datetime(strings[iso], errors='coerce', format='ISO8601')
+    
+    # Autres formats: conversion scalaire une seule fois par valeur distincte
+    others = dates.notna() & ~iso
+    if others.any():
+        mapping = {value: normalize_date(value, dayfirst) for value in dates[others].unique()}
+        result.loc[others] = pd.to_datetime(dates[others].map(mapping), errors='coerce')
+    
+    return result
+
+
 def is_future_date(date_value):
    
     if pd.isna(date_value):
@@ -189,7 +396,7 @@ def is_valid_birthdate(date_value, min_age=0, max_age=120):
 # KPI DE QUALITÉ
 # ===============
 
-def kpi_quality(df, name="Dataset"):
+def kpi_quality(df, name="Dataset", rules=None):
    
     quality_metrics = {
         'dataset_name': name,
@@ -197,6 +404,10 @@ def kpi_quality(df, name="Dataset"):
         'total_columns': len(df.columns)
     }
     
+    # Nombre d'échecs par règle de validation (voir validation.RuleSet)
+    if rules is not None:
+        _, quality_metrics['rule_failures'] = rules.evaluate(df)
+    
     # Calcul du taux de complétude par colonne
     completeness_by_column = ((1 - df.isnull().sum() / len(df)) * 100).round(2)
     quality_metrics['completeness_per_column'] = completeness_by_column.to_dict()
@@ -234,9 +445,98 @@ def print_quality_report(metrics):
     for col, rate in metrics['completeness_per_column'].items():
         status = "good" if rate == 100 else "warning" if rate >= 80 else "bad"
         print(f"  {status} {col}: {rate}%")
+    if metrics.get('rule_failures'):
+        print(f"\n Échecs par règle de validation:")
+        for rule, failures in metrics['rule_failures'].items():
+            status = "good" if failures == 0 else "bad"
+            print(f"  {status} {rule}: {failures}")
     print(f"{'='*60}\n")
 
 
+# Libellés des segments dans le rapport KPI segmenté
+SEGMENT_ALL = "(tous)"
+SEGMENT_MISSING = "(vide)"
+
+
+def _long_format(frame, dimension, metric):
+
+    # Segments x colonnes -> lignes (dimension, segment, metrique, colonne, valeur)
+    long = frame.rename_axis(index='segment', columns='colonne').stack().rename('valeur').reset_index()
+    long.insert(0, 'dimension', dimension)
+    long.insert(2, 'metrique', metric)
+    return long
+
+
+def kpi_quality_segmented(df, segments, rules=None, labels=None):
+
+    # Clés de segmentation: nom de colonne (doit exister), Series alignée sur df ou
+    # tableau de même longueur; labels: dimensions à valeur unique (ex. fichier source)
+    keys = []
+    for name, key in segments.items():
+        if isinstance(key, str):
+            key = df[key]
+        elif isinstance(key, pd.Series):
+            key = key.reindex(df.index)
+        else:
+            key = pd.Series(key, index=df.index)
+        keys.append(key.astype(object).fillna(SEGMENT_MISSING).rename(name))
+    for name, label in (labels or {}).items():
+        keys.append(pd.Series(label, index=df.index, dtype=object, name=name))
+
+    # Indicateurs par ligne: cellules renseignées, doublon (dans le jeu entier et
+    # dans le segment de chaque dimension), règles échouées
+    indicators = df.notna()
+    indicators.columns = pd.MultiIndex.from_product([['renseigne'], df.columns])
+    indicators[('lignes', '')] = True
+    row_hash = pd.util.hash_pandas_object(df, index=False).rename('_ligne')
+    indicators[('doublon', 'global')] = row_hash.duplicated().to_numpy()
+    for key in keys:
+        indicators[('doublon', key.name)] = pd.concat([row_hash, key], axis=1).duplicated().to_numpy()
+
+    rule_names = []
+    if rules is not None:
+        bitmask, failures = rules.evaluate(df)
+        bits = bitmask.to_numpy()
+        for rule in rules.rules:
+            if rule['name'] in failures:
+                rule_names.append(rule['name'])
+                indicators[('echec', rule['name'])] = ((bits >> rules.dtype(rule['bit'])) & 1) == 1
+        indicators[('valide', '')] = bits == 0
+
+    # Une seule agrégation sur toutes les lignes; les autres niveaux se déduisent
+    # de ce petit tableau, les comptes étant additifs
+    counts = indicators.groupby(keys, dropna=False).sum()
+    tables = {'global': counts.sum().to_frame(SEGMENT_ALL).T}
+    for key in keys:
+        tables[key.name] = counts.groupby(level=key.name).sum()
+
+    parts = []
+    for dimension, table in tables.items():
+        rows = table[('lignes', '')]
+        filled = table['renseigne']
+        per_segment = pd.DataFrame({'lignes': rows})
+
+        per_segment['taux_completude'] = (filled.sum(axis=1) / (rows * len(df.columns)) * 100).round(2)
+        per_segment['taux_valeurs_manquantes'] = (100 - per_segment['taux_completude']).round(2)
+        per_segment['doublons'] = table[('doublon', dimension)]
+        per_segment['taux_doublons'] = (table[('doublon', dimension)] / rows * 100).round(2)
+        if rules is not None:
+            per_segment['taux_validite'] = (table[('valide', '')] / rows * 100).round(2)
+        parts.append(_long_format(per_segment, dimension, None))
+
+        parts.append(_long_format(filled.div(rows, axis=0).mul(100).round(2), dimension, 'taux_completude'))
+        if rule_names:
+            parts.append(_long_format(table['echec'][rule_names], dimension, 'echecs_regle'))
+
+    report = pd.concat(parts, ignore_index=True)
+
+    # Métriques globales au segment: le nom de la métrique est porté par la colonne
+    overall = report['metrique'].isna()
+    report.loc[overall, 'metrique'] = report.loc[overall, 'colonne']
+    report.loc[overall, 'colonne'] = SEGMENT_ALL
+    return report
+
+
 
 # GESTION DES DOUBLONS
 # =====================
@@ -252,10 +552,13 @@ def calculate_completeness_score(df, columns=None):
 def merge_duplicates(df, key_columns, keep='most_complete'):
     
     if keep == 'most_complete':
-        df['_completeness_score'] = calculate_completeness_score(df)
-        df = df.sort_values('_completeness_score', ascending=False)
-        df = df.drop_duplicates(subset=key_columns, keep='first')
-        df = df.drop(columns=['_completeness_score'])
+        # Un seul tri stable des positions et une seule extraction finale:
+        # ni colonne temporaire ni frames intermédiaires
+        score = calculate_completeness_score(df).to_numpy()
+        order = np.argsort(-score, kind='stable')
+        groups = df.groupby(key_columns, dropna=False, sort=False).ngroup().to_numpy()
+        first = ~pd.Series(groups[order]).duplicated().to_numpy()
+        df = df.take(order[first])
     else:
         df = df.drop_duplicates(subset=key_columns, keep=keep)
     
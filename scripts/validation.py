@@ -0,0 +1,169 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils import normalize_date_series
+
+
+# MOTEUR DE RÈGLES DE VALIDATION
+# ===============================
+#
+# Les règles sont déclarées dans un fichier JSON et compilées en contrôles
+# vectorisés sur les colonnes. Chaque ligne reçoit un masque de bits entier:
+# le bit n est levé si la règle n (ordre du fichier) a échoué.
+#
+# Types de règles:
+#   regex        {"column", "pattern"}
+#   range        {"column", "kind": number|date|age, "min", "max"}
+#   allowed      {"column", "values"}
+#   required     {"column"}
+#   cross_field  {"check": any_present, "columns"}
+#                {"check": lt|le|gt|ge|eq|ne, "left", "right"}
+#
+# Une règle peut porter "action": "nullify" pour vider la valeur fautive.
+# Les valeurs manquantes ne font échouer que les règles required / any_present.
+
+MAX_RULES = 64
+
+_COMPARISONS = {
+    'lt': lambda a, b: a < b,
+    'le': lambda a, b: a <= b,
+    'gt': lambda a, b: a > b,
+    'ge': lambda a, b: a >= b,
+    'eq': lambda a, b: a == b,
+    'ne': lambda a, b: a != b,
+}
+
+
+def _convert_range(values, kind):
+
+    if kind == 'number':
+        return pd.to_numeric(values, errors='coerce')
+    dates = normalize_date_series(values)
+    if kind == 'date':
+        return dates
+    if kind == 'age':
+        return (pd.Timestamp(datetime.now()) - dates).dt.days / 365.25
+    raise ValueError(f"Type de plage inconnu: {kind}")
+
+
+def _range_bound(value, kind):
+
+    if value is None or kind != 'date':
+        return value
+    return pd.Timestamp(value)
+
+
+def _compile_check(rule):
+
+    rule_type = rule['type']
+
+    if rule_type == 'regex':
+        column, pattern = rule['column'], rule['pattern']
+        def check(df):
+            values = df[column].astype('string')
+            return values.notna() & ~values.str.fullmatch(pattern).fillna(False).astype(bool)
+        return [column], check
+
+    if rule_type == 'range':
+        column, kind = rule['column'], rule.get('kind', 'number')
+        low, high = _range_bound(rule.get('min'), kind), _range_bound(rule.get('max'), kind)
+        def check(df):
+            converted = _convert_range(df[column], kind)
+            failed = df[column].notna() & converted.isna()
+            if low is not None:
+                failed |= converted < low
+            if high is not None:
+                failed |= converted > high
+            return failed
+        return [column], check
+
+    if rule_type == 'allowed':
+        column, allowed = rule['column'], list(rule['values'])
+        def check(df):
+            return df[column].notna() & ~df[column].isin(allowed)
+        return [column], check
+
+    if rule_type == 'required':
+        column = rule['column']
+        def check(df):
+            return df[column].isna()
+        return [column], check
+
+    if rule_type == 'cross_field':
+        if rule['check'] == 'any_present':
+            columns = list(rule['columns'])
+            def check(df):
+                return df[columns].isna().all(axis=1)
+            return columns, check
+        compare = _COMPARISONS[rule['check']]
+        left, right = rule['left'], rule['right']
+        def check(df):
+            both = df[left].notna() & df[right].notna()
+            return both & ~compare(df[left], df[right]).fillna(False).astype(bool)
+        return [left, right], check
+
+    raise ValueError(f"Type de règle inconnu: {rule_type}")
+
+
+class RuleSet:
+    """Règles de validation compilées, évaluées en une passe sur un DataFrame."""
+
+    def __init__(self, rules):
+        if len(rules) > MAX_RULES:
+            raise ValueError(f"Au plus {MAX_RULES} règles sont supportées ({len(rules)} déclarées)")
+
+        self.rules = []
+        for bit, rule in enumerate(rules):
+            columns, check = _compile_check(rule)
+            self.rules.append({
+                'name': rule['name'],
+                'bit': bit,
+                'columns': columns,
+                'check': check,
+                'action': rule.get('action'),
+                'target': rule.get('column'),
+            })
+
+        # Plus petit entier non signé capable de contenir tous les bits
+        self.dtype = next(t for t in (np.uint8, np.uint16, np.uint32, np.uint64)
+                          if np.iinfo(t).bits >= max(len(self.rules), 1))
+
+    @classmethod
+    def from_file(cls, path):
+
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['rules'])
+
+    @property
+    def names(self):
+        return [rule['name'] for rule in self.rules]
+
+    def evaluate(self, df):
+
+        bitmask = np.zeros(len(df), dtype=self.dtype)
+        failures = {}
+
+        for rule in self.rules:
+            # Règle ignorée si une de ses colonnes est absente du jeu de données
+            if not all(col in df.columns for col in rule['columns']):
+                continue
+            failed = rule['check'](df).to_numpy(dtype=bool)
+            bitmask |= failed.astype(self.dtype) << self.dtype(rule['bit'])
+            failures[rule['name']] = int(failed.sum())
+
+        return pd.Series(bitmask, index=df.index, name='regles_echouees'), failures
+
+    def apply_actions(self, df, bitmask):
+
+        for rule in self.rules:
+            if rule['action'] == 'nullify' and rule['target'] in df.columns:
+                failed = ((bitmask.to_numpy() >> self.dtype(rule['bit'])) & 1) == 1
+                df.loc[failed, rule['target']] = None
+        return df
+
+    def decode(self, value):
+
+        return [rule['name'] for rule in self.rules if (int(value) >> rule['bit']) & 1]
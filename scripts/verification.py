@@ -0,0 +1,138 @@
+import re
+
+import pandas as pd
+
+from utils import (
+    normalize_email,
+    normalize_email_series,
+    normalize_country,
+    normalize_country_series,
+    normalize_phone,
+    normalize_phone_fr,
+    normalize_phone_series,
+    normalize_date,
+    normalize_date_series,
+)
+
+
+# VÉRIFICATION DIFFÉRENTIELLE DES NORMALISEURS
+# =============================================
+#
+# Les versions vectorisées (normalize_*_series) sont comparées aux fonctions
+# scalaires de référence sur un échantillon aléatoire de lignes brutes.
+# Toute entrée pour laquelle les deux résultats diffèrent est rapportée, sauf
+# les écarts voulus et documentés ci-dessous, où le chemin rapide doit alors
+# donner exactement le résultat attendu. Les téléphones sont vérifiés pour
+# tous les pays contre la référence scalaire par pays (normalize_phone), et
+# pour la France également contre normalize_phone_fr.
+
+
+def _expected_fr(national):
+
+    # Numéro national français (avec ou sans 0 de tête) -> forme +33
+    if len(national) == 10 and national.startswith('0'):
+        national = national[1:]
+    return '+33' + national if len(national) == 9 else None
+
+
+# normalize_phone_series corrige volontairement ces cas que normalize_phone_fr traite mal:
+# (libellé, condition sur l'entrée brute et ses chiffres, résultat attendu du chemin rapide)
+INTENDED_PHONE_DIFFERENCES = [
+    ("préfixe international 00", lambda raw, digits: digits.startswith('0033'),
+     lambda raw, digits: _expected_fr(digits[4:])),
+    ("(0) après l'indicatif", lambda raw, digits: raw.startswith('+33') and '(0)' in raw,
+     lambda raw, digits: _expected_fr(digits[2:])),
+    ("12 chiffres commençant par 33", lambda raw, digits: len(digits) == 12 and digits.startswith('33'),
+     lambda raw, digits: None),
+    ("10 chiffres sans 0 de tête", lambda raw, digits: len(digits) == 10 and not digits.startswith('0'),
+     lambda raw, digits: None),
+    ("9 chiffres avec 0 de tête", lambda raw, digits: len(digits) == 9 and digits.startswith('0'),
+     lambda raw, digits: None),
+]
+
+
+def intended_phone_difference(value, fast):
+
+    # Libellé de l'écart voulu couvrant cette entrée, si le résultat rapide est bien celui attendu
+    raw = str(value).strip()
+    digits = re.sub(r'\D', '', raw)
+    for label, applies, expected in INTENDED_PHONE_DIFFERENCES:
+        if applies(raw, digits):
+            return label if _same(expected(raw, digits), fast) else None
+    return None
+
+
+def _find_column(df, keywords):
+
+    return next((col for col in df.columns if any(k in col.lower() for k in keywords)), None)
+
+
+def _same(reference, fast):
+
+    if pd.isna(reference) and pd.isna(fast):
+        return True
+    if pd.isna(reference) or pd.isna(fast):
+        return False
+    return reference == fast
+
+
+def _compare(name, inputs, reference, fast, intended=None):
+
+    mismatches = []
+    expected = 0
+    for index, value, ref, got in zip(inputs.index, inputs, reference, fast):
+        if _same(ref, got):
+            continue
+        if intended is not None and intended(value, got):
+            expected += 1
+            continue
+        mismatches.append({'normaliseur': name, 'ligne': index, 'entree': value, 'reference': ref, 'rapide': got})
+    return name, mismatches, len(inputs), expected
+
+
+def _verify_phones(sample, phone_col, country_col):
+
+    # Toutes les lignes de l'échantillon, quel que soit leur pays
+    countries = normalize_country_series(sample[country_col]) if country_col else pd.Series('France', index=sample.index)
+    phones = sample[phone_col]
+    fast = normalize_phone_series(phones, countries)
+    reference = pd.Series([normalize_phone(phone, country) for phone, country in zip(phones, countries)],
+                          index=phones.index, dtype=object)
+
+    # La référence historique ne connaît que la France
+    french = (countries == 'France').fillna(False).astype(bool)
+    return [
+        _compare('normalize_phone', phones, reference, fast),
+        _compare('normalize_phone_fr', phones[french], phones[french].map(normalize_phone_fr), fast[french],
+                 intended_phone_difference),
+    ]
+
+
+def verify_normalizers(df, sample_size, seed=None):
+
+    sample = df.sample(n=min(sample_size, len(df)), random_state=seed)
+
+    email_col = _find_column(sample, ['email', 'courriel', 'mail'])
+    country_col = _find_column(sample, ['pays', 'country'])
+    phone_col = _find_column(sample, ['tel', 'phone'])
+    birth_col = _find_column(sample, ['naissance', 'birth', 'dob'])
+
+    checks = []
+    if email_col:
+        values = sample[email_col]
+        checks.append(_compare('normalize_email', values, values.map(normalize_email), normalize_email_series(values)))
+    if country_col:
+        values = sample[country_col]
+        checks.append(_compare('normalize_country', values, values.map(normalize_country), normalize_country_series(values)))
+    if phone_col:
+        checks.extend(_verify_phones(sample, phone_col, country_col))
+    if birth_col:
+        values = sample[birth_col]
+        reference = pd.Series([normalize_date(v) for v in values], index=values.index, dtype=object)
+        checks.append(_compare('normalize_date', values, reference, normalize_date_series(values)))
+
+    # Par normaliseur: valeurs comparées, écarts inattendus, écarts voulus
+    summary = {name: (checked, len(rows), expected) for name, rows, checked, expected in checks}
+    mismatches = pd.DataFrame([row for _, rows, _, _ in checks for row in rows],
+                              columns=['normaliseur', 'ligne', 'entree', 'reference', 'rapide'])
+    return mismatches, summary
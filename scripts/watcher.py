@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import os
+import re
+import sys
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+
+# SURVEILLANCE DES DÉPÔTS DE FICHIERS BRUTS
+# ==========================================
+#
+# Démon asyncio qui surveille les dossiers bruts, attend qu'un fichier déposé
+# ne change plus (taille et date stables pendant le délai d'anti-rebond),
+# puis le confie au pipeline correspondant:
+# - clients.csv remplace la sortie canonique clients_clean.csv; tout autre
+#   clients*.csv (extrait partiel, pays...) a ses propres sorties, pour ne
+#   jamais écraser le fichier complet servi par lookup_service.py;
+# - catalog_fr.csv / catalog_us.csv rafraîchissent leur seule source dans le
+#   catalogue persistant. Les autres catalog_*.csv n'ont pas de source
+#   connue: ils sont signalés et ignorés.
+# Chaque pipeline a sa file et son processus de travail, lancé une fois:
+# pandas, les modules et les tables de référence y restent chargés d'un
+# fichier à l'autre, et deux runs d'un même pipeline ne se chevauchent
+# jamais (le catalogue persistant et les sorties canoniques n'ont qu'un
+# écrivain). Une limite globale borne les runs simultanés, prise seulement
+# quand le pipeline est libre: au-delà du nombre de pipelines, elle n'a donc
+# pas d'effet. Un processus tué (mémoire...) est relancé.
+#
+#   GET /status   profondeur des files, runs en cours, latences
+#   GET /health
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+
+WATCH_DIRS = ["../data/raw"]
+LOG_DIR = "../data/logs/watcher"
+
+# Sorties des dépôts clients partiels (relatives à scripts/, dossier du processus CRM)
+CLEAN_DIR = "../data/clean"
+REPORT_DIR = "../data/reports"
+HISTORY_DIR = "../data/history"
+
+POLL_SECONDS = 1.0
+DEBOUNCE_SECONDS = 2.0
+MAX_CONCURRENT_RUNS = 2
+DEFAULT_PORT = 8766
+RECENT_RUNS = 50
+
+COMPRESSED_SUFFIX = r'(\.(gz|bz2|zst))?$'
+
+# Fichier déposé -> pipeline (les versions compressées sont acceptées)
+ROUTES = [
+    ('crm', re.compile(r'^(?P<stem>clients.*)\.csv' + COMPRESSED_SUFFIX)),
+    ('catalog', re.compile(r'^catalog_(?P<source>fr|us)\.csv' + COMPRESSED_SUFFIX)),
+]
+PIPELINES = [kind for kind, _ in ROUTES]
+
+# Catalogues sans source déclarée dans catalog.py
+UNROUTED_PATTERN = re.compile(r'^catalog_.*\.csv' + COMPRESSED_SUFFIX)
+
+# Fichiers en cours d'écriture par les outils de dépôt
+PARTIAL_PATTERN = re.compile(r'^\.|\.(tmp|part|partial|crdownload)$')
+
+
+def route_for(filename):
+
+    # (pipeline, correspondance du nom) ou None si aucun pipeline ne sait traiter le fichier
+    if PARTIAL_PATTERN.search(filename):
+        return None
+    for kind, pattern in ROUTES:
+        match = pattern.match(filename)
+        if match:
+            return kind, match
+    return None
+
+
+def pipeline_args(kind, match, path):
+
+    if kind == 'catalog':
+        return ['--source', match['source'], '--input', path]
+
+    stem = match['stem']
+    if stem == 'clients':
+        return ['--input', path]
+    # Toutes les sorties du run sont propres au dépôt; l'historique est partagé
+    # mais partitionné par dataset, donc un dataset par dépôt
+    return [
+        '--input', path,
+        '--output', os.path.join(CLEAN_DIR, f"{stem}_clean.csv"),
+        '--report', os.path.join(REPORT_DIR, f"kpi_qualite_crm_{stem}.csv"),
+        '--segment-report', os.path.join(REPORT_DIR, f"kpi_qualite_clients_{stem}.csv"),
+        '--verification-report', os.path.join(REPORT_DIR, f"verification_normaliseurs_{stem}.csv"),
+        '--history-dir', HISTORY_DIR,
+        '--history-dataset', f"crm_{stem}",
+    ]
+
+
+# PROCESSUS DE TRAVAIL
+# =====================
+
+def _warm(kind):
+
+    # Exécuté une fois par processus: imports et tables de référence chargés à l'avance
+    if kind == 'crm':
+        os.chdir(SCRIPTS_DIR)
+        sys.path.insert(0, SCRIPTS_DIR)
+        importlib.import_module('crm')
+        importlib.import_module('email_domains').default_index()
+    else:
+        # catalog.py importe le utils.py de la racine: processus distinct de celui du CRM
+        os.chdir(REPO_DIR)
+        sys.path.insert(0, REPO_DIR)
+        importlib.import_module('catalog')
+
+
+def run_pipeline(kind, argv, log_path):
+
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try:
+            code = sys.modules[kind].main(argv)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc(file=log)
+            code = 1
+    return code or 0, time.perf_counter() - started
+
+
+# DÉMON
+# ======
+
+class DropWatcher:
+    """Détecte les dépôts stables et les répartit entre les pipelines."""
+
+    def __init__(self, directories=WATCH_DIRS, debounce=DEBOUNCE_SECONDS, poll=POLL_SECONDS,
+                 max_concurrent=MAX_CONCURRENT_RUNS, log_dir=LOG_DIR):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.debounce = debounce
+        self.poll = poll
+
+        # Un seul run à la fois par pipeline: la limite utile ne dépasse pas leur nombre
+        if max_concurrent > len(PIPELINES):
+            print(f" --max-concurrent {max_concurrent} ramené à {len(PIPELINES)} "
+                  f"(un run à la fois par pipeline)")
+        self.max_concurrent = min(max_concurrent, len(PIPELINES))
+        self.log_dir = os.path.abspath(log_dir)
+
+        # Une file par pipeline: un dépôt CRM en attente ne bloque pas un catalogue
+        self.queues = {kind: asyncio.Queue() for kind in PIPELINES}
+        self.observed = {}
+        self.processed = {}
+        self.queued = set()
+        self.ignored = set()
+        self.running = {}
+        self.recent = deque(maxlen=RECENT_RUNS)
+        self.counts = {'termines': 0, 'echecs': 0, 'redemarrages': 0}
+        self.started_at = time.time()
+
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._pools = {}
+
+    def _pool(self, kind):
+
+        # Un processus chaud par pipeline, créé au premier besoin (ou après un crash)
+        if kind not in self._pools:
+            self._pools[kind] = ProcessPoolExecutor(max_workers=1, initializer=_warm, initargs=(kind,))
+        return self._pools[kind]
+
+    def _discard_pool(self, kind):
+
+        pool = self._pools.pop(kind, None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.counts['redemarrages'] += 1
+
+    def _scan(self):
+
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                route = route_for(entry.name)
+                if route is None:
+                    if UNROUTED_PATTERN.match(entry.name) and entry.path not in self.ignored:
+                        self.ignored.add(entry.path)
+                        print(f" Ignoré: {entry.name} (aucune source de catalogue correspondante)")
+                    continue
+                stat = entry.stat()
+                yield entry.path, route, (stat.st_size, stat.st_mtime_ns)
+
+    def mark_existing(self):
+
+        # Les fichiers déjà présents au démarrage ne sont pas retraités
+        for path, _, signature in self._scan():
+            self.processed[path] = signature
+
+    def queue_depth(self):
+
+        return sum(q.qsize() for q in self.queues.values())
+
+    async def watch(self):
+
+        while True:
+            now = time.monotonic()
+            seen = set()
+            for path, (kind, match), signature in self._scan():
+                seen.add(path)
+                previous = self.observed.get(path)
+                if previous is None or previous[0] != signature:
+                    # Nouveau fichier ou fichier encore en cours d'écriture
+                    self.observed[path] = (signature, now)
+                    continue
+                stable = now - previous[1] >= self.debounce
+                if stable and signature[0] > 0 and self.processed.get(path) != signature and path not in self.queued:
+                    self.queued.add(path)
+                    argv = pipeline_args(kind, match, path)
+                    await self.queues[kind].put((path, argv, signature, time.monotonic()))
+                    print(f" Dépôt détecté: {os.path.basename(path)} -> {kind} (file: {self.queue_depth()})")
+            for path in set(self.observed) - seen:
+                del self.observed[path]
+            await asyncio.sleep(self.poll)
+
+    async def worker(self, kind):
+
+        # Seul consommateur de la file du pipeline: ses runs sont toujours successifs
+        loop = asyncio.get_running_loop()
+        queue = self.queues[kind]
+        while True:
+            path, argv, signature, enqueued = await queue.get()
+            async with self._slots:
+                started = time.monotonic()
+                self.running[path] = {'pipeline': kind, 'debut': time.time()}
+                log_path = os.path.join(
+                    self.log_dir, f"{datetime.now():%Y%m%dT%H%M%S}-{kind}-{os.path.basename(path)}.log")
+                try:
+                    code, seconds = await loop.run_in_executor(self._pool(kind), run_pipeline, kind, argv, log_path)
+                except BrokenProcessPool:
+                    # Processus tué en cours de run: le suivant repartira d'un processus neuf
+                    code, seconds = 1, time.monotonic() - started
+                    self._discard_pool(kind)
+                    print(f" Processus {kind} interrompu pendant {os.path.basename(path)}, relancé au prochain dépôt")
+                except Exception as e:
+                    code, seconds = 1, time.monotonic() - started
+                    print(f" Erreur du processus {kind}: {e}")
+                finally:
+                    del self.running[path]
+                    self.queued.discard(path)
+                    queue.task_done()
+
+            self.processed[path] = signature
+            self.counts['termines' if code == 0 else 'echecs'] += 1
+            self.recent.append({
+                'fichier': os.path.basename(path),
+                'pipeline': kind,
+                'code': code,
+                'attente_s': round(started - enqueued, 3),
+                'duree_s': round(seconds, 3),
+                'fin': datetime.now().isoformat(timespec='seconds'),
+                'journal': log_path,
+            })
+            status = "terminé" if code == 0 else f"échec (code {code})"
+            print(f" {os.path.basename(path)} -> {kind}: {status} en {seconds:.1f} s, journal: {log_path}")
+
+    def status(self):
+
+        waits = sorted(run['attente_s'] for run in self.recent)
+        durations = sorted(run['duree_s'] for run in self.recent)
+
+        def percentile(values, q):
+            return values[min(int(q * len(values)), len(values) - 1)] if values else None
+
+        return {
+            'file_attente': self.queue_depth(),
+            'file_par_pipeline': {kind: q.qsize() for kind, q in self.queues.items()},
+            'en_anti_rebond': sum(1 for path in self.observed
+                                  if path not in self.queued and self.processed.get(path) != self.observed[path][0]),
+            'en_cours': self.running,
+            'limite_simultanee': self.max_concurrent,
+            'termines': self.counts['termines'],
+            'echecs': self.counts['echecs'],
+            'redemarrages': self.counts['redemarrages'],
+            'ignores': sorted(os.path.basename(path) for path in self.ignored),
+            'attente_s': {'moyenne': round(sum(waits) / len(waits), 3) if waits else None,
+                          'p95': percentile(waits, 0.95)},
+            'duree_s': {'moyenne': round(sum(durations) / len(durations), 3) if durations else None,
+                        'p95': percentile(durations, 0.95)},
+            'derniers_runs': list(self.recent)[-10:],
+            'actif_depuis': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+        }
+
+    async def handle_http(self, reader, writer):
+
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request.decode('latin-1').split()
+            route = parts[1].split('?')[0] if len(parts) > 1 else ''
+            if route == '/status':
+                code, payload = 200, self.status()
+            elif route == '/health':
+                code, payload = 200, {'ok': True}
+            else:
+                code, payload = 404, {'erreur': 'route inconnue'}
+
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            reason = 'OK' if code == 200 else 'Not Found'
+            writer.write(f"HTTP/1.1 {code} {reason}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def shutdown(self):
+
+        for pool in self._pools.values():
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def serve(watcher, host='127.0.0.1', port=DEFAULT_PORT):
+
+    server = await asyncio.start_server(watcher.handle_http, host, port)
+    print(f" Surveillance de {', '.join(watcher.directories)} "
+          f"(anti-rebond {watcher.debounce:.0f} s, {watcher.max_concurrent} runs simultanés au plus)")
+    print(f" Statut: http://{host}:{port}/status")
+
+    tasks = [asyncio.create_task(watcher.watch())]
+    tasks += [asyncio.create_task(watcher.worker(kind)) for kind in PIPELINES]
+    try:
+        async with server:
+            await asyncio.gather(server.serve_forever(), *tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        watcher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Surveillance des dossiers bruts et lancement des pipelines")
+    parser.add_argument('--watch', action='append', help="dossier à surveiller (répétable)")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS,
+                        help="secondes sans changement avant de traiter un fichier")
+    parser.add_argument('--poll', type=float, default=POLL_SECONDS)
+    parser.add_argument('--max-concurrent', type=int, default=MAX_CONCURRENT_RUNS,
+                        help=f"runs simultanés au plus, tous pipelines confondus; un pipeline n'exécute "
+                             f"qu'un run à la fois, donc au plus {len(PIPELINES)} utiles")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--process-existing', action='store_true',
+                        help="traite aussi les fichiers déjà présents au démarrage")
+    args = parser.parse_args()
+
+    watcher = DropWatcher(args.watch or WATCH_DIRS, args.debounce, args.poll, args.max_concurrent)
+    if not args.process_existing:
+        watcher.mark_existing()
+    try:
+        asyncio.run(serve(watcher, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
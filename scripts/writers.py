@@ -0,0 +1,104 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ÉCRITURE DES SORTIES
+# =====================
+#
+# Chaque sortie est écrite dans un fichier temporaire du même dossier,
+# synchronisée sur disque (fsync) puis renommée sur la cible: un arrêt en
+# cours d'écriture laisse l'ancienne version intacte, jamais un fichier tronqué.
+
+def _fsync_directory(directory):
+
+    # Rend le renommage durable (sans effet sur les systèmes qui ne le permettent pas)
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, write_fn, encoding='utf-8', binary=False):
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    try:
+        handle = os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding=encoding, newline='')
+        with handle as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # mkstemp crée le fichier en 0600: on reprend les droits de la cible existante
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp_path, mode)
+
+        os.replace(tmp_path, path)
+        _fsync_directory(directory)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return path
+
+
+def atomic_write_csv(df, path, **to_csv_kwargs):
+
+    return atomic_write(path, lambda f: df.to_csv(f, **to_csv_kwargs))
+
+
+class BackgroundWriter:
+    """Sérialise les sorties en parallèle dans un pool de threads, avec écriture atomique."""
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='writer')
+        self._futures = []
+
+    def submit(self, path, write_fn):
+
+        future = self._executor.submit(atomic_write, path, write_fn)
+        self._futures.append(future)
+        return future
+
+    def submit_csv(self, df, path, **to_csv_kwargs):
+
+        # Le DataFrame ne doit plus être modifié par l'appelant après soumission
+        return self.submit(path, lambda f: df.to_csv(f, **to_csv_kwargs))
+
+    def wait(self):
+
+        # Attend toutes les écritures et relance la première erreur rencontrée
+        futures, self._futures = self._futures, []
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [future.result() for future in futures]
+
+    def close(self):
+
+        try:
+            return self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Une erreur est déjà en cours: on laisse finir les écritures sans masquer l'erreur
+            self._executor.shutdown(wait=True)
+        return False
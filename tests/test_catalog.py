@@ -0,0 +1,134 @@
+import importlib.util
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Le magasin du catalogue vit dans scripts/; catalog.py (racine) importe le utils.py de la racine
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))
+from catalog_store import CatalogStore
+
+
+def load_root_catalog():
+
+    # utils.py de la racine le temps de l'import, sans remplacer celui de scripts/
+    saved = sys.modules.pop("utils", None)
+    sys.path.insert(0, ROOT_DIR)
+    try:
+        spec = importlib.util.spec_from_file_location("catalog_racine", os.path.join(ROOT_DIR, "catalog.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(ROOT_DIR)
+        sys.modules.pop("utils", None)
+        if saved is not None:
+            sys.modules["utils"] = saved
+    return module
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_root_catalog()
+
+
+# CATALOGUE INCRÉMENTAL
+# ======================
+
+def catalog_rows(*rows):
+    return pd.DataFrame(
+        [dict(zip(["sku", "name", "category_name", "weight_kg", "price", "currency", "updated_at"], row))
+         for row in rows])
+
+
+@pytest.fixture
+def store(tmp_path):
+    with CatalogStore(str(tmp_path / "catalog.sqlite")) as store:
+        yield store
+
+
+def test_catalog_priority_wins_over_recency(store):
+    store.upsert("fr", catalog_rows(("1", "Chaise FR", "Meubles", 5.0, 40.0, "EUR", "2024-01-01")), 0)
+    store.upsert("us", catalog_rows(("1", "Chair US", "Furniture", 5.0, 45.0, "EUR", "2024-06-01")), 1)
+
+    assert store.to_frame().loc[0, "name"] == "Chaise FR"
+
+
+def test_catalog_same_priority_most_recent_wins(store):
+    store.upsert("fr", catalog_rows(("1", "Ancienne", "Meubles", 5.0, 40.0, "EUR", "2024-01-01")), 0)
+    store.upsert("be", catalog_rows(("1", "Récente", "Meubles", 5.0, 42.0, "EUR", "2024-03-01")), 0)
+    assert store.to_frame().loc[0, "name"] == "Récente"
+
+    # Nouvelle version plus récente de l'autre source: elle reprend la main
+    store.upsert("fr", catalog_rows(("1", "Mise à jour", "Meubles", 5.0, 41.0, "EUR", "2024-05-01")), 0)
+    assert store.to_frame().loc[0, "name"] == "Mise à jour"
+
+
+def test_catalog_removed_sku_falls_back_to_next_source(store):
+    store.upsert("fr", catalog_rows(("1", "Chaise FR", "Meubles", 5.0, 40.0, "EUR", "2024-01-01"),
+                                    ("2", "Table FR", "Meubles", 20.0, 90.0, "EUR", "2024-01-01")), 0)
+    store.upsert("us", catalog_rows(("1", "Chair US", "Furniture", 5.0, 45.0, "EUR", "2024-01-01")), 1)
+
+    stats = store.upsert("fr", catalog_rows(("2", "Table FR", "Meubles", 20.0, 90.0, "EUR", "2024-01-01")), 0)
+
+    assert stats == {'nouveaux': 0, 'modifies': 0, 'supprimes': 1, 'inchanges': 1}
+    assert store.to_frame().set_index("sku")["name"].to_dict() == {"1": "Chair US", "2": "Table FR"}
+
+
+def test_catalog_upsert_counts_changes(store):
+    first = store.upsert("fr", catalog_rows(("1", "Chaise", "Meubles", 5.0, 40.0, "EUR", "2024-01-01"),
+                                            ("2", "Table", "Meubles", 20.0, 90.0, "EUR", "2024-01-01")), 0)
+    second = store.upsert("fr", catalog_rows(("1", "Chaise", "Meubles", 5.0, 35.0, "EUR", "2024-02-01"),
+                                             ("2", "Table", "Meubles", 20.0, 90.0, "EUR", "2024-01-01"),
+                                             ("3", "Lampe", "Déco", 1.0, 15.0, "EUR", "2024-02-01")), 0)
+
+    assert first == {'nouveaux': 2, 'modifies': 0, 'supprimes': 0, 'inchanges': 0}
+    assert second == {'nouveaux': 1, 'modifies': 1, 'supprimes': 0, 'inchanges': 1}
+    assert len(store) == 3
+
+
+# RAFRAÎCHISSEMENT DEPUIS LES SOURCES
+# ====================================
+
+def test_catalog_paths_stay_inside_repository(catalog):
+    root = os.path.realpath(ROOT_DIR)
+
+    for path in (catalog.mapping_path, catalog.store_path, catalog.history_dir, catalog.output_clean_path):
+        assert os.path.realpath(path).startswith(root + os.sep)
+    assert os.path.exists(catalog.mapping_path)
+
+
+def write_sources(directory, fr_rows, us_rows):
+    fr = pd.DataFrame(fr_rows, columns=["sku", "name", "category", "weight", "weight_unit", "price", "currency"])
+    us = pd.DataFrame(us_rows, columns=["sku", "name", "category", "weight", "weight_unit", "price", "currency"])
+    fr.to_csv(directory / "catalog_fr.csv", index=False)
+    us.to_csv(directory / "catalog_us.csv", index=False)
+    return [("fr", str(directory / "catalog_fr.csv"), 0), ("us", str(directory / "catalog_us.csv"), 1)]
+
+
+def test_refresh_store_in_temporary_directory(catalog, tmp_path, monkeypatch):
+    pd.DataFrame({"source_category": ["audio", "gaming"], "target_category": ["Audio", "Gaming"]}) \
+        .to_csv(tmp_path / "mapping.csv", index=False)
+    monkeypatch.setattr(catalog, "mapping_path", str(tmp_path / "mapping.csv"))
+    sources = write_sources(
+        tmp_path,
+        [("A1", "Casque", "audio", 250, "g", 100.0, "EUR"), ("A2", "Manette", "gaming", 0.3, "kg", 50.0, "EUR")],
+        [("A2", "Gamepad", "gaming", 1, "lb", 60.0, "USD"), ("B1", "Speaker", "audio", 2, "lb", 100.0, "USD")],
+    )
+
+    with CatalogStore(str(tmp_path / "store" / "catalog.sqlite")) as store:
+        records = catalog.refresh_store(store, sources)
+        result = store.to_frame().set_index("sku")
+
+        # A2 présent dans les deux sources: la source FR (priorité 0) l'emporte
+        assert result["name"].to_dict() == {"A1": "Casque", "A2": "Manette", "B1": "Speaker"}
+        assert result.loc["A1", "weight_kg"] == 0.25
+        assert result.loc["A1", "price"] == 100.0
+        assert result.loc["B1", "category_name"] == "Audio"
+        assert ("nouveaux", "fr", 2) in records and ("nouveaux", "us", 2) in records
+
+        # Second run sans changement: aucune ligne reconvertie ni modifiée
+        again = catalog.refresh_store(store, sources)
+        assert ("inchanges", "fr", 2) in again and ("modifies", "fr", 0) in again
+        assert store.to_frame().equals(result.reset_index())
@@ -0,0 +1,115 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+from checkpoints import CheckpointStore
+
+
+STAGES = ["emails", "pays", "telephones"]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "clients.csv"
+    path.write_text("id,email\n1,a@x.fr\n", encoding="utf-8")
+    return path
+
+
+def stage_files(store):
+    return sorted(name for name in os.listdir(store.directory) if name.endswith(".pkl"))
+
+
+def test_later_stage_replaces_earlier_files(source, tmp_path):
+    store = CheckpointStore(source, {"rules": 1}, tmp_path / "checkpoints")
+
+    store.save("emails", "apres emails")
+    store.save("pays", "apres pays")
+
+    assert stage_files(store) == ["pays.pkl"]
+    assert store.latest(STAGES) == ("pays", "apres pays")
+    assert store.load("emails") is None
+
+
+def test_resume_after_crash(source, tmp_path):
+    directory = tmp_path / "checkpoints"
+    store = CheckpointStore(source, {"rules": 1}, directory)
+    store.save("emails", {"lignes": 1})
+    store.save("pays", {"lignes": 2})
+    # Arrêt brutal pendant l'étape suivante: fichier temporaire abandonné
+    (tmp_path / "checkpoints" / store.key / ".telephones.pkl.abc.tmp").write_bytes(b"tronque")
+
+    resumed = CheckpointStore(source, {"rules": 1}, directory)
+    assert resumed.latest(STAGES) == ("pays", {"lignes": 2})
+
+
+def test_corrupted_checkpoint_is_ignored(source, tmp_path):
+    store = CheckpointStore(source, {"rules": 1}, tmp_path / "checkpoints")
+    store.save("emails", "ok")
+    with open(os.path.join(store.directory, "emails.pkl"), "ab") as f:
+        f.write(b"x")
+
+    assert store.latest(STAGES) == (None, None)
+
+
+def test_stale_keys_of_same_input_are_pruned(source, tmp_path):
+    directory = tmp_path / "checkpoints"
+    old = CheckpointStore(source, {"rules": 1}, directory)
+    old.save("emails", "ancien")
+    other_input = tmp_path / "autres.csv"
+    other_input.write_text("id\n2\n", encoding="utf-8")
+    other = CheckpointStore(other_input, {"rules": 1}, directory)
+    other.save("emails", "autre fichier")
+
+    # Fichier d'entrée modifié: nouvelle empreinte, l'ancienne est supprimée
+    source.write_text("id,email\n1,b@x.fr\n", encoding="utf-8")
+    current = CheckpointStore(source, {"rules": 1}, directory)
+
+    assert not os.path.exists(old.directory)
+    assert os.path.exists(other.directory)
+    assert current.latest(STAGES) == (None, None)
+
+
+def test_crm_resumes_after_failed_stage(tmp_path, monkeypatch, capsys):
+    import crm
+
+    monkeypatch.chdir(SCRIPTS_DIR)
+    source = tmp_path / "clients.csv"
+    source.write_text(
+        "id,nom,prenom,email,telephone,pays,naissance\n"
+        "1,Dupont,Jean,jean@gmail.com,0642702383,France,1955-05-11\n"
+        "1,Dupont,Jean,jean@gmail.com,,France,1955-05-11\n"
+        "3,Petit,Anne,anne@hotmail.com,0665053396,fr,1970-03-04\n",
+        encoding="utf-8",
+    )
+    directory = tmp_path / "checkpoints"
+    monkeypatch.setattr(crm, "CheckpointStore", lambda path, config: CheckpointStore(path, config, directory))
+    argv = [
+        "--input", str(source), "--checkpoint",
+        "--output", str(tmp_path / "clean.csv"),
+        "--report", str(tmp_path / "kpi.csv"),
+        "--segment-report", str(tmp_path / "segments.csv"),
+        "--history-dir", str(tmp_path / "history"),
+    ]
+
+    def crash(df):
+        raise RuntimeError("arrêt simulé")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(crm, "remove_duplicates", crash)
+        with pytest.raises(RuntimeError):
+            crm.main(argv)
+    assert not os.path.exists(tmp_path / "clean.csv")
+    (key,) = os.listdir(directory)
+    assert sorted(os.listdir(directory / key)) == ["manifest.json", "validation.pkl"]
+
+    capsys.readouterr()
+    crm.main(argv)
+
+    assert "Reprise après l'étape 'validation'" in capsys.readouterr().out
+    assert len(pd.read_csv(tmp_path / "clean.csv")) == 2
+    # Run terminé: les points de reprise sont supprimés
+    assert os.listdir(directory) == []
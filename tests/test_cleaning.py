@@ -0,0 +1,158 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Les modules du pipeline CRM vivent dans scripts/ (avec leur propre utils.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from email_domains import DomainIndex, correct_email_domains, STATUS_REFERENCE, STATUS_CORRECTED, STATUS_UNKNOWN
+from utils import normalize_phone, normalize_phone_series, normalize_date, normalize_date_series
+
+
+# DOMAINES EMAIL
+# ===============
+
+@pytest.fixture(scope="module")
+def domain_index():
+    return DomainIndex()
+
+
+@pytest.mark.parametrize("domain, expected", [
+    ("gmial.com", "gmail.com"),
+    ("hotmial.fr", "hotmail.fr"),
+    ("yahooo.fr", "yahoo.fr"),
+    ("outlok.com", "outlook.com"),
+    ("gmail.con", "gmail.com"),
+    ("yaho.de", "yahoo.de"),
+])
+def test_domain_typos_are_corrected(domain_index, domain, expected):
+    assert domain_index.correct(domain) == (expected, STATUS_CORRECTED)
+
+
+@pytest.mark.parametrize("domain", [
+    "yahoo.de", "yahoo.es", "yahoo.it", "hotmail.de", "outlook.de", "gmx.de", "web.de",
+])
+def test_foreign_webmail_variants_are_kept(domain_index, domain):
+    # Autres pays pris en charge (Allemagne, Espagne, Italie): jamais réécrits vers .fr / .be
+    assert domain_index.correct(domain) == (domain, STATUS_REFERENCE)
+
+
+@pytest.mark.parametrize("domain", ["ovh.fr", "orange.com", "sfr.com", "gmx.at", "mail.orange.fr"])
+def test_never_corrected_across_suffixes(domain_index, domain):
+    assert domain_index.correct(domain) == (domain, STATUS_UNKNOWN)
+
+
+def test_short_labels_are_not_rewritten(domain_index):
+    assert domain_index.correct("msn.com") == ("msn.com", STATUS_REFERENCE)
+    assert domain_index.correct("mse.com") == ("mse.com", STATUS_UNKNOWN)
+
+
+def test_correct_email_domains_broadcasts_to_rows():
+    emails = pd.Series(["a@gmial.com", "b@yahoo.de", None, "sans-arobase", "c@gmial.com"])
+    corrected, report = correct_email_domains(emails)
+
+    assert corrected[[0, 1, 4]].tolist() == ["a@gmail.com", "b@yahoo.de", "c@gmail.com"]
+    assert corrected[[2, 3]].isna().all()
+    assert report.set_index("domaine").loc["gmial.com", "nombre"] == 2
+
+
+# TÉLÉPHONES
+# ===========
+
+@pytest.mark.parametrize("phone, country, expected", [
+    ("06 12 34 56 78", "France", "+33612345678"),
+    ("612345678", "France", "+33612345678"),
+    ("+33 (0)6 12 34 56 78", "France", "+33612345678"),
+    ("0033 6 12 34 56 78", "France", "+33612345678"),
+    ("33612345678", "France", "+33612345678"),
+    ("+44 20 7946 0958", "France", "+442079460958"),
+    ("0470 12 34 56", "Belgique", "+32470123456"),
+    ("02 123 45 67", "Belgique", "+3221234567"),
+    ("079 123 45 67", "Suisse", "+41791234567"),
+    ("030 1234567", "Allemagne", "+49301234567"),
+    ("020 7946 0958", "Royaume-Uni", "+442079460958"),
+    ("(415) 555-2671", "États-Unis", "+14155552671"),
+])
+def test_phone_normalized_per_country(phone, country, expected):
+    result = normalize_phone_series(pd.Series([phone]), pd.Series([country]))
+    assert result[0] == expected
+
+
+@pytest.mark.parametrize("phone, country, expected", [
+    # Pays sans 0 de tête: le 0 fait partie du numéro national
+    ("612 34 56 78", "Espagne", "+34612345678"),
+    ("06 1234 5678", "Italie", "+390612345678"),
+    ("0612345678", "Espagne", None),
+    # Pays avec 0 de tête: numéro trop court une fois le 0 retiré
+    ("0612345", "France", None),
+])
+def test_phone_trunk_zero(phone, country, expected):
+    result = normalize_phone_series(pd.Series([phone]), pd.Series([country]))
+    if expected is None:
+        assert pd.isna(result[0])
+    else:
+        assert result[0] == expected
+
+
+@pytest.mark.parametrize("country", ["Japon", None])
+def test_phone_unknown_country_keeps_only_international(country):
+    phones = pd.Series(["+81 3 1234 5678", "0081 3 1234 5678", "03 1234 5678", "+81 12"])
+    countries = pd.Series([country] * len(phones), dtype=object)
+    result = normalize_phone_series(phones, countries)
+
+    assert result[:2].tolist() == ["+81312345678", "+81312345678"]
+    assert result[2:].isna().all()
+
+
+def test_phone_mixed_countries_keep_row_order():
+    phones = pd.Series(["06 12 34 56 78", "(415) 555-2671", None, "0470 12 34 56"], index=[10, 20, 30, 40])
+    countries = pd.Series(["France", "États-Unis", "France", "Belgique"], index=[10, 20, 30, 40])
+    result = normalize_phone_series(phones, countries)
+
+    assert result.index.tolist() == [10, 20, 30, 40]
+    assert result[[10, 20, 40]].tolist() == ["+33612345678", "+14155552671", "+32470123456"]
+    assert pd.isna(result[30])
+
+
+def test_phone_scalar_reference_matches_series():
+    phones = ["06 12 34 56 78", "+33 (0)6 12 34 56 78", "0033 6 12 34 56 78", "33612345678", "+44 20 7946 0958",
+              "0470 12 34 56", "+32 470 12 34 56", "079 123 45 67", "0612345678", "06 1234 5678", "+81 3 1234 5678",
+              "(415) 555-2671", "0612345", "  ", "+", None, 612345678]
+    countries = ["France", "Belgique", "Suisse", "Espagne", "Italie", "États-Unis", "Japon", None]
+    pairs = [(phone, country) for phone in phones for country in countries]
+
+    fast = normalize_phone_series(pd.Series([p for p, _ in pairs], dtype=object), pd.Series([c for _, c in pairs], dtype=object))
+    reference = [normalize_phone(phone, country) for phone, country in pairs]
+
+    assert [None if pd.isna(v) else v for v in fast] == reference
+
+
+# DATES
+# ======
+
+@pytest.mark.parametrize("value, expected", [
+    # ISO: jamais d'inversion jour/mois, même quand le jour est <= 12
+    ("2024-03-05", "2024-03-05"),
+    (" 1990-11-02 ", "1990-11-02"),
+    ("2024-03-05T10:30:00", "2024-03-05"),
+    # Formats français: jour en premier
+    ("05/03/2024", "2024-03-05"),
+    ("5-3-2024", "2024-03-05"),
+])
+def test_normalize_date_formats(value, expected):
+    assert normalize_date(value).strftime("%Y-%m-%d") == expected
+
+
+def test_normalize_date_invalid_or_missing():
+    assert normalize_date(None) is None
+    assert pd.isna(normalize_date("pas une date"))
+
+
+def test_normalize_date_series_matches_scalar():
+    values = pd.Series(["2024-03-05", "05/03/2024", None, "1990-11-02", "n'importe quoi", "2024-03-05"])
+    result = normalize_date_series(values)
+
+    expected = [normalize_date(value) for value in values]
+    assert [pd.NaT if e is None else e for e in expected] == result.tolist()
+    assert result[0] == pd.Timestamp("2024-03-05")
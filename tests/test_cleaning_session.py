@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import cleaning_session
+from cleaning_session import CleaningSession, LocalQueueConsumer, clean_records
+
+
+def record(i, **fields):
+    return {"id": i, "email": f"user{i}@gmail.com", "pays": "fr", "telephone": "0612345678",
+            "naissance": "1980-05-17", **fields}
+
+
+@pytest.fixture
+def processed(monkeypatch):
+    # Trace des lots passés à clean_records; un email "boom" fait échouer tout le lot
+    batches = []
+
+    def tracking_clean(records):
+        batches.append([r["id"] for r in records])
+        if any(r["email"] == "boom" for r in records):
+            raise ValueError("enregistrement invalide")
+        return clean_records(records)
+
+    monkeypatch.setattr(cleaning_session, "clean_records", tracking_clean)
+    return batches
+
+
+def test_results_match_batch_cleaning():
+    records = [record(1, email=" User@GMAIL.COM ", pays="belgique", telephone="06 12 34 56 78", naissance="17/05/1980"),
+               record(2, email=None, pays=None, telephone=None, naissance=None)]
+    with CleaningSession(max_latency=0.001) as session:
+        results = session.clean(records, timeout=5)
+
+    assert results == clean_records(records)
+    assert results[0]["id"] == 1 and results[1]["email"] is None
+
+
+def test_bad_record_is_isolated(processed):
+    records = [record(1), record(2, email="boom"), record(3)]
+    with CleaningSession(max_batch_size=10, max_latency=0.05) as session:
+        futures = session.submit_many(records)
+        results = [future.exception(timeout=5) or future.result() for future in futures]
+
+    assert isinstance(results[1], ValueError)
+    assert [results[0]["id"], results[2]["id"]] == [1, 3]
+    assert session.failed_batches == 1
+    assert session.records == 2
+    # Lot complet en échec, puis reprise un par un
+    assert processed == [[1, 2, 3], [1], [2], [3]]
+
+
+def test_concurrent_producers_keep_order(processed):
+    producers, per_producer = 4, 300
+    futures = [[] for _ in range(producers)]
+    start = threading.Barrier(producers)
+
+    def produce(session, p):
+        start.wait()
+        for n in range(per_producer):
+            futures[p].append(session.submit(record(p * 10_000 + n)))
+
+    with CleaningSession(max_batch_size=64, max_latency=0.005) as session:
+        threads = [threading.Thread(target=produce, args=(session, p)) for p in range(producers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results = [[future.result(timeout=5)["id"] for future in share] for share in futures]
+
+    # Chaque Future reçoit le résultat de son propre enregistrement
+    assert results == [[p * 10_000 + n for n in range(per_producer)] for p in range(producers)]
+    # Chaque producteur est traité dans son ordre de soumission, sans perte ni doublon
+    order = [i for batch in processed for i in batch]
+    assert sorted(order) == sorted(i for share in results for i in share)
+    for p in range(producers):
+        mine = [i for i in order if i // 10_000 == p]
+        assert mine == sorted(mine)
+    assert max(len(batch) for batch in processed) <= 64
+
+
+def test_close_flushes_pending_records(processed):
+    session = CleaningSession(max_batch_size=1000, max_latency=60)
+    futures = session.submit_many([record(i) for i in range(5)])
+    session.close()
+
+    assert [future.result(timeout=0)["id"] for future in futures] == list(range(5))
+    with pytest.raises(RuntimeError):
+        session.submit(record(6))
+
+
+def test_cancelled_records_are_skipped(processed):
+    session = CleaningSession(max_batch_size=1000, max_latency=60)
+    futures = session.submit_many([record(1), record(2)])
+    futures[0].cancel()
+    session.close()
+
+    assert processed == [[2]]
+
+
+def test_local_queue_replies(processed):
+    with CleaningSession(max_latency=0.001) as session:
+        consumer = LocalQueueConsumer(session).start()
+        consumer.publish("a", record(1))
+        consumer.publish("b", record(2, email="boom"))
+        replies = dict(consumer.outbox.get(timeout=5) for _ in range(2))
+        consumer.stop()
+
+    assert replies["a"]["id"] == 1
+    assert isinstance(replies["b"], ValueError)
@@ -0,0 +1,108 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from integrity import (BloomFilter, IntegrityChecker, SortedKeySet, REASON_BOTH, REASON_CLIENT,
+                       REASON_SKU, check_sales_file)
+from kpi_history import KpiHistory, ALL_COLUMNS
+
+
+# ENSEMBLES DE CLÉS
+# ==================
+
+@pytest.mark.parametrize("key_set", [SortedKeySet, BloomFilter])
+def test_key_sets_membership(key_set):
+    keys = key_set(["A1", " B2 ", "", None, "C3"])
+
+    result = keys.contains(pd.Series(["A1", "B2", "C3", "Z9", None, " "]))
+
+    assert result[:3].tolist() == [True, True, True]
+    assert result[4:].tolist() == [False, False]
+    assert len(keys) == 3
+
+
+def test_sorted_key_set_rejects_unknown_keys():
+    keys = SortedKeySet([f"SKU{i}" for i in range(1000)])
+    result = keys.contains(pd.Series([f"SKU{i}" for i in range(1000, 2000)]))
+
+    assert not result.any()
+
+
+def test_bloom_filter_false_positive_rate():
+    keys = BloomFilter([f"SKU{i}" for i in range(5000)], error_rate=0.01)
+    result = keys.contains(pd.Series([f"AUTRE{i}" for i in range(20000)]))
+
+    assert result.mean() < 0.03
+
+
+# CONTRÔLE DES VENTES
+# ====================
+
+@pytest.fixture
+def references(tmp_path):
+    catalog = tmp_path / "catalog.csv"
+    clients = tmp_path / "clients.csv"
+    pd.DataFrame({"sku": ["A1", "B2"], "nom": ["Casque", "Souris"]}).to_csv(catalog, index=False)
+    pd.DataFrame({"id": [1, 2], "nom": ["Dupont", "Martin"]}).to_csv(clients, index=False)
+    return {"catalog_path": str(catalog), "clients_path": str(clients)}
+
+
+def run_check(tmp_path, references, rows, method="sorted"):
+    sales = tmp_path / "sales.csv"
+    pd.DataFrame(rows, columns=["date", "sku", "client", "montant"]).to_csv(sales, index=False)
+    counts = check_sales_file(str(sales), method, valid_path=str(tmp_path / "valides.csv"),
+                              quarantine_path=str(tmp_path / "quarantaine.csv"),
+                              history_dir=str(tmp_path / "history"), **references)
+    return counts
+
+
+@pytest.mark.parametrize("method", ["sorted", "bloom"])
+def test_orphans_are_quarantined_with_reason(tmp_path, references, method):
+    rows = [
+        ("2024-03-01", "A1", "1", 10),
+        ("2024-03-01", "Z9", "1", 20),
+        ("2024-03-02", "B2", "7", 30),
+        ("2024-03-02", "Z9", "7", 40),
+        ("2024-03-03", "B2", "2", 50),
+    ]
+    counts = run_check(tmp_path, references, rows, method)
+
+    valid = pd.read_csv(tmp_path / "valides.csv")
+    quarantine = pd.read_csv(tmp_path / "quarantaine.csv")
+    assert valid["montant"].tolist() == [10, 50]
+    assert quarantine["motif"].tolist() == [REASON_SKU, REASON_CLIENT, REASON_BOTH]
+    assert counts["orphelines"] == 3
+
+
+def test_kpis_keep_counts_and_rate_apart():
+    rows = [("2024-03-01", "A1", "1", 10), ("2024-03-01", "Z9", "1", 20), ("2024-03-02", "B2", "7", 30)]
+    checker = IntegrityChecker(SortedKeySet(["A1", "B2"]), SortedKeySet(["1"]))
+    checker.split(pd.DataFrame(rows, columns=["date", "sku", "client", "montant"]).astype(str))
+    kpis = checker.kpis().set_index("Métrique")
+
+    assert kpis["Lignes"].dtype == np.int64
+    assert kpis.loc["Lignes orphelines", "Lignes"] == 2
+    assert kpis.loc["Lignes orphelines", "Part (%)"] == pytest.approx(66.67)
+
+
+def test_orphan_counts_go_to_kpi_history(tmp_path, references):
+    rows = [("2024-03-01", "A1", "1", 10), ("2024-03-01", "Z9", "1", 20)]
+    run_check(tmp_path, references, rows)
+
+    history = KpiHistory(str(tmp_path / "history")).load("ventes")
+    values = history.set_index(["metrique", "colonne"])["valeur"]
+    assert values[("lignes_orphelines", ALL_COLUMNS)] == 1
+    assert values[("lignes_orphelines", REASON_SKU)] == 1
+    assert values[("taux_orphelines", ALL_COLUMNS)] == 50.0
+
+
+def test_empty_sales_file_keeps_headers(tmp_path, references):
+    counts = run_check(tmp_path, references, [])
+
+    assert counts["lignes"] == 0
+    assert pd.read_csv(tmp_path / "valides.csv").columns.tolist() == ["date", "sku", "client", "montant"]
+    assert pd.read_csv(tmp_path / "quarantaine.csv").columns.tolist() == ["date", "sku", "client", "montant", "motif"]
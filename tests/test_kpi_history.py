@@ -0,0 +1,91 @@
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import kpi_history
+from kpi_history import KpiHistory, ALL_COLUMNS
+
+
+def records(**values):
+    rows = [(metric, ALL_COLUMNS, value) for metric, value in values.items()]
+    frame = pd.DataFrame(rows, columns=["metrique", "colonne", "valeur"])
+    frame.insert(0, "etat", "après")
+    return frame
+
+
+@pytest.fixture
+def history(tmp_path):
+    return KpiHistory(str(tmp_path / "history"), file_format="csv")
+
+
+def test_backend_is_reported_on_open(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(kpi_history, "history_format", lambda: "csv")
+    KpiHistory(str(tmp_path))
+
+    assert "format csv (pyarrow absent)" in capsys.readouterr().out
+
+
+def test_partitions_by_dataset_and_date(history, tmp_path):
+    history.append("crm", records(missing_rate=1.0), run_at=datetime(2024, 3, 1, 8))
+    history.append("crm", records(missing_rate=2.0), run_at=datetime(2024, 3, 2, 8))
+    history.append("catalog", records(total_sku=10), run_at=datetime(2024, 3, 2, 9))
+
+    base = tmp_path / "history" / "dataset=crm"
+    assert sorted(os.listdir(base)) == ["date=2024-03-01", "date=2024-03-02"]
+    assert history.load("crm")["valeur"].tolist() == [1.0, 2.0]
+
+
+def test_load_only_opens_selected_partitions(history, monkeypatch):
+    for day in (1, 2, 3):
+        history.append("crm", records(missing_rate=float(day)), run_at=datetime(2024, 3, day, 8))
+
+    opened = []
+    read = KpiHistory._read
+    monkeypatch.setattr(KpiHistory, "_read", lambda self, path, *args: opened.append(path) or read(self, path, *args))
+    loaded = history.load("crm", start="2024-03-02", end="2024-03-02")
+
+    assert loaded["valeur"].tolist() == [2.0]
+    assert len(opened) == 1 and "date=2024-03-02" in opened[0]
+
+
+def test_load_filters_metrics_and_columns(history):
+    history.append("crm", records(missing_rate=1.0, duplicate_rate=3.0), run_at=datetime(2024, 3, 1))
+
+    assert history.load("crm", metrics=["duplicate_rate"])["valeur"].tolist() == [3.0]
+    assert history.load("crm", columns=["email"]).empty
+
+
+def test_trend_reports_run_to_run_change(history):
+    for day, rate in ((1, 90.0), (2, 92.5), (3, 91.0)):
+        history.append("crm", records(global_completeness_rate=rate), run_at=datetime(2024, 3, day))
+
+    trend = history.trend("crm", "global_completeness_rate")
+    assert trend["valeur"].tolist() == [90.0, 92.5, 91.0]
+    assert trend["ecart"].tolist()[1:] == [2.5, -1.5]
+
+
+def test_regressions_follow_metric_direction_and_threshold(history):
+    # Complétude: plus haut est meilleur (seuil 1 point); doublons: plus bas est meilleur (0,5)
+    history.append("crm", records(global_completeness_rate=95.0, duplicate_rate=1.0), run_at=datetime(2024, 3, 1))
+    history.append("crm", records(global_completeness_rate=93.0, duplicate_rate=1.2), run_at=datetime(2024, 3, 2))
+    history.append("crm", records(global_completeness_rate=96.0, duplicate_rate=2.0), run_at=datetime(2024, 3, 3))
+
+    found = history.regressions("crm")
+    assert list(zip(found["metrique"], found["run_at"].str[:10])) == [
+        ("global_completeness_rate", "2024-03-02"),
+        ("duplicate_rate", "2024-03-03"),
+    ]
+    assert found["ecart"].tolist() == pytest.approx([-2.0, 0.8])
+
+
+def test_regressions_both_ways_for_volume_metrics(history):
+    history.append("catalog", records(nouveaux=100), run_at=datetime(2024, 3, 1))
+    history.append("catalog", records(nouveaux=900), run_at=datetime(2024, 3, 2))
+    history.append("catalog", records(nouveaux=50), run_at=datetime(2024, 3, 3))
+
+    assert len(history.regressions("catalog")) == 2
+    assert history.regressions("catalog", threshold=1000).empty
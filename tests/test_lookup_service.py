@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from lookup_service import ClientIndex, ReloadingIndex, make_handler, phone_key
+
+
+CLIENTS = pd.DataFrame({
+    "id": ["1", "2", "3", "4"],
+    "nom": ["Dupont", "Dupuis", "Martin", "Durand"],
+    "prenom": ["Jean", "Élodie", "Paul", "Anne"],
+    "email": ["jean@gmail.com", "elodie@yahoo.fr", "paul@free.fr", None],
+    "telephone_normalise": ["+33612345678", "+32470123456", None, "+33698765432"],
+    "pays": ["France", "Belgique", "France", "France"],
+})
+
+
+@pytest.fixture
+def clients_path(tmp_path):
+    path = tmp_path / "clients_clean.csv"
+    CLIENTS.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def server(clients_path):
+    holder = ReloadingIndex(clients_path, interval=0.05)
+    holder.start()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(holder))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", holder
+    httpd.shutdown()
+    httpd.server_close()
+    holder.stop()
+
+
+def request(url, body=None):
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+# INDEX
+# ======
+
+def test_lookup_by_each_key(clients_path):
+    index = ClientIndex(clients_path)
+
+    assert [r["nom"] for r in index.lookup({"id": 2})] == ["Dupuis"]
+    assert [r["id"] for r in index.lookup({"email": " JEAN@gmail.com "})] == ["1"]
+    assert [r["id"] for r in index.lookup({"telephone": "06 12 34 56 78"})] == ["1"]
+    assert [r["id"] for r in index.lookup({"telephone": "0470 12 34 56", "pays": "Belgique"})] == ["2"]
+    assert [r["id"] for r in index.lookup({"nom": "du"})] == ["1", "2", "4"]
+    assert [r["id"] for r in index.lookup({"nom": "DUP", "limit": "1"})] == ["1"]
+    assert index.lookup({"id": "99"}) == []
+
+
+@pytest.mark.parametrize("limit", ["-1", -5, "0", "abc", 2.5, True])
+def test_invalid_limit_is_rejected(clients_path, limit):
+    with pytest.raises(ValueError):
+        ClientIndex(clients_path).lookup({"nom": "du", "limit": limit})
+
+
+def test_phone_key_forms():
+    assert phone_key("0033 6 12 34 56 78") == "+33612345678"
+    assert phone_key("+32 470 12 34 56") == "+32470123456"
+    assert phone_key("02 123 45 67", "Belgique") == "+3221234567"
+    assert phone_key("0612", "France") is None
+
+
+# SERVICE HTTP
+# =============
+
+def test_http_lookup_and_errors(server):
+    url, _ = server
+
+    status, payload = request(f"{url}/clients?nom=dup&limit=5")
+    assert status == 200 and [r["id"] for r in payload["resultats"]] == ["1", "2"]
+
+    assert request(f"{url}/clients?nom=dup&limit=-1")[0] == 400
+    assert request(f"{url}/clients?ville=Lyon")[0] == 400
+    assert request(f"{url}/inconnu")[0] == 404
+
+
+def test_http_batch_isolates_bad_queries(server):
+    url, _ = server
+
+    status, payload = request(f"{url}/clients/batch", {"queries": [
+        {"email": "paul@free.fr"}, {"nom": "du", "limit": -3}, "pas un objet", {"id": "1"},
+    ]})
+
+    assert status == 200
+    results = payload["resultats"]
+    assert [r["id"] for r in results[0]] == ["3"]
+    assert "erreur" in results[1] and "erreur" in results[2]
+    assert [r["id"] for r in results[3]] == ["1"]
+    assert request(f"{url}/clients/batch", {"autre": []})[0] == 400
+
+
+def test_hot_reload_keeps_serving(server, clients_path):
+    url, holder = server
+    previous = holder.current
+
+    updated = pd.concat([CLIENTS, pd.DataFrame([{"id": "5", "nom": "Petit", "prenom": "Luc"}])])
+    tmp = clients_path + ".tmp"
+    updated.to_csv(tmp, index=False)
+    os.replace(tmp, clients_path)
+
+    deadline = time.monotonic() + 5
+    while holder.current is previous and time.monotonic() < deadline:
+        assert request(f"{url}/clients?id=1")[0] == 200
+        time.sleep(0.01)
+
+    assert [r["nom"] for r in request(f"{url}/clients?id=5")[1]["resultats"]] == ["Petit"]
@@ -0,0 +1,100 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from utils import merge_duplicates
+from memory_stats import CopyTracker, copy_on_write, copy_on_write_enabled, pandas_major_version
+
+
+# DOUBLONS
+# =========
+
+def test_merge_duplicates_keeps_most_complete():
+    df = pd.DataFrame({
+        "email": ["a@x.fr", "a@x.fr", "b@x.fr", "a@x.fr", "b@x.fr"],
+        "telephone": [None, "+33612345678", None, "+33612345678", None],
+        "ville": [None, None, "Lyon", "Paris", "Nice"],
+    })
+    result = merge_duplicates(df, ["email"])
+
+    # Ligne la plus complète de chaque groupe; à égalité, la première rencontrée
+    assert sorted(result.index) == [2, 3]
+    assert result.loc[2, "ville"] == "Lyon"
+
+
+def test_merge_duplicates_orders_by_completeness():
+    df = pd.DataFrame({
+        "email": ["a", "b", "c", "b"],
+        "telephone": [None, None, "1", "2"],
+        "ville": [None, None, "Lyon", None],
+    })
+    result = merge_duplicates(df, ["email"])
+
+    # Les lignes retenues sortent des plus complètes aux moins complètes, ordre stable sinon
+    assert result.index.tolist() == [2, 3, 0]
+
+
+def test_merge_duplicates_groups_missing_keys():
+    df = pd.DataFrame({"email": [None, None, "a"], "ville": [None, "Lyon", None]})
+    result = merge_duplicates(df, ["email"])
+
+    assert sorted(result.index) == [1, 2]
+
+
+def test_merge_duplicates_other_keep_modes():
+    df = pd.DataFrame({"email": ["a", "a"], "ville": [None, "Lyon"]})
+
+    assert merge_duplicates(df, ["email"], keep="first").index.tolist() == [0]
+    assert merge_duplicates(df, ["email"], keep="last").index.tolist() == [1]
+
+
+
+def test_merge_duplicates_leaves_input_untouched():
+    df = pd.DataFrame({"email": ["a", "a"], "ville": [None, "Lyon"]})
+    before = df.copy()
+    merge_duplicates(df, ["email"])
+
+    pd.testing.assert_frame_equal(df, before)
+
+
+# MESURE DES COPIES
+# ==================
+
+def test_copy_tracker_reports_deep_frame_size():
+    df = pd.DataFrame({"nom": ["un nom assez long pour peser"] * 1000, "n": range(1000)})
+    tracker = CopyTracker()
+    tracker.start(df)
+    tracker.stop("lecture", df)
+
+    stage = tracker.stages[0]
+    assert stage["octets_copies"] == 0
+    assert stage["octets_frame"] == df.memory_usage(index=True, deep=True).sum()
+    assert stage["octets_frame"] > df.memory_usage(index=True, deep=False).sum()
+
+
+def test_copy_tracker_counts_materialized_columns():
+    df = pd.DataFrame({"a": range(1000), "b": range(1000)})
+    tracker = CopyTracker()
+    tracker.start(df)
+    df = df.assign(c=df["a"] * 2)
+    copied = tracker.stop("calcul", df)
+
+    assert copied == df["c"].to_numpy().nbytes
+
+
+@pytest.mark.skipif(pandas_major_version() >= 3, reason="copy-on-write toujours actif à partir de pandas 3")
+def test_copy_on_write_is_scoped():
+    assert not copy_on_write_enabled()
+    with copy_on_write():
+        assert copy_on_write_enabled()
+    assert not copy_on_write_enabled()
+
+
+def test_copy_on_write_disabled_is_a_no_op():
+    enabled = copy_on_write_enabled()
+    with copy_on_write(False) as active:
+        assert active == enabled
+    assert copy_on_write_enabled() == enabled
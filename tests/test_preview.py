@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from preview import estimate_rows, t_95
+from readers import sample_csv_blocks
+
+
+ROWS = 30_000
+
+
+@pytest.fixture(scope="module")
+def drifting_csv(tmp_path_factory):
+    # Longueur des lignes qui dérive: identifiants croissants, puis un export aux lignes plus longues
+    rng = np.random.default_rng(0)
+    path = tmp_path_factory.mktemp("apercu") / "clients.csv"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,nom,commentaire\n")
+        for i in range(ROWS):
+            width = rng.integers(5, 40) + (30 if i > ROWS * 0.7 else 0)
+            f.write(f"{i},Client{i % 97},{'x' * width}\n")
+    return str(path)
+
+
+def test_t_quantiles():
+    assert t_95(1) == 12.71
+    assert t_95(15) == pytest.approx(2.131, abs=0.01)
+    assert t_95(30) == pytest.approx(2.042, abs=0.01)
+    assert t_95(1000) == pytest.approx(1.962, abs=0.01)
+
+
+def test_complete_pilot_counts_exactly(drifting_csv):
+    pilot = sample_csv_blocks(drifting_csv, 10 ** 9)
+
+    assert estimate_rows(pilot) == pytest.approx((ROWS, ROWS, ROWS))
+
+
+def test_row_count_interval_coverage(drifting_csv):
+    # 16 blocs de 16 Ko sur ~80: l'intervalle à 95 % doit contenir le vrai nombre de lignes
+    seeds = 100
+    covered = 0
+    for seed in range(seeds):
+        pilot = sample_csv_blocks(drifting_csv, 16 * 16 * 1024, block_bytes=16 * 1024, seed=seed)
+        assert len(pilot.block_lines) == 16
+        _, low, high = estimate_rows(pilot)
+        covered += low <= ROWS <= high
+
+    assert covered / seeds >= 0.93
+
+
+def test_blocks_cover_whole_file(drifting_csv):
+    # Un bloc par tranche: le début et la fin du fichier sont toujours représentés
+    pilot = sample_csv_blocks(drifting_csv, 8 * 16 * 1024, block_bytes=16 * 1024, seed=3)
+    ids = pilot.df["id"].to_numpy()
+
+    assert ids.min() < ROWS / 8 and ids.max() > ROWS * 7 / 8
+    assert pilot.block_weights.sum() == pilot.total_blocks
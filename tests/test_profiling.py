@@ -0,0 +1,86 @@
+import gzip
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import profiling
+from profiling import profile_column, read_profile_input, value_shapes, value_types
+
+
+def measure(profile, name):
+    rows = profile[profile["mesure"] == name]
+    return dict(zip(rows["valeur"], rows["nombre"]))
+
+
+def test_profile_column_counts():
+    values = pd.Series(["0612345678", "0612345678", "", "  ", "+33 6 12", "user1@mail.com", "12/05/1980", "3,5"])
+    profile = profile_column("telephone", values)
+
+    assert measure(profile, "resume") == {"lignes": 8, "vides": 2, "distinctes": 5,
+                                          "longueur_min": 3, "longueur_max": 14}
+    assert measure(profile, "type") == {"entier": 2, "vide": 2, "texte": 1, "email": 1, "date": 1, "decimal": 1}
+    assert measure(profile, "longueur") == {"3": 1, "8": 1, "10": 3, "14": 1}
+    assert list(measure(profile, "top_valeur").items())[0] == ("0612345678", 2)
+    assert measure(profile, "forme")["9999999999"] == 2
+    assert measure(profile, "forme")["aaaa9@aaaa.aaa"] == 1
+
+
+def test_profile_matches_row_by_row_counts():
+    rng = np.random.default_rng(0)
+    pool = ["France", "france", "FR", "", "Belgique", "06 12", "0612345678", "a@b.fr", "2020-01-02", "1.5"]
+    values = pd.Series(rng.choice(pool, size=5000, p=[.3, .1, .1, .1, .1, .05, .1, .05, .05, .05]))
+    profile = profile_column("pays", values)
+
+    filled = values[values.str.strip() != ""]
+    assert measure(profile, "type") == value_types(values).value_counts().to_dict()
+    assert measure(profile, "longueur") == {str(k): v for k, v in filled.str.len().value_counts().items()}
+    assert measure(profile, "top_valeur") == filled.value_counts().head(10).to_dict()
+    assert measure(profile, "forme") == value_shapes(filled).value_counts().head(10).to_dict()
+
+
+def test_patterns_run_on_distinct_values_only(monkeypatch):
+    seen = []
+    original = profiling.value_types
+    monkeypatch.setattr(profiling, "value_types", lambda values: seen.append(len(values)) or original(values))
+
+    profile_column("pays", pd.Series(["France", "Belgique", "France"] * 1000))
+
+    assert seen == [2]
+
+
+# ENTRÉES VOLUMINEUSES
+# =====================
+
+@pytest.fixture
+def repetitive_csv(tmp_path):
+    # Très compressible: quelques Ko en gzip pour ~1 Mo décompressé
+    df = pd.DataFrame({"id": range(20_000), "pays": "France", "commentaire": "x" * 40})
+    path = tmp_path / "clients.csv"
+    df.to_csv(path, index=False)
+    with open(path, "rb") as src, gzip.open(str(path) + ".gz", "wb") as dst:
+        dst.write(src.read())
+    return str(path)
+
+
+def test_compressed_threshold_uses_decompressed_size(repetitive_csv):
+    gz_path = repetitive_csv + ".gz"
+    compressed, decompressed = os.path.getsize(gz_path), os.path.getsize(repetitive_csv)
+    threshold = (compressed + decompressed) // 2
+
+    df, total, sampled = read_profile_input(gz_path, sample_rows=1000, threshold_bytes=threshold)
+    assert sampled and total == 20_000 and len(df) == 1000
+    assert df["id"].astype(int).is_monotonic_increasing
+
+    df, total, sampled = read_profile_input(gz_path, sample_rows=1000, threshold_bytes=decompressed * 2)
+    assert not sampled and len(df) == total == 20_000
+
+
+def test_large_plain_file_is_sampled_by_blocks(repetitive_csv):
+    df, total, sampled = read_profile_input(repetitive_csv, sample_rows=1000, threshold_bytes=10_000)
+
+    assert sampled and 0 < len(df) < 20_000
+    assert total == pytest.approx(20_000, rel=0.05)
@@ -0,0 +1,145 @@
+import bz2
+import gzip
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from readers import plan_partitions, read_csv_parallel, iter_csv_chunks
+from readers import read_csv_input, DecompressionStats, ThreadedDecompressor
+import readers
+
+
+ROWS = 4000
+
+# Partitions de 1 Ko: le fichier de test (~150 Ko) est découpé en plusieurs plages
+SMALL_PARTITION = 1024
+
+
+@pytest.fixture
+def mixed_csv(tmp_path):
+
+    # Colonnes dont le type inféré change entre le début et la fin du fichier
+    half = ROWS // 2
+    df = pd.DataFrame({
+        "id": range(ROWS),
+        "note": [None] * half + [f"texte {i}" for i in range(half)],
+        "montant": list(range(half)) + [i + 0.5 for i in range(half)],
+        "code": [f"{i:03d}" for i in range(half)] + [f"A{i}" for i in range(half)],
+        "actif": [True, False] * (half // 2) + [None] * half,
+        "telephone": ["0612345678"] * ROWS,
+    })
+    path = tmp_path / "clients.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+# LECTURE PARALLÈLE
+# ==================
+
+def test_mixed_file_is_split_into_several_ranges(mixed_csv):
+    _, ranges = plan_partitions(mixed_csv, n_workers=4, min_partition_bytes=SMALL_PARTITION)
+    assert len(ranges) == 4
+
+
+def test_parallel_read_matches_read_csv(mixed_csv):
+    result = read_csv_parallel(mixed_csv, n_workers=4, min_partition_bytes=SMALL_PARTITION)
+    pd.testing.assert_frame_equal(result, pd.read_csv(mixed_csv))
+
+
+def test_parallel_read_keeps_forced_dtypes(mixed_csv):
+    dtype = {"telephone": str}
+    result = read_csv_parallel(mixed_csv, n_workers=4, dtype=dtype, min_partition_bytes=SMALL_PARTITION)
+
+    pd.testing.assert_frame_equal(result, pd.read_csv(mixed_csv, dtype=dtype))
+    assert result.loc[0, "telephone"] == "0612345678"
+
+
+@pytest.fixture
+def quoted_newlines_csv(tmp_path):
+    notes = ['ligne\nsuite "citée"' if i % 7 == 0 else 'a,"b"' for i in range(ROWS)]
+    path = tmp_path / "notes.csv"
+    pd.DataFrame({"id": range(ROWS), "note": notes}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_quoted_newlines_disable_splitting(quoted_newlines_csv, tmp_path):
+    _, ranges = plan_partitions(quoted_newlines_csv, n_workers=4, min_partition_bytes=SMALL_PARTITION)
+    assert ranges == []
+
+    # Guillemets sans retour à la ligne: le découpage reste possible
+    path = tmp_path / "guillemets.csv"
+    pd.DataFrame({"id": range(ROWS), "note": ['a,"b"'] * ROWS}).to_csv(path, index=False)
+    _, ranges = plan_partitions(str(path), n_workers=4, min_partition_bytes=SMALL_PARTITION)
+    assert len(ranges) == 4
+
+
+def test_quoted_newlines_fall_back_to_single_process(quoted_newlines_csv):
+    result = read_csv_parallel(quoted_newlines_csv, n_workers=4, min_partition_bytes=SMALL_PARTITION)
+    pd.testing.assert_frame_equal(result, pd.read_csv(quoted_newlines_csv))
+
+
+def test_quoted_newlines_chunked_read(quoted_newlines_csv):
+    chunks = list(iter_csv_chunks(quoted_newlines_csv, chunksize=700, n_workers=2, dtype=str))
+
+    assert [len(chunk) for chunk in chunks] == [700] * 5 + [500]
+    pd.testing.assert_frame_equal(pd.concat(chunks), pd.read_csv(quoted_newlines_csv, dtype=str))
+
+
+# ENTRÉES COMPRESSÉES
+# ====================
+
+def compress(source, compression):
+
+    with open(source, "rb") as f:
+        data = f.read()
+    if compression == "gz":
+        return gzip.compress(data)
+    if compression == "bz2":
+        return bz2.compress(data)
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.fixture(params=["gz", "bz2", "zst"])
+def compressed_csv(request, mixed_csv):
+    path = f"{mixed_csv}.{request.param}"
+    with open(path, "wb") as f:
+        f.write(compress(mixed_csv, request.param))
+    return path
+
+
+def test_compressed_full_read_matches_plain(compressed_csv, mixed_csv):
+    stats = DecompressionStats()
+    result = read_csv_input(compressed_csv, dtype={"telephone": str}, stats=stats)
+
+    pd.testing.assert_frame_equal(result, pd.read_csv(mixed_csv, dtype={"telephone": str}))
+    assert stats.decompressed_bytes == os.path.getsize(mixed_csv)
+    assert stats.compressed_bytes == os.path.getsize(compressed_csv)
+
+
+def test_compressed_chunked_read_matches_plain(compressed_csv, mixed_csv):
+    chunks = list(iter_csv_chunks(compressed_csv, chunksize=700, dtype=str))
+
+    assert [len(chunk) for chunk in chunks] == [700] * 5 + [500]
+    pd.testing.assert_frame_equal(pd.concat(chunks), pd.read_csv(mixed_csv, dtype=str))
+
+
+def test_decompression_time_excludes_waiting_for_parser(mixed_csv, tmp_path, monkeypatch):
+    path = str(tmp_path / "lent.csv.gz")
+    with open(path, "wb") as f:
+        f.write(compress(mixed_csv, "gz"))
+
+    # Blocs minuscules et file d'un bloc: le producteur attend l'analyseur, lent ici
+    monkeypatch.setattr(readers, "DECOMPRESS_BLOCK_BYTES", 4096)
+    monkeypatch.setattr(readers, "DECOMPRESS_QUEUE_BLOCKS", 1)
+    stats = DecompressionStats()
+    with ThreadedDecompressor(path, stats) as stream:
+        while stream.read(4096):
+            time.sleep(0.005)
+
+    assert stats.blocked_seconds > 0.1
+    assert stats.seconds < stats.blocked_seconds
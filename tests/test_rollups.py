@@ -0,0 +1,94 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import rollups
+from rollups import RevenueRollups, refresh_from_file
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+
+    # Dimensions fixes: pas besoin du catalogue ni des clients nettoyés
+    categories = pd.Series({"A1": "Audio", "G1": "Gaming"})
+    countries = pd.Series({"1": "France", "2": "Belgique"})
+    monkeypatch.setattr(rollups, "load_dimensions", lambda: (categories, countries))
+    return tmp_path
+
+
+def write_sales(path, rows):
+    pd.DataFrame(rows, columns=["date", "sku", "client", "montant"]).to_csv(path, index=False)
+    return str(path)
+
+
+def refresh(workspace, path, mode="append"):
+    return refresh_from_file(path, mode, db_path=str(workspace / "rollups.sqlite"),
+                             export_path=str(workspace / "daily_revenue.csv"))
+
+
+def totals(workspace):
+    with RevenueRollups(str(workspace / "rollups.sqlite")) as store:
+        return store.query(by=("day", "category", "country"))
+
+
+SALES = [
+    ("2024-03-01", "A1", "1", 10.0),
+    ("2024-03-01", "G1", "2", 20.0),
+    ("2024-03-02", "A1", "1", 5.0),
+]
+
+
+def test_reapplying_same_file_changes_nothing(workspace):
+    path = write_sales(workspace / "sales.csv", SALES)
+
+    assert refresh(workspace, path) == 2
+    first = totals(workspace)
+    assert refresh(workspace, path) == 0
+    pd.testing.assert_frame_equal(totals(workspace), first)
+    assert first["revenue"].sum() == 35.0
+
+
+def test_same_content_under_another_name_is_not_counted_twice(workspace):
+    refresh(workspace, write_sales(workspace / "sales.csv", SALES))
+    first = totals(workspace)
+
+    assert refresh(workspace, write_sales(workspace / "copie.csv", SALES)) == 0
+    pd.testing.assert_frame_equal(totals(workspace), first)
+
+
+def test_changed_file_replaces_its_contribution(workspace):
+    path = write_sales(workspace / "sales.csv", SALES)
+    other = write_sales(workspace / "autres.csv", [("2024-03-01", "A1", "1", 100.0)])
+    refresh(workspace, path)
+    refresh(workspace, other)
+
+    # Nouvelle version: le 2 mars disparaît, le 1er mars change, le 3 mars apparaît
+    write_sales(workspace / "sales.csv", [("2024-03-01", "A1", "1", 12.0), ("2024-03-03", "G1", "2", 7.0)])
+    assert refresh(workspace, path) == 3
+
+    result = totals(workspace).set_index(["day", "category", "country"])
+    assert result["revenue"].to_dict() == {
+        ("2024-03-01", "Audio", "France"): 112.0,
+        ("2024-03-03", "Gaming", "Belgique"): 7.0,
+    }
+    assert result.loc[("2024-03-01", "Audio", "France"), "lines"] == 2
+
+
+def test_undated_rows_are_counted(workspace, capsys):
+    path = write_sales(workspace / "sales.csv", SALES + [("pas une date", "A1", "1", 99.0), (None, "G1", "2", 1.0)])
+
+    refresh(workspace, path)
+
+    assert "Lignes ignorées (date illisible): 2" in capsys.readouterr().out
+    assert totals(workspace)["revenue"].sum() == 35.0
+
+
+def test_replace_mode_recomputes_days(workspace):
+    refresh(workspace, write_sales(workspace / "sales.csv", SALES))
+    refresh(workspace, write_sales(workspace / "correctif.csv", [("2024-03-01", "A1", "1", 1.0)]), mode="replace")
+
+    result = totals(workspace).set_index("day")["revenue"]
+    assert result.to_dict() == {"2024-03-01": 1.0, "2024-03-02": 5.0}
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from utils import SEGMENT_ALL, SEGMENT_MISSING, kpi_quality, kpi_quality_segmented
+from validation import RuleSet
+
+
+@pytest.fixture
+def rules():
+    return RuleSet([
+        {"name": "email_present", "type": "required", "column": "email"},
+        {"name": "pays_connu", "type": "allowed", "column": "pays", "values": ["France", "Belgique"]},
+    ])
+
+
+@pytest.fixture
+def clients():
+    return pd.DataFrame({
+        "email": ["a@x.fr", None, "a@x.fr", "b@x.fr", None, "a@x.fr", "c@x.fr", None],
+        "pays": ["France", "France", "France", "Belgique", "Japon", None, "Belgique", "France"],
+        "canal": ["web", "web", "web", "magasin", "web", "magasin", "web", "magasin"],
+        "ville": ["Lyon", None, "Lyon", "Liège", None, "Lyon", None, "Nice"],
+    })
+
+
+def metric(report, dimension, segment, name, colonne=SEGMENT_ALL):
+    row = report[(report["dimension"] == dimension) & (report["segment"] == segment)
+                 & (report["metrique"] == name) & (report["colonne"] == colonne)]
+    assert len(row) == 1, (dimension, segment, name, colonne)
+    return row["valeur"].iloc[0]
+
+
+def test_single_groupby_matches_per_segment_loop(clients, rules):
+    # Clé externe (absente de df): deux lignes identiques peuvent tomber dans des lots différents
+    lots = pd.Series(["L1", "L1", "L2", "L1", "L2", "L2", "L1", "L2"], index=clients.index)
+    report = kpi_quality_segmented(clients, {"pays": "pays", "canal": "canal", "lot": lots}, rules)
+
+    # Référence: kpi_quality sur chaque segment pris séparément
+    expected = {"global": {SEGMENT_ALL: clients}}
+    for dimension, keys in (("pays", clients["pays"]), ("canal", clients["canal"]), ("lot", lots)):
+        keys = keys.fillna(SEGMENT_MISSING)
+        expected[dimension] = {segment: part for segment, part in clients.groupby(keys)}
+
+    for dimension, parts in expected.items():
+        for segment, part in parts.items():
+            kpi = kpi_quality(part, rules=rules)
+            assert metric(report, dimension, segment, "lignes") == kpi["total_rows"]
+            assert metric(report, dimension, segment, "taux_completude") == pytest.approx(kpi["global_completeness_rate"])
+            assert metric(report, dimension, segment, "doublons") == kpi["num_duplicates"]
+            for column, rate in kpi["completeness_per_column"].items():
+                assert metric(report, dimension, segment, "taux_completude", column) == pytest.approx(rate)
+            for rule, failures in kpi["rule_failures"].items():
+                assert metric(report, dimension, segment, "echecs_regle", rule) == failures
+
+
+def test_labels_are_constant_dimensions(clients):
+    # "ville" est une colonne: en label, c'est la valeur littérale qui sert de segment
+    report = kpi_quality_segmented(clients, {"pays": "pays"}, labels={"source": "ville"})
+
+    assert set(report.loc[report["dimension"] == "source", "segment"]) == {"ville"}
+    assert metric(report, "source", "ville", "lignes") == len(clients)
+
+
+def test_unknown_column_name_is_an_error(clients):
+    with pytest.raises(KeyError):
+        kpi_quality_segmented(clients, {"region": "region"})
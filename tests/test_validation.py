@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from validation import RuleSet
+
+
+# RÈGLES DE VALIDATION
+# =====================
+
+@pytest.fixture
+def rules():
+    return RuleSet([
+        {"name": "email_present", "type": "required", "column": "email"},
+        {"name": "email_format", "type": "regex", "column": "email", "pattern": r"[^@\s]+@[^@\s]+\.[^@\s]+"},
+        {"name": "pays_connu", "type": "allowed", "column": "pays", "values": ["France", "Belgique"]},
+        {"name": "contact_joignable", "type": "cross_field", "check": "any_present",
+         "columns": ["email", "telephone"]},
+    ])
+
+
+def test_rules_bitmask_per_row(rules):
+    df = pd.DataFrame({
+        "email": ["a@b.fr", None, "pas-un-email", None],
+        "telephone": [None, "+33612345678", None, None],
+        "pays": ["France", "Japon", None, "Belgique"],
+    })
+    bitmask, failures = rules.evaluate(df)
+
+    assert bitmask.dtype == np.uint8
+    assert bitmask.tolist() == [0b0000, 0b0101, 0b0010, 0b1001]
+    assert failures == {"email_present": 2, "email_format": 1, "pays_connu": 1, "contact_joignable": 1}
+    assert rules.decode(bitmask[3]) == ["email_present", "contact_joignable"]
+
+
+def test_rules_on_missing_columns_are_skipped(rules):
+    bitmask, failures = rules.evaluate(pd.DataFrame({"email": ["a@b.fr", "x"]}))
+
+    assert bitmask.tolist() == [0, 0b0010]
+    assert set(failures) == {"email_present", "email_format"}
+
+
+def test_rules_bitmask_widens_past_eight_rules():
+    many = RuleSet([{"name": f"r{i}", "type": "required", "column": "x"} for i in range(9)])
+    bitmask, _ = many.evaluate(pd.DataFrame({"x": [None, 1]}))
+
+    assert bitmask.dtype == np.uint16
+    assert bitmask.tolist() == [0b111111111, 0]
+
+
+
+def test_range_and_comparison_rules():
+    rules = RuleSet([
+        {"name": "age_plausible", "type": "range", "column": "naissance", "kind": "age", "min": 0, "max": 120,
+         "action": "nullify"},
+        {"name": "quantite", "type": "range", "column": "quantite", "min": 1},
+        {"name": "livraison_apres_commande", "type": "cross_field", "check": "ge",
+         "left": "livraison", "right": "commande"},
+    ])
+    df = pd.DataFrame({
+        "naissance": ["1985-04-02", "1850-01-01", "pas une date", None],
+        "quantite": ["3", "0", None, "x"],
+        "livraison": [5, 1, None, 2],
+        "commande": [4, 2, 3, 2],
+    })
+    bitmask, _ = rules.evaluate(df)
+
+    assert bitmask.tolist() == [0b000, 0b111, 0b001, 0b010]
+
+    # Action nullify: seules les dates de naissance fautives sont vidées
+    cleaned = rules.apply_actions(df.copy(), bitmask)
+    assert cleaned["naissance"].tolist()[:1] == ["1985-04-02"]
+    assert cleaned["naissance"][1:].isna().all()
+    assert cleaned["quantite"].tolist()[:2] == ["3", "0"]
+
+
+def test_too_many_rules_are_rejected():
+    with pytest.raises(ValueError):
+        RuleSet([{"name": f"r{i}", "type": "required", "column": "x"} for i in range(65)])
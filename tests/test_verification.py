@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import verification
+from utils import normalize_phone_series
+from verification import verify_normalizers
+
+
+def clients():
+    return pd.DataFrame({
+        "email": [" A@Gmail.com", "b@yahoo.fr", None, "c@free.fr", "d@x.ch", "e@x.es"],
+        "telephone": ["06 12 34 56 78", "0033 6 12 34 56 78", "0470 12 34 56", "02 123 45 67",
+                      "079 123 45 67", "+81 3 1234 5678"],
+        "pays": ["France", "fr", "be", "Belgique", "Suisse", None],
+        "naissance": ["1980-05-17", "17/05/1980", None, "2001-01-02", "02/01/2001", "pas une date"],
+    })
+
+
+def test_no_divergence_on_all_countries():
+    mismatches, summary = verify_normalizers(clients(), 100, seed=0)
+
+    assert mismatches.empty
+    # Tous les téléphones sont comparés, pas seulement ceux de France
+    assert summary["normalize_phone"] == (6, 0, 0)
+    assert summary["normalize_phone_fr"] == (2, 0, 1)
+
+
+def test_divergence_outside_france_is_reported(monkeypatch):
+    def broken(phones, countries):
+        result = normalize_phone_series(phones, countries)
+        return result.where(countries != "Belgique", "+32000")
+
+    monkeypatch.setattr(verification, "normalize_phone_series", broken)
+    mismatches, summary = verify_normalizers(clients(), 100, seed=0)
+
+    assert summary["normalize_phone"][1] == 2
+    assert set(mismatches["entree"]) == {"0470 12 34 56", "02 123 45 67"}
+    assert set(mismatches["normaliseur"]) == {"normalize_phone"}
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from watcher import route_for, pipeline_args
+
+
+OUTPUT_OPTIONS = ['--output', '--report', '--segment-report', '--verification-report']
+
+
+def drop_args(filename):
+    kind, match = route_for(filename)
+    argv = pipeline_args(kind, match, f"/depot/{filename}")
+    return kind, dict(zip(argv[::2], argv[1::2]))
+
+
+def test_partial_drops_never_share_outputs():
+    _, be = drop_args("clients_be.csv")
+    _, ch = drop_args("clients_ch.csv.gz")
+
+    for option in OUTPUT_OPTIONS:
+        assert be[option] != ch[option]
+    assert be['--history-dataset'] == "crm_clients_be"
+    assert ch['--history-dataset'] == "crm_clients_ch"
+
+
+def test_full_drop_keeps_canonical_outputs():
+    kind, args = drop_args("clients.csv")
+
+    assert kind == 'crm'
+    assert args == {'--input': "/depot/clients.csv"}
+
+
+@pytest.mark.parametrize("filename, source", [("catalog_fr.csv", "fr"), ("catalog_us.csv.zst", "us")])
+def test_catalog_drop_refreshes_its_source(filename, source):
+    kind, args = drop_args(filename)
+
+    assert kind == 'catalog'
+    assert args == {'--source': source, '--input': f"/depot/{filename}"}
+
+
+@pytest.mark.parametrize("filename", ["catalog_be.csv", "clients.csv.part", ".clients.csv", "ventes.csv"])
+def test_unknown_or_partial_files_are_not_routed(filename):
+    assert route_for(filename) is None
@@ -0,0 +1,104 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from writers import BackgroundWriter, atomic_write, atomic_write_csv
+from utils import kpi_quality
+import crm
+
+
+@pytest.fixture
+def existing_csv(tmp_path):
+    path = tmp_path / "clients_clean.csv"
+    path.write_text("id,email\n1,a@b.fr\n", encoding="utf-8")
+    return path
+
+
+def leftovers(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+
+# ÉCRITURE ATOMIQUE
+# ==================
+
+def test_failed_write_leaves_original_untouched(existing_csv):
+
+    def write_then_fail(f):
+        f.write("id,email\n2,tronqué")
+        raise RuntimeError("disque plein")
+
+    with pytest.raises(RuntimeError):
+        atomic_write(str(existing_csv), write_then_fail)
+
+    assert existing_csv.read_text(encoding="utf-8") == "id,email\n1,a@b.fr\n"
+    assert leftovers(existing_csv.parent) == []
+
+
+def test_failed_csv_write_leaves_original_untouched(existing_csv):
+    with pytest.raises(KeyError):
+        atomic_write_csv(pd.DataFrame({"id": [2]}), str(existing_csv), columns=["absente"], index=False)
+
+    assert existing_csv.read_text(encoding="utf-8") == "id,email\n1,a@b.fr\n"
+    assert leftovers(existing_csv.parent) == []
+
+
+def test_successful_write_replaces_and_keeps_mode(existing_csv):
+    os.chmod(existing_csv, 0o640)
+    atomic_write_csv(pd.DataFrame({"id": [2], "email": ["c@d.fr"]}), str(existing_csv), index=False)
+
+    assert existing_csv.read_text(encoding="utf-8") == "id,email\n2,c@d.fr\n"
+    assert os.stat(existing_csv).st_mode & 0o777 == 0o640
+
+
+# ÉCRITURES EN TÂCHE DE FOND
+# ===========================
+
+def test_wait_reraises_worker_exception(tmp_path):
+    writer = BackgroundWriter()
+    writer.submit_csv(pd.DataFrame({"id": [1]}), str(tmp_path / "ok.csv"), index=False)
+    writer.submit(str(tmp_path / "ko.csv"), lambda f: 1 / 0)
+
+    with pytest.raises(ZeroDivisionError):
+        writer.wait()
+    writer.close()
+
+    assert (tmp_path / "ok.csv").exists()
+    assert not (tmp_path / "ko.csv").exists()
+
+
+def test_context_manager_reraises_on_exit(tmp_path):
+    with pytest.raises(ZeroDivisionError):
+        with BackgroundWriter() as writer:
+            writer.submit(str(tmp_path / "ko.csv"), lambda f: 1 / 0)
+
+
+def test_failed_output_is_not_recorded_in_history(tmp_path, capsys):
+    df = pd.DataFrame({"email": ["a@b.fr", None], "pays": ["France", "France"]})
+    kpi = kpi_quality(df, "Clients")
+    history_dir = tmp_path / "history"
+
+    # Sortie nettoyée impossible à écrire (la cible est un dossier)
+    (tmp_path / "clients_clean.csv").mkdir()
+    with pytest.raises(OSError):
+        with BackgroundWriter() as writer:
+            writer.submit_csv(df, str(tmp_path / "clients_clean.csv"), index=False)
+            crm.save_results(kpi, kpi, writer, report_path=str(tmp_path / "kpi.csv"),
+                             history_dir=str(history_dir))
+
+    assert not history_dir.exists()
+
+
+def test_successful_run_is_recorded_after_writes(tmp_path, capsys):
+    df = pd.DataFrame({"email": ["a@b.fr", None], "pays": ["France", "France"]})
+    kpi = kpi_quality(df, "Clients")
+    history_dir = tmp_path / "history"
+
+    with BackgroundWriter() as writer:
+        writer.submit_csv(df, str(tmp_path / "clients_clean.csv"), index=False)
+        crm.save_results(kpi, kpi, writer, report_path=str(tmp_path / "kpi.csv"), history_dir=str(history_dir))
+
+    assert (tmp_path / "kpi.csv").exists()
+    assert len(list(history_dir.rglob("run-*"))) == 1